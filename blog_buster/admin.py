@@ -22,18 +22,19 @@ from .models import (
     QuickTipsWidget,
     BuyingGuidesWidget,
 )
+from .widgets import get_loader
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'created_at']
+    list_display = ['name', 'slug', 'published_post_count', 'created_at']
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name']
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'created_at']
+    list_display = ['name', 'slug', 'published_post_count', 'created_at']
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name']
 
@@ -46,7 +47,7 @@ class PostAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     filter_horizontal = ['tags']
     date_hierarchy = 'published_at'
-    readonly_fields = ['views', 'created_at', 'updated_at']
+    readonly_fields = ['views', 'word_count', 'reading_time', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Content', {
@@ -59,7 +60,7 @@ class PostAdmin(admin.ModelAdmin):
             'fields': ('status', 'featured', 'published_at')
         }),
         ('Statistics', {
-            'fields': ('views', 'created_at', 'updated_at'),
+            'fields': ('views', 'word_count', 'reading_time', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -216,6 +217,22 @@ class BuyingGuidesWidgetInline(admin.StackedInline):
     verbose_name_plural = 'Buying Guides Configuration'
 
 
+WIDGET_CONFIG_INLINES = {
+    inline.model: inline
+    for inline in [
+        PopularPostsWidgetInline,
+        RelatedPostsWidgetInline,
+        AuthorBioWidgetInline,
+        SocialShareWidgetInline,
+        NewsletterWidgetInline,
+        CategoriesWidgetInline,
+        RecentPostsWidgetInline,
+        QuickTipsWidgetInline,
+        BuyingGuidesWidgetInline,
+    ]
+}
+
+
 @admin.register(SidebarWidget)
 class SidebarWidgetAdmin(admin.ModelAdmin):
     list_display = ['get_widget_type_display', 'title', 'is_active', 'sort_order', 'updated_at']
@@ -226,22 +243,7 @@ class SidebarWidgetAdmin(admin.ModelAdmin):
 
     def get_inlines(self, request, obj):
         if obj:
-            if obj.widget_type == 'popular_posts':
-                return [PopularPostsWidgetInline]
-            elif obj.widget_type == 'related_posts':
-                return [RelatedPostsWidgetInline]
-            elif obj.widget_type == 'author_bio':
-                return [AuthorBioWidgetInline]
-            elif obj.widget_type == 'social_share':
-                return [SocialShareWidgetInline]
-            elif obj.widget_type == 'newsletter':
-                return [NewsletterWidgetInline]
-            elif obj.widget_type == 'categories':
-                return [CategoriesWidgetInline]
-            elif obj.widget_type == 'recent_posts':
-                return [RecentPostsWidgetInline]
-            elif obj.widget_type == 'quick_tips':
-                return [QuickTipsWidgetInline]
-            elif obj.widget_type == 'buying_guides':
-                return [BuyingGuidesWidgetInline]
+            config_model = get_loader(obj.widget_type).config_model
+            if config_model in WIDGET_CONFIG_INLINES:
+                return [WIDGET_CONFIG_INLINES[config_model]]
         return []
@@ -0,0 +1,168 @@
+"""Time-bucketed view analytics and popular-post leaderboards.
+
+Flushed views land in hourly ``PostViewBucket`` rows. Compaction rolls hours
+older than ``HOURLY_RETENTION`` into days and days older than
+``DAILY_RETENTION`` into months. ``PopularPostRanking`` holds the top posts for
+each trailing window in ``LEADERBOARD_WINDOWS`` so popularity lookups are a
+single indexed join instead of a sort over the whole post table.
+"""
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.cache import cache as django_cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+from django.utils import timezone
+
+from . import cache, page_cache
+from .models import Post, PostViewBucket, PopularPostRanking
+
+LEADERBOARD_WINDOWS = (7, 30, 90)
+LEADERBOARD_SIZE = 50
+LEADERBOARD_REFRESH_INTERVAL = 5 * 60
+HOURLY_RETENTION = timedelta(days=2)
+DAILY_RETENTION = timedelta(days=120)
+
+COMPACTIONS = [
+    ('hour', 'day', HOURLY_RETENTION, TruncDay),
+    ('day', 'month', DAILY_RETENTION, TruncMonth),
+]
+
+
+def bucket_start(moment, granularity):
+    """Truncate ``moment`` to the start of its bucket"""
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity in ('day', 'month'):
+        moment = moment.replace(hour=0)
+    if granularity == 'month':
+        moment = moment.replace(day=1)
+    return moment
+
+
+def record_bucket_views(deltas, moment=None):
+    """Add ``{post_id: views}`` to the hourly buckets for ``moment``"""
+    if not deltas:
+        return
+    start = bucket_start(moment or timezone.now(), 'hour')
+    by_delta = defaultdict(list)
+    for post_id, delta in deltas.items():
+        by_delta[delta].append(post_id)
+    with transaction.atomic():
+        PostViewBucket.objects.bulk_create(
+            [PostViewBucket(post_id=post_id, granularity='hour', bucket_start=start) for post_id in deltas],
+            ignore_conflicts=True,
+        )
+        for delta, post_ids in by_delta.items():
+            PostViewBucket.objects.filter(
+                post_id__in=post_ids, granularity='hour', bucket_start=start,
+            ).update(views=F('views') + delta)
+
+
+def compact_buckets(now=None):
+    """Roll old buckets into coarser ones; returns the number of rows removed"""
+    now = now or timezone.now()
+    removed = 0
+    for fine, coarse, retention, trunc in COMPACTIONS:
+        cutoff = bucket_start(now - retention, coarse)
+        old = PostViewBucket.objects.filter(granularity=fine, bucket_start__lt=cutoff)
+        totals = {
+            (row['post_id'], row['start']): row['total']
+            for row in (
+                old.annotate(start=trunc('bucket_start', tzinfo=dt_timezone.utc))
+                .values('post_id', 'start')
+                .annotate(total=Sum('views'))
+            )
+        }
+        if not totals:
+            continue
+
+        with transaction.atomic():
+            existing = PostViewBucket.objects.select_for_update().filter(
+                granularity=coarse,
+                post_id__in={post_id for post_id, _ in totals},
+                bucket_start__in={start for _, start in totals},
+            )
+            to_update = []
+            for bucket in existing:
+                total = totals.pop((bucket.post_id, bucket.bucket_start), None)
+                if total is not None:
+                    bucket.views += total
+                    to_update.append(bucket)
+            PostViewBucket.objects.bulk_update(to_update, ['views'], batch_size=500)
+            PostViewBucket.objects.bulk_create(
+                [
+                    PostViewBucket(post_id=post_id, granularity=coarse, bucket_start=start, views=total)
+                    for (post_id, start), total in totals.items()
+                ],
+                batch_size=500,
+            )
+            removed += old.delete()[0]
+    return removed
+
+
+def rebuild_leaderboards(now=None):
+    """Recompute every window's ranking; returns True if any ranking changed"""
+    now = now or timezone.now()
+    changed = False
+    for window in LEADERBOARD_WINDOWS:
+        rows = list(
+            PostViewBucket.objects.filter(
+                bucket_start__gte=now - timedelta(days=window),
+                post__status='published',
+            )
+            .values('post_id')
+            .annotate(total=Sum('views'))
+            .order_by('-total', 'post_id')[:LEADERBOARD_SIZE]
+        )
+        current = list(
+            PopularPostRanking.objects.filter(window_days=window).values_list('post_id', 'views')
+        )
+        if current == [(row['post_id'], row['total']) for row in rows]:
+            continue
+
+        with transaction.atomic():
+            PopularPostRanking.objects.filter(window_days=window).delete()
+            PopularPostRanking.objects.bulk_create(
+                PopularPostRanking(window_days=window, rank=rank, post_id=row['post_id'], views=row['total'])
+                for rank, row in enumerate(rows, start=1)
+            )
+        changed = True
+
+    if changed:
+        transaction.on_commit(cache.bump_version)
+        transaction.on_commit(lambda: page_cache.purge(page_cache.POPULAR))
+    return changed
+
+
+def maybe_rebuild_leaderboards():
+    """Rebuild the leaderboards at most once per refresh interval"""
+    if django_cache.add('blog_buster:leaderboards:fresh', 1, LEADERBOARD_REFRESH_INTERVAL):
+        return rebuild_leaderboards()
+    return False
+
+
+def leaderboard_window(days):
+    """Smallest precomputed window covering ``days``"""
+    return next((window for window in LEADERBOARD_WINDOWS if window >= days), LEADERBOARD_WINDOWS[-1])
+
+
+def popular_posts(days, limit, excerpt=False):
+    """Most-viewed published posts over the trailing ``days``, as cards
+
+    Falls back to lifetime views among recently published posts until the
+    leaderboard has been built.
+    """
+    posts = list(
+        Post.objects.filter(status='published', popular_rankings__window_days=leaderboard_window(days))
+        .cards(excerpt)
+        .order_by('popular_rankings__rank')[:limit]
+    )
+    if posts:
+        return posts
+    cutoff_date = timezone.now() - timedelta(days=days)
+    return list(
+        Post.objects.filter(status='published', published_at__gte=cutoff_date)
+        .cards(excerpt)
+        .order_by('-views')[:limit]
+    )
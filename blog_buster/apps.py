@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BlogBusterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog_buster'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        post_migrate.connect(signals.create_singletons, sender=self)
@@ -0,0 +1,209 @@
+"""Per-route query budgets and latency benchmarks.
+
+:func:`sample_urls` picks one representative URL for every named route in
+``blog_buster.urls``, drawn from whatever dataset is loaded (normally one
+built by ``generate_load_data``). :func:`measure` requests a URL through the
+test client and records its query count, total SQL time, template render
+time and wall time. The ``benchmark_views`` command runs every route cold
+(caches cleared) and warm, checks the query counts against
+``BUDGETS_PATH`` and writes a JSON report that can be diffed between
+commits. :func:`load_test` drives the same URLs against a running server
+with concurrent clients, for comparing the WSGI and ASGI deployments
+(``benchmark_http``).
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from django.db.models import Count
+from django.template.backends.django import Template
+from django.urls import reverse
+
+from .models import Post, Category, Tag, BuyingGuide, ProductReview, HowToSeries
+from .query_observers import observing
+from .urls import urlpatterns
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_budgets.json')
+MODES = ('cold', 'warm')
+
+
+class RequestMetrics:
+    """Query and timing totals for one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.wall_time = 0.0
+        self.status = None
+        self._lock = threading.Lock()
+
+    def record(self, sql, elapsed):
+        # Query observer hook; page sections query from several threads
+        with self._lock:
+            self.sql_time += elapsed
+            self.queries += 1
+
+
+@contextmanager
+def _timed_rendering(metrics):
+    """Add the time spent in top-level template renders to ``metrics``"""
+    original = Template.render
+    depth = 0
+
+    def render(self, context=None, request=None):
+        nonlocal depth
+        depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            depth -= 1
+            if not depth:
+                metrics.render_time += time.perf_counter() - started
+
+    Template.render = render
+    try:
+        yield
+    finally:
+        Template.render = original
+
+
+def measure(client, url):
+    """Request ``url`` and return its :class:`RequestMetrics`"""
+    metrics = RequestMetrics()
+    with observing(metrics), _timed_rendering(metrics):
+        started = time.perf_counter()
+        try:
+            response = client.get(url)
+            metrics.status = response.status_code
+        except Exception as exc:
+            metrics.status = f'{type(exc).__name__}: {exc}'
+        metrics.wall_time = time.perf_counter() - started
+    return metrics
+
+
+def _first_slug(queryset):
+    return queryset.values_list('slug', flat=True).first()
+
+
+def _no_kwargs():
+    return {}, ''
+
+
+# Route name -> callable returning ``(url kwargs, querystring)``, or None when
+# the dataset has nothing to show on that route
+SAMPLES = {
+    'post_detail': lambda: _slug_sample(
+        Post.objects.filter(status='published').annotate(tag_total=Count('tags')).order_by('-tag_total', '-views')
+    ),
+    'category_detail': lambda: _slug_sample(Category.objects.order_by('-published_post_count')),
+    'tag_detail': lambda: _slug_sample(Tag.objects.order_by('-published_post_count')),
+    'buying_guide_detail': lambda: _slug_sample(
+        BuyingGuide.objects.filter(published=True).annotate(total=Count('picks')).order_by('-total')
+    ),
+    'product_review_detail': lambda: _slug_sample(
+        ProductReview.objects.filter(published=True).annotate(total=Count('scores')).order_by('-total')
+    ),
+    'howto_detail': lambda: _slug_sample(
+        HowToSeries.objects.filter(published=True).annotate(total=Count('steps')).order_by('-total')
+    ),
+}
+# Extra variants measured as ``<route>:<variant>``
+VARIANTS = {
+    'post_list:search': ('post_list', lambda: ({}, 'q=router')),
+}
+
+
+def _slug_sample(queryset):
+    slug = _first_slug(queryset)
+    return None if slug is None else ({'slug': slug}, '')
+
+
+def sample_urls():
+    """Yield ``(route, url)`` for every named route; ``url`` is None without data"""
+    routes = [(pattern.name, pattern.name, SAMPLES.get(pattern.name, _no_kwargs)) for pattern in urlpatterns]
+    routes += [(route, name, sample) for route, (name, sample) in VARIANTS.items()]
+    for route, name, sample in routes:
+        found = sample()
+        if found is None:
+            yield route, None
+            continue
+        kwargs, query = found
+        url = reverse(name, kwargs=kwargs)
+        yield route, f'{url}?{query}' if query else url
+
+
+def summarize(samples):
+    """Collapse repeated :class:`RequestMetrics` into one report entry"""
+    return {
+        'status': samples[-1].status,
+        'queries': max(sample.queries for sample in samples),
+        'sql_ms': round(statistics.median(sample.sql_time for sample in samples) * 1000, 2),
+        'render_ms': round(statistics.median(sample.render_time for sample in samples) * 1000, 2),
+        'wall_ms': round(statistics.median(sample.wall_time for sample in samples) * 1000, 2),
+    }
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def over_budget(routes, budgets):
+    """Yield ``(route, mode, queries, budget)`` for every exceeded budget"""
+    for route, entry in routes.items():
+        for mode in MODES:
+            budget = budgets.get(route, {}).get(mode)
+            result = entry.get(mode)
+            if budget is not None and result and result['queries'] > budget:
+                yield route, mode, result['queries'], budget
+
+
+def _fetch(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as exc:
+        status = exc.code
+    except OSError as exc:
+        status = type(exc).__name__
+    return time.perf_counter() - started, status
+
+
+def load_test(base_url, path, requests, concurrency, bust_cache=False, timeout=30):
+    """Request ``path`` on a running server ``requests`` times from ``concurrency`` clients
+
+    ``bust_cache`` adds a unique query parameter per request so the full-page
+    cache never answers. Returns latency percentiles in milliseconds,
+    throughput and the number of non-200 responses.
+    """
+    separator = '&' if '?' in path else '?'
+    urls = [
+        f"{base_url.rstrip('/')}{path}{f'{separator}_bench={n}' if bust_cache else ''}"
+        for n in range(requests)
+    ]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: _fetch(url, timeout), urls))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, status in results if status != 200),
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p90_ms': round(cuts[89] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2),
+        'rps': round(requests / elapsed, 1),
+    }
@@ -0,0 +1,289 @@
+"""Two-tier cache shared by every project-level cache.
+
+The first tier is a bounded LRU inside each worker process, which costs no
+network round trip. The second tier is Django's ``default`` cache: Redis in
+production, shared by all workers, and local memory in development and tests.
+Reads try the local tier first and fill it from the shared one. The local
+tier stores pickled bytes, so callers never share or mutate each other's
+objects.
+
+:func:`get_or_build` coalesces cold keys across the cluster. One caller
+takes a lock in the shared tier and builds, while the others wait for its
+result (single flight). Entries stay servable for a stale window after they
+expire. A stale read returns at once and refreshes the entry in a background
+thread.
+
+Content is invalidated with per-namespace version counters in the shared
+tier. :func:`get_version` rereads a counter at most once every
+``BLOG_BUSTER_VERSION_CHECK_INTERVAL`` seconds per process, and
+:func:`bump_version` moves every worker to new keys. Counters are seeded
+from the clock, so a counter that is evicted, flushed or created in a fresh
+process never returns to a version that older payloads are stored under.
+
+Atomic counters (view counts, page tags) use the shared tier directly; they
+must not be copied into a process.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'blog_buster:version:{namespace}'
+PAYLOAD_KEY = 'blog_buster:{name}:{namespace}:v{version}'
+LOCK_KEY = 'blog_buster:lock:{key}'
+
+# Namespace bumped whenever any editor-managed content changes
+CONTENT = 'content'
+# Namespace bumped when categories change; keys the navigation snapshot
+CATEGORIES = 'categories'
+# How often a waiting caller polls the shared tier for another worker's build
+POLL_INTERVAL = 0.05
+
+
+def default_timeout():
+    return getattr(settings, 'BLOG_BUSTER_CACHE_TIMEOUT', 60 * 60)
+
+
+def _stale_timeout():
+    return getattr(settings, 'BLOG_BUSTER_CACHE_STALE_TIMEOUT', 5 * 60)
+
+
+def _lock_timeout():
+    return getattr(settings, 'BLOG_BUSTER_CACHE_LOCK_TIMEOUT', 10)
+
+
+def _local_timeout():
+    return getattr(settings, 'BLOG_BUSTER_LOCAL_CACHE_TIMEOUT', 60)
+
+
+def _version_check_interval():
+    return getattr(settings, 'BLOG_BUSTER_VERSION_CHECK_INTERVAL', 1)
+
+
+class LocalCache:
+    """Bounded, thread-safe in-process LRU with per-entry TTLs"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout=None):
+        timeout = _local_timeout() if timeout is None else min(timeout, _local_timeout())
+        if timeout <= 0:
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        max_entries = getattr(settings, 'BLOG_BUSTER_LOCAL_CACHE_MAX_ENTRIES', 500)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local = LocalCache()
+_versions = {}
+# Striped per-process locks, so threads of one worker wait here instead of polling
+_flights = [threading.Lock() for _ in range(64)]
+
+
+def get(key):
+    """Return the value for ``key`` from the nearest tier, or None"""
+    value = local.get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is not None:
+            local.set(key, value)
+    return value
+
+
+def get_many(keys):
+    """Return ``{key: value}`` for the ``keys`` found in either tier"""
+    found = {}
+    for key in keys:
+        value = local.get(key)
+        if value is not None:
+            found[key] = value
+    missing = [key for key in keys if key not in found]
+    if missing:
+        shared = cache.get_many(missing)
+        for key, value in shared.items():
+            local.set(key, value)
+        found.update(shared)
+    return found
+
+
+def set(key, value, timeout=None):
+    timeout = default_timeout() if timeout is None else timeout
+    cache.set(key, value, timeout)
+    local.set(key, value, timeout)
+
+
+def set_many(mapping, timeout=None):
+    timeout = default_timeout() if timeout is None else timeout
+    cache.set_many(mapping, timeout)
+    for key, value in mapping.items():
+        local.set(key, value, timeout)
+
+
+def delete(key):
+    """Remove ``key`` from the shared tier and this process; other workers drop it on expiry"""
+    cache.delete(key)
+    local.delete(key)
+
+
+def clear():
+    """Empty both tiers (this process's local tier only)"""
+    cache.clear()
+    local.clear()
+    _versions.clear()
+
+
+def _seed():
+    # Later than any version handed out before: versions only move by one per edit
+    return time.time_ns()
+
+
+def get_version(namespace=CONTENT):
+    """Return the current version number for a cache namespace"""
+    checked_at, version = _versions.get(namespace, (None, None))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < _version_check_interval():
+        return version
+    key = VERSION_KEY.format(namespace=namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), None)
+        version = cache.get(key)
+    _versions[namespace] = (now, version)
+    return version
+
+
+def bump_version(namespace=CONTENT):
+    """Invalidate every payload stored under a namespace, in every worker"""
+    key = VERSION_KEY.format(namespace=namespace)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, _seed(), None)
+        version = cache.incr(key)
+    _versions[namespace] = (time.monotonic(), version)
+    return version
+
+
+def _acquire(key):
+    return cache.add(LOCK_KEY.format(key=key), 1, _lock_timeout())
+
+
+def _release(key):
+    cache.delete(LOCK_KEY.format(key=key))
+
+
+def _build(key, builder, timeout, stale):
+    """Build and store an entry; the caller holds the cluster lock for ``key``"""
+    try:
+        value = builder()
+        entry = (time.time() + timeout, value)
+        cache.set(key, entry, timeout + stale)
+        local.set(key, entry, timeout)
+        return value
+    finally:
+        _release(key)
+
+
+def _refresh(key, builder, timeout, stale):
+    try:
+        _build(key, builder, timeout, stale)
+    except Exception:
+        logger.exception('Background refresh of %s failed', key)
+    finally:
+        # The thread ends here; don't leave its connection open
+        connections.close_all()
+
+
+def _wait(key):
+    """Poll the shared tier for the entry another worker is building"""
+    deadline = time.monotonic() + _lock_timeout()
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _flight(key):
+    return _flights[hash(key) % len(_flights)]
+
+
+def get_or_build(key, builder, timeout=None, stale=None, name='payload'):
+    """Return the cached value for ``key``, calling ``builder`` at most once per cluster
+
+    Values stay fresh for ``timeout`` seconds and are served for another
+    ``stale`` seconds while one worker rebuilds them in the background.
+    ``builder`` must return a fully evaluated, picklable value (lists rather
+    than querysets) so a hit never touches the database. ``name`` labels the
+    hit and miss metrics.
+    """
+    timeout = default_timeout() if timeout is None else timeout
+    stale = _stale_timeout() if stale is None else stale
+    entry = get(key)
+    if entry is None:
+        with _flight(key):
+            # Another thread of this worker may have built it while we waited
+            entry = get(key)
+            if entry is None:
+                metrics.record_cache(name, False)
+                if _acquire(key):
+                    return _build(key, builder, timeout, stale)
+                entry = _wait(key)
+                if entry is None:
+                    # The builder holding the lock died or is too slow; don't wait forever
+                    return builder()
+                local.set(key, entry, timeout)
+                return entry[1]
+
+    metrics.record_cache(name, True)
+    fresh_until, value = entry
+    if fresh_until <= time.time() and _acquire(key):
+        local.delete(key)
+        threading.Thread(target=_refresh, args=(key, builder, timeout, stale), daemon=True).start()
+    return value
+
+
+def get_versioned(name, builder, namespace=CONTENT, timeout=None):
+    """Return the cached payload for ``name``, built once per namespace version
+
+    Bumping the namespace version switches every worker to a new key, so edits
+    show up at once; a plain expiry is refreshed while the old payload is served.
+    """
+    key = PAYLOAD_KEY.format(name=name, namespace=namespace, version=get_version(namespace))
+    return get_or_build(key, builder, timeout, name=name)
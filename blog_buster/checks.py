@@ -0,0 +1,31 @@
+"""System checks for settings the app relies on."""
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends that are shared by every process and only evict keys under a
+# server-side policy the deployment controls
+SHARED_CACHE_BACKENDS = {'django.core.cache.backends.redis.RedisCache'}
+
+
+@register()
+def check_view_buffer_cache(app_configs, **kwargs):
+    """The view buffer must be shared and non-evicting, or buffered views are lost"""
+    alias = getattr(settings, 'BLOG_BUSTER_VIEW_BUFFER_CACHE', None)
+    if alias is None:
+        return []
+    config = settings.CACHES.get(alias)
+    if config is None:
+        return [Error(
+            f"BLOG_BUSTER_VIEW_BUFFER_CACHE names the cache '{alias}', which is not in CACHES.",
+            id='blog_buster.E001',
+        )]
+    if config['BACKEND'] not in SHARED_CACHE_BACKENDS:
+        return [Error(
+            f"The view buffer cache '{alias}' uses {config['BACKEND']}, which is per-process or evicts keys.",
+            hint=(
+                "Point it at Redis with maxmemory-policy noeviction, or set "
+                "BLOG_BUSTER_VIEW_BUFFER_CACHE = None to write views straight to the database."
+            ),
+            id='blog_buster.E002',
+        )]
+    return []
@@ -0,0 +1,92 @@
+"""Conditional GET support for public pages.
+
+A page's validators come from the newest ``updated_at`` among the object,
+its list members and the active sidebar widgets, and from how many rows
+those sets hold, all read in a single aggregate query. The count catches
+deletes and unpublishes, which remove rows without touching any remaining
+``updated_at``. The content cache version is folded into the ETag as well;
+it covers widget data without timestamps of its own. When the client's copy
+is current the view never runs: no widget context is built and no template
+is rendered.
+"""
+from datetime import timezone as dt_timezone
+from functools import wraps
+
+from django.db.models import Count, Max, Subquery, Value
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from . import cache, metrics
+
+
+def newest_update(primary, *others, **extra):
+    """Newest ``updated_at`` across querysets, in one aggregate query
+
+    ``others`` are folded in as scalar subqueries of the aggregate over
+    ``primary``; ``extra`` adds aggregates over ``primary`` to the returned
+    row. Returns ``(newest, row)``, with ``newest`` None when ``primary`` is
+    empty. ``row['members']`` is the number of rows across all querysets.
+    """
+    aggregates = {'newest': Max('updated_at'), 'members': Count('*'), **extra}
+    for index, queryset in enumerate(others):
+        latest = queryset.order_by('-updated_at').values('updated_at')[:1]
+        counted = queryset.order_by().annotate(one=Value(1)).values('one').annotate(total=Count('*')).values('total')
+        aggregates[f'newest_{index}'] = Max(Subquery(latest))
+        aggregates[f'members_{index}'] = Max(Subquery(counted))
+    row = primary.aggregate(**aggregates)
+    newest = row.pop('newest')
+    stamps = [row.pop(f'newest_{index}') for index in range(len(others))]
+    row['members'] += sum(row.pop(f'members_{index}') or 0 for index in range(len(others)))
+    if newest is None:
+        return None, row
+    return max([newest, *filter(None, stamps)]), row
+
+
+def conditional_page(freshness, on_not_modified=None):
+    """Answer conditional GETs from ``freshness`` before running the view
+
+    ``freshness(request, *args, **kwargs)`` returns ``(last_modified,
+    members, state)``, ``members`` counting the rows ``last_modified`` was
+    taken from (see :func:`newest_update`).
+    ``on_not_modified(request, **state)`` runs for every 304 response. The
+    wrapped view exposes ``validators(request, *args, **kwargs)`` returning
+    ``(etag, last_modified_timestamp, state)`` without running the view.
+    """
+    def validators(request, *args, **kwargs):
+        last_modified, members, state = freshness(request, *args, **kwargs)
+        if last_modified is None:
+            return None, None, state
+        timestamp = int(last_modified.astimezone(dt_timezone.utc).timestamp())
+        etag = quote_etag(f'{last_modified.timestamp():.6f}-{members}-{cache.get_version()}')
+        return etag, timestamp, state
+
+    def check(request, *args, **kwargs):
+        """Return ``(response, validators)``; ``response`` is set when the view need not run"""
+        etag, timestamp, state = validators(request, *args, **kwargs)
+        if etag is None:
+            return None, None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        metrics.record_cache('conditional', response is not None and response.status_code == 304)
+        if response is not None and response.status_code == 304 and on_not_modified is not None:
+            on_not_modified(request, **state)
+        return response, (etag, timestamp)
+
+    def finish(response, checked):
+        if checked is not None and response.status_code == 200:
+            etag, timestamp = checked
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+            response.headers.setdefault('ETag', etag)
+        return response
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            response, checked = check(request, *args, **kwargs)
+            if response is not None:
+                return response
+            return finish(view(request, *args, **kwargs), checked)
+        wrapper.validators = validators
+        return wrapper
+    return decorator
@@ -1,10 +1,27 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import cache
 from .models import Category
 
+NAVIGATION_CATEGORIES = 10
+
+# (categories version, categories) for this process
+_navigation = (None, [])
+
+
+def navigation_categories():
+    """Categories for the site navigation, reloaded only after a category changes"""
+    global _navigation
+    version = cache.get_version(cache.CATEGORIES)
+    loaded_version, loaded = _navigation
+    if version != loaded_version:
+        loaded = list(Category.objects.all()[:NAVIGATION_CATEGORIES])
+        _navigation = (version, loaded)
+    return loaded
+
 
 def categories(request):
-    """Add categories to all template contexts"""
+    """Add navigation categories to all template contexts, loaded on first use"""
     return {
-        'categories': Category.objects.all()[:10]  # Limit to 10 for performance
+        'categories': SimpleLazyObject(navigation_categories),
     }
-
-
@@ -0,0 +1,161 @@
+"""Write-behind view counting.
+
+Views are accumulated with atomic increments in the cache named by
+``BLOG_BUSTER_VIEW_BUFFER_CACHE`` and applied to ``Post.views`` and the
+hourly view buckets in batches by :func:`flush_views`, which the
+``flush_view_counts`` command runs from a scheduler, never from a request.
+The buffer must be shared by every process, including the one flushing,
+and must never evict keys: a Redis cache on an instance with
+``maxmemory-policy noeviction`` (see ``checks.py``). Without one the
+setting is None and every view is written straight to the database.
+
+Cache layout:
+
+* ``pending:<id>`` holds the unflushed view count for a post
+* ``dirty:<id>`` marks a post as registered since its last flush
+* ``slot:<n>`` records the id of the n-th registered post, ``slots`` the
+  highest slot handed out and ``cursor`` the last slot already flushed
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+
+from . import analytics
+from .models import Post
+
+KEY_PREFIX = 'blog_buster:views'
+FLUSH_LOCK_TIMEOUT = 60
+# Lets a post re-register if its slot was lost (eviction, crashed worker)
+DIRTY_TIMEOUT = 60 * 60
+
+
+def buffer_cache():
+    """The cache buffering views, or None when views are written through"""
+    alias = getattr(settings, 'BLOG_BUSTER_VIEW_BUFFER_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _key(*parts):
+    return ':'.join([KEY_PREFIX, *map(str, parts)])
+
+
+def _incr(cache, key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _register(cache, post_id):
+    """Queue ``post_id`` for the next flush unless it is already queued"""
+    if cache.add(_key('dirty', post_id), 1, DIRTY_TIMEOUT):
+        slot = _incr(cache, _key('slots'))
+        cache.set(_key('slot', slot), post_id, None)
+
+
+def record_view(post_id):
+    """Count a view for ``post_id``; buffered unless no view buffer is configured"""
+    cache = buffer_cache()
+    if cache is None:
+        write_views({post_id: 1})
+        return
+    _incr(cache, _key('pending', post_id))
+    _register(cache, post_id)
+
+
+def pending_views(post_id):
+    """Views recorded for ``post_id`` that have not been flushed yet"""
+    cache = buffer_cache()
+    return 0 if cache is None else cache.get(_key('pending', post_id), 0)
+
+
+def live_views(post):
+    """Flushed plus buffered views, for display"""
+    return post.views + pending_views(post.pk)
+
+
+def _take_dirty_posts(cache):
+    start = cache.get(_key('cursor'), 0)
+    slots = cache.get(_key('slots'), 0)
+    if slots <= start:
+        return []
+    slot_keys = [_key('slot', n) for n in range(start + 1, slots + 1)]
+    found = cache.get_many(slot_keys)
+
+    # A missing slot is usually a recorder between its two cache writes; stop
+    # before it and retry next flush, skipping it if it is still missing then
+    taken = []
+    cursor = start
+    for n, slot_key in enumerate(slot_keys, start=start + 1):
+        if slot_key not in found:
+            if cache.get(_key('stalled')) != n:
+                cache.set(_key('stalled'), n, None)
+                break
+        else:
+            taken.append(found[slot_key])
+        cursor = n
+    cache.delete_many(slot_keys[:cursor - start])
+    cache.set(_key('cursor'), cursor, None)
+    return taken
+
+
+def flush_views():
+    """Apply buffered views to ``Post.views``; returns the number of views written
+
+    Only one flusher runs at a time. The dirty marker is cleared before the
+    pending count is read, so a view racing the flush re-registers its post
+    and is picked up next time rather than lost. Pending counts are only
+    decremented once the database write has committed; if it fails, the
+    posts are queued again with their counts intact.
+    """
+    cache = buffer_cache()
+    if cache is None:
+        return 0
+    lock_key = _key('flush_lock')
+    if not cache.add(lock_key, 1, FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        post_ids = _take_dirty_posts(cache)
+        cache.delete_many([_key('dirty', post_id) for post_id in post_ids])
+        pending = cache.get_many([_key('pending', post_id) for post_id in post_ids])
+        deltas = {}
+        for post_id in post_ids:
+            count = pending.get(_key('pending', post_id))
+            if count:
+                deltas[post_id] = count
+        try:
+            write_views(deltas)
+        except Exception:
+            for post_id in deltas:
+                _register(cache, post_id)
+            raise
+        for post_id, count in deltas.items():
+            cache.decr(_key('pending', post_id), count)
+        analytics.maybe_rebuild_leaderboards()
+        return sum(deltas.values())
+    finally:
+        cache.delete(lock_key)
+
+
+def write_views(deltas):
+    """Add ``{post_id: views}`` to the posts and their hourly buckets in one transaction"""
+    if not deltas:
+        return
+    with transaction.atomic():
+        apply_view_deltas(deltas)
+        analytics.record_bucket_views(deltas)
+
+
+def apply_view_deltas(deltas):
+    """Write ``{post_id: views}`` with one F() UPDATE per distinct delta"""
+    by_delta = defaultdict(list)
+    for post_id, delta in deltas.items():
+        by_delta[delta].append(post_id)
+    with transaction.atomic():
+        for delta, post_ids in by_delta.items():
+            Post.objects.filter(pk__in=post_ids).update(views=F('views') + delta)
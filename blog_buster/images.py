@@ -0,0 +1,93 @@
+"""Responsive image renditions.
+
+Each field in ``IMAGE_FIELDS`` has a JSON companion ``<field>_renditions``
+holding ``{'source': <image name>, 'renditions': [{'name', 'width',
+'height', 'format'}, ...]}``. :func:`refresh_renditions` resizes the source
+to every width in ``RENDITION_WIDTHS`` that does not upscale it, in each of
+``RENDITION_FORMATS``, whenever the stored source no longer matches the
+field. The ``responsive_image`` template tag turns the list into
+``srcset``/``sizes`` markup.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Post, ProductReview, AuthorBioWidget
+
+RENDITION_WIDTHS = (96, 320, 640, 960, 1280)
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+RENDITION_DIR = 'renditions'
+
+IMAGE_FIELDS = [
+    (Post, 'featured_image'),
+    (ProductReview, 'hero_image'),
+    (AuthorBioWidget, 'avatar'),
+]
+
+
+def renditions_field(field_name):
+    return f'{field_name}_renditions'
+
+
+def rendition_widths(source_width):
+    """Target widths for a source image, never upscaling"""
+    widths = [width for width in RENDITION_WIDTHS if width < source_width]
+    return widths + [min(source_width, RENDITION_WIDTHS[-1])]
+
+
+def generate_renditions(name, storage=default_storage):
+    """Write every rendition of the stored image ``name``; returns their metadata"""
+    with storage.open(name) as handle:
+        image = ImageOps.exif_transpose(Image.open(handle))
+        image.load()
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    stem = os.path.splitext(name)[0]
+    renditions = []
+    for width in rendition_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for extension, options in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, **options)
+            rendition_name = f'{RENDITION_DIR}/{stem}-{width}w.{extension}'
+            if storage.exists(rendition_name):
+                storage.delete(rendition_name)
+            storage.save(rendition_name, ContentFile(buffer.getvalue()))
+            renditions.append({'name': rendition_name, 'width': width, 'height': height, 'format': extension})
+    return renditions
+
+
+def delete_renditions(data, storage=default_storage):
+    for rendition in (data or {}).get('renditions', []):
+        storage.delete(rendition['name'])
+
+
+def refresh_renditions(instance, field_name, force=False):
+    """Regenerate an instance's renditions if its image changed; returns True if it did"""
+    image = getattr(instance, field_name)
+    stored = getattr(instance, renditions_field(field_name)) or {}
+    source = image.name if image else None
+    if not force and stored.get('source') == source:
+        return False
+
+    data = {}
+    if source:
+        try:
+            data = {'source': source, 'renditions': generate_renditions(source)}
+        except (OSError, Image.DecompressionBombError):
+            # Missing or unreadable upload: templates fall back to the original
+            data = {'source': source, 'renditions': []}
+    delete_renditions(
+        {'renditions': [r for r in stored.get('renditions', []) if r not in data.get('renditions', [])]}
+    )
+    setattr(instance, renditions_field(field_name), data)
+    type(instance).objects.filter(pk=instance.pk).update(**{renditions_field(field_name): data})
+    return True
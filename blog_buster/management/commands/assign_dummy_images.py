@@ -1,12 +1,70 @@
+import os
 import random
+import time
+from functools import lru_cache
 from io import BytesIO
 
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db.models import Q
 from django.utils.text import slugify
 from PIL import Image, ImageDraw, ImageFont
 
+from blog_buster import cache, page_cache
+from blog_buster.images import generate_renditions
 from blog_buster.models import Post
+from blog_buster.parallel import run_parallel
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    # Loaded once per worker process rather than once per image
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+def _generate_image(title):
+    width, height = 1200, 800
+    base_colors = [
+        (0, 102, 204),
+        (15, 23, 42),
+        (0, 168, 232),
+        (34, 197, 94),
+        (234, 179, 8),
+    ]
+    color = random.choice(base_colors)
+
+    image = Image.new("RGB", (width, height), color)
+    draw = ImageDraw.Draw(image)
+
+    accent = tuple(min(255, c + 40) for c in color)
+    draw.rectangle([0, height - 200, width, height], fill=accent)
+
+    font = _font(72)
+    text = title[:60]
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    text_x = (width - text_width) / 2
+    text_y = (height - text_height) / 2
+
+    draw.text((text_x, text_y), text, fill=(255, 255, 255), font=font)
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return ContentFile(buffer.getvalue())
+
+
+def _attach(task):
+    """Render and store one post's image; runs in a worker process"""
+    post_id, title = task
+    filename = f"{slugify(title) or f'post-{post_id}'}.jpg"
+    field = Post._meta.get_field('featured_image')
+    name = default_storage.save(field.generate_filename(None, filename), _generate_image(title))
+    return post_id, title, name, {'source': name, 'renditions': generate_renditions(name)}
 
 
 class Command(BaseCommand):
@@ -19,60 +77,52 @@ class Command(BaseCommand):
             default=None,
             help='Maximum number of posts to update',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of rendering processes (1 renders in this process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to update per bulk UPDATE',
+        )
 
     def handle(self, *args, **options):
         limit = options.get('limit')
-        posts = Post.objects.filter(featured_image='') | Post.objects.filter(featured_image__isnull=True)
+        posts = (
+            Post.objects.filter(Q(featured_image='') | Q(featured_image__isnull=True))
+            .order_by('id')
+            .values_list('id', 'title')
+        )
         if limit:
             posts = posts[:limit]
-
-        updated = 0
-        for post in posts:
-            image_file = self._generate_image(post.title)
-            filename = f"{slugify(post.title)}.jpg" or f"post-{post.id}.jpg"
-            post.featured_image.save(filename, image_file, save=True)
-            updated += 1
-            self.stdout.write(self.style.SUCCESS(f"Attached dummy image to '{post.title}'"))
-
-        if updated == 0:
+        tasks = list(posts)
+        if not tasks:
             self.stdout.write(self.style.WARNING("All posts already have featured images."))
-        else:
-            self.stdout.write(self.style.SUCCESS(f"Dummy images added to {updated} post(s)."))
-
-    def _generate_image(self, title):
-        width, height = 1200, 800
-        base_colors = [
-            (0, 102, 204),
-            (15, 23, 42),
-            (0, 168, 232),
-            (34, 197, 94),
-            (234, 179, 8),
-        ]
-        color = random.choice(base_colors)
-
-        image = Image.new("RGB", (width, height), color)
-        draw = ImageDraw.Draw(image)
-
-        accent = tuple(min(255, c + 40) for c in color)
-        draw.rectangle([0, height - 200, width, height], fill=accent)
-
-        font_size = 72
-        try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except IOError:
-            font = ImageFont.load_default()
-
-        text = title[:60]
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        text_x = (width - text_width) / 2
-        text_y = (height - text_height) / 2
-
-        draw.text((text_x, text_y), text, fill=(255, 255, 255), font=font)
-
-        buffer = BytesIO()
-        image.save(buffer, format="JPEG", quality=85)
-        buffer.seek(0)
-        return ContentFile(buffer.read())
+            return
 
+        started = time.monotonic()
+        updated = 0
+        batch = []
+        for post_id, title, name, renditions in run_parallel(_attach, tasks, options['workers']):
+            batch.append(Post(id=post_id, featured_image=name, featured_image_renditions=renditions))
+            if options['verbosity'] > 1:
+                self.stdout.write(self.style.SUCCESS(f"Attached dummy image to '{title}'"))
+            if len(batch) >= options['batch_size']:
+                updated += self._write(batch)
+                batch = []
+        updated += self._write(batch)
+
+        cache.bump_version()
+        page_cache.purge(page_cache.tag(Post))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Dummy images added to {updated} post(s) in {elapsed:.1f}s ({updated / elapsed:.1f} images/s)."
+        ))
+
+    def _write(self, batch):
+        Post.objects.bulk_update(batch, ['featured_image', 'featured_image_renditions'])
+        return len(batch)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from blog_buster.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute stored word counts and reading times for existing posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of posts to load and update per transaction',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+
+        updated = 0
+        low = 0
+        while low < last_id:
+            with transaction.atomic():
+                posts = list(
+                    Post.objects.filter(id__gt=low)
+                    .order_by('id')
+                    .only('id', 'content', 'word_count', 'reading_time')[:chunk_size]
+                )
+                if not posts:
+                    break
+                changed = []
+                for post in posts:
+                    stats = (post.word_count, post.reading_time)
+                    post.update_reading_stats()
+                    if (post.word_count, post.reading_time) != stats:
+                        changed.append(post)
+                Post.objects.bulk_update(changed, ['word_count', 'reading_time'])
+            updated += len(changed)
+            low = posts[-1].id
+
+        self.stdout.write(self.style.SUCCESS(f"Updated reading stats for {updated} post(s)."))
@@ -0,0 +1,76 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog_buster import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server over HTTP and report p50/p90/p99 latency per route. "
+        "Run it before and after a change against the same database to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='Server to test, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument(
+            '--bust-cache',
+            action='store_true',
+            help='Add a unique query parameter per request so the full-page cache never answers',
+        )
+        parser.add_argument('--label', default='', help='Name for this run in the report, e.g. before or after')
+        parser.add_argument('--output', default=None, help='Write the JSON report to this path')
+        parser.add_argument('--compare', default=None, help='Print deltas against an earlier JSON report')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        routes = {}
+        for route, url in benchmark.sample_urls():
+            if url is None:
+                continue
+            result = benchmark.load_test(
+                options['base_url'], url, options['requests'], options['concurrency'], options['bust_cache']
+            )
+            routes[route] = {'url': url, **result}
+            self.stdout.write(
+                f"{route:<24} p50 {result['p50_ms']:>8.1f}ms  p90 {result['p90_ms']:>8.1f}ms  "
+                f"p99 {result['p99_ms']:>8.1f}ms  {result['rps']:>7.1f} req/s  {result['errors']} error(s)"
+            )
+        if not routes:
+            raise CommandError("No routes to test; load a dataset first.")
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'label': options['label'],
+            'base_url': options['base_url'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'bust_cache': options['bust_cache'],
+            'routes': routes,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare']) as handle:
+                self._compare(json.load(handle), report)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Tested {len(routes)} route(s) in {elapsed:.1f}s."))
+
+    def _compare(self, previous, report):
+        label = previous.get('label') or 'previous'
+        self.stdout.write(f"Against {label}:")
+        for route, entry in report['routes'].items():
+            before = previous.get('routes', {}).get(route)
+            if before is None:
+                continue
+            deltas = [
+                f"{key[:-3]} {entry[key] - before[key]:+.1f}ms ({entry[key] / before[key] - 1:+.0%})"
+                if before[key] else f"{key[:-3]} {entry[key] - before[key]:+.1f}ms"
+                for key in ('p50_ms', 'p99_ms')
+            ]
+            self.stdout.write(f"{route:<24} " + "  ".join(deltas))
@@ -0,0 +1,128 @@
+import json
+import logging
+import platform
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from blog_buster import benchmark, cache
+from blog_buster.models import Post, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure queries, SQL time, render time and wall time for every public route and check "
+        "query budgets. Clears both cache tiers before each cold request, so run it against a "
+        "benchmark database such as one built by generate_load_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Requests per route and mode; timings are medians',
+        )
+        parser.add_argument('--output', default=None, help='Write the JSON report to this path')
+        parser.add_argument('--compare', default=None, help='Print deltas against an earlier JSON report')
+        parser.add_argument('--budgets', default=benchmark.BUDGETS_PATH, help='Query budget file')
+        parser.add_argument(
+            '--update-budgets',
+            action='store_true',
+            help='Rewrite the budget file with the measured query counts instead of checking them',
+        )
+        parser.add_argument('--host', default='localhost', help='Host name to send requests to')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        client = Client(SERVER_NAME=options['host'])
+        started = time.monotonic()
+
+        # Failing routes are reported by status; their tracebacks would drown the table
+        logging.getLogger('django.request').disabled = True
+        # Production buffers views in Redis; within this one process the default cache stands in
+        buffer_cache = getattr(settings, 'BLOG_BUSTER_VIEW_BUFFER_CACHE', None) or 'default'
+        with override_settings(BLOG_BUSTER_VIEW_BUFFER_CACHE=buffer_cache):
+            routes = self._measure(client, repeat)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'dataset': {'posts': Post.objects.count(), 'tags': Tag.objects.count()},
+            'repeat': repeat,
+            'routes': routes,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare']) as handle:
+                self._compare(json.load(handle), report)
+
+        elapsed = time.monotonic() - started
+        if options['update_budgets']:
+            budgets = {
+                route: {mode: entry[mode]['queries'] for mode in benchmark.MODES}
+                for route, entry in sorted(routes.items())
+                if entry['cold']['status'] == 200
+            }
+            with open(options['budgets'], 'w') as handle:
+                json.dump(budgets, handle, indent=2)
+                handle.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote budgets for {len(budgets)} route(s) in {elapsed:.1f}s."))
+            return
+
+        budgets = benchmark.load_budgets(options['budgets'])
+        for route in sorted(set(routes) - set(budgets)):
+            self.stdout.write(self.style.WARNING(f"{route}: no query budget"))
+        failures = list(benchmark.over_budget(routes, budgets))
+        errors = [route for route, entry in routes.items() if route in budgets and entry['cold']['status'] != 200]
+        if failures or errors:
+            lines = [f"{route} ({mode}): {queries} queries, budget {budget}" for route, mode, queries, budget in failures]
+            lines += [f"{route}: {routes[route]['cold']['status']}" for route in errors]
+            raise CommandError("Benchmark failed:\n  " + "\n  ".join(lines))
+        self.stdout.write(self.style.SUCCESS(f"{len(routes)} route(s) within budget in {elapsed:.1f}s."))
+
+    def _measure(self, client, repeat):
+        routes = {}
+        for route, url in benchmark.sample_urls():
+            if url is None:
+                self.stdout.write(self.style.WARNING(f"{route}: skipped, no data to sample"))
+                continue
+            cold = []
+            for _ in range(repeat):
+                cache.clear()
+                cold.append(benchmark.measure(client, url))
+            warm = [benchmark.measure(client, url) for _ in range(repeat)]
+            routes[route] = {
+                'url': url,
+                'cold': benchmark.summarize(cold),
+                'warm': benchmark.summarize(warm),
+            }
+            self._print(route, routes[route])
+        return routes
+
+    def _print(self, route, entry):
+        parts = [
+            f"{mode} {entry[mode]['queries']}q sql {entry[mode]['sql_ms']}ms "
+            f"render {entry[mode]['render_ms']}ms wall {entry[mode]['wall_ms']}ms"
+            for mode in benchmark.MODES
+        ]
+        self.stdout.write(f"{route:<24} {entry['cold']['status']}  " + " | ".join(parts))
+
+    def _compare(self, previous, report):
+        for route, entry in report['routes'].items():
+            before = previous.get('routes', {}).get(route)
+            if before is None:
+                continue
+            deltas = []
+            for mode in benchmark.MODES:
+                queries = entry[mode]['queries'] - before[mode]['queries']
+                wall = entry[mode]['wall_ms'] - before[mode]['wall_ms']
+                deltas.append(f"{mode} {queries:+d}q {wall:+.1f}ms")
+            self.stdout.write(f"{route:<24} " + " | ".join(deltas))
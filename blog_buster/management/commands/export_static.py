@@ -0,0 +1,79 @@
+import json
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog_buster.parallel import run_parallel
+from blog_buster.static_export import MANIFEST_NAME, export_page, output_path, public_urls
+
+
+def _export(task):
+    return export_page(*task)
+
+
+class Command(BaseCommand):
+    help = "Pre-render every public page to static HTML, re-rendering only pages that changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory to write the pages and manifest to')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of rendering processes (1 renders in this process)',
+        )
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='Host name used for absolute URLs in the rendered pages',
+        )
+        parser.add_argument('--secure', action='store_true', help='Render absolute URLs with https')
+        parser.add_argument('--force', action='store_true', help='Re-render every page, ignoring the manifest')
+
+    def handle(self, *args, **options):
+        output_dir = os.path.abspath(options['output_dir'])
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        previous = {}
+        if os.path.exists(manifest_path) and not options['force']:
+            with open(manifest_path) as handle:
+                previous = json.load(handle).get('pages', {})
+
+        started = time.monotonic()
+        urls = list(dict.fromkeys(public_urls()))
+        tasks = [
+            (url, output_dir, previous.get(url), options['host'], options['secure'])
+            for url in urls
+        ]
+        results = run_parallel(_export, tasks, options['workers'])
+
+        pages = {}
+        counts = {'rendered': 0, 'unchanged': 0, 'failed': 0}
+        for url, outcome, etag, digest in results:
+            if outcome in ('rendered', 'unchanged'):
+                counts[outcome] += 1
+                pages[url] = {'path': output_path(url), 'etag': etag, 'sha256': digest}
+            else:
+                counts['failed'] += 1
+                self.stderr.write(self.style.WARNING(f"{url} not exported ({outcome})."))
+
+        removed = 0
+        for url, entry in previous.items():
+            if url not in pages:
+                path = os.path.join(output_dir, entry['path'])
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+
+        os.makedirs(output_dir, exist_ok=True)
+        with open(manifest_path, 'w') as handle:
+            json.dump({'generated_at': timezone.now().isoformat(), 'pages': pages}, handle, indent=1, sort_keys=True)
+
+        elapsed = time.monotonic() - started
+        if counts['failed'] and not pages:
+            raise CommandError("No pages could be exported.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {len(urls)} page(s) in {elapsed:.1f}s ({len(urls) / elapsed:.1f} pages/s): "
+            f"{counts['rendered']} rendered, {counts['unchanged']} unchanged, "
+            f"{counts['failed']} failed, {removed} removed."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog_buster.counters import flush_views
+
+
+class Command(BaseCommand):
+    help = "Apply buffered post views to Post.views in batched updates."
+
+    def handle(self, *args, **options):
+        flushed = flush_views()
+        if flushed:
+            self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} buffered view(s)."))
+        else:
+            self.stdout.write(self.style.WARNING("No buffered views to flush."))
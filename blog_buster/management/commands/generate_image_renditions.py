@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from blog_buster import cache, page_cache
+from blog_buster.images import IMAGE_FIELDS, refresh_renditions
+from blog_buster.parallel import run_parallel
+
+
+def _refresh(task):
+    model_label, pk, field_name, force = task
+    instance = apps.get_model(model_label).objects.get(pk=pk)
+    return refresh_renditions(instance, field_name, force=force)
+
+
+class Command(BaseCommand):
+    help = "Generate responsive renditions for existing featured, hero and avatar images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of resizing processes (1 resizes in this process)',
+        )
+        parser.add_argument('--force', action='store_true', help='Regenerate renditions that are up to date')
+
+    def handle(self, *args, **options):
+        tasks = []
+        for model, field_name in IMAGE_FIELDS:
+            with_image = model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+            for pk in with_image.values_list('pk', flat=True):
+                tasks.append((model._meta.label, pk, field_name, options['force']))
+
+        started = time.monotonic()
+        refreshed = sum(run_parallel(_refresh, tasks, options['workers']))
+        elapsed = time.monotonic() - started
+        if refreshed:
+            cache.bump_version()
+            page_cache.purge(*[page_cache.tag(model) for model, _ in IMAGE_FIELDS])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed renditions for {refreshed} of {len(tasks)} image(s) in {elapsed:.1f}s "
+            f"({len(tasks) / elapsed if elapsed else 0:.1f} images/s)."
+        ))
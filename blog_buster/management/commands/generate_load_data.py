@@ -0,0 +1,365 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from blog_buster import cache
+from blog_buster.models import (
+    Post,
+    Category,
+    Tag,
+    BuyingGuide,
+    GuidePick,
+    ProductReview,
+    ReviewScore,
+    HowToSeries,
+    HowToStep,
+)
+from blog_buster.post_counts import refresh_category_counts, refresh_tag_counts
+
+WORDS = (
+    "router wireless battery screen laptop phone tablet update settings privacy app cloud backup "
+    "storage streaming speaker headphones camera charger cable bluetooth network password account "
+    "browser extension keyboard monitor printer driver firmware security malware vpn email calendar "
+    "notification widget shortcut gesture display brightness performance memory processor upgrade "
+    "install restart reset connect pair sync share download upload configure enable disable choose "
+    "quickly easily safely usually simply every most best new old fast slow smart simple common"
+).split()
+TOPICS = (
+    "Wi-Fi", "Android", "iPhone", "Windows", "Mac", "Chromebook", "Smart TV", "Router",
+    "Headphones", "Smartwatch", "Gmail", "Printer", "Streaming", "Smart Home", "Password Manager",
+)
+TITLE_TEMPLATES = (
+    "How to Fix {topic} {word} Problems",
+    "The Best {topic} {word} Settings to Change Today",
+    "{count} {topic} Tips Editors Actually Use",
+    "Why Your {topic} Keeps Dropping {word}",
+    "{topic} vs. {other}: Which {word} Is Right for You?",
+)
+VERDICTS = ("Best Overall", "Best Budget", "Best Premium", "Best for Travel", "Best for Gaming", "Runner-Up")
+SCORE_LABELS = ("Design", "Performance", "Battery", "Value", "Features", "Ease of Use")
+PARAGRAPH_POOL_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Generate a large, reproducible synthetic dataset for load and capacity testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000, help='Number of posts to create')
+        parser.add_argument('--tags', type=int, default=1000, help='Number of tags to create')
+        parser.add_argument('--categories', type=int, default=25, help='Number of categories to create')
+        parser.add_argument('--authors', type=int, default=50, help='Number of author accounts to create')
+        parser.add_argument(
+            '--tags-per-post',
+            type=int,
+            default=5,
+            help='Maximum tags per post; popular tags are drawn more often',
+        )
+        parser.add_argument('--guides', type=int, default=None, help='Buying guides to create (default posts/100)')
+        parser.add_argument('--reviews', type=int, default=None, help='Product reviews to create (default posts/100)')
+        parser.add_argument('--howtos', type=int, default=None, help='How-to series to create (default posts/100)')
+        parser.add_argument(
+            '--paragraphs',
+            type=int,
+            default=8,
+            help='Maximum paragraphs of generated content per post',
+        )
+        parser.add_argument('--days', type=int, default=3 * 365, help='Spread publish dates over this many days')
+        parser.add_argument('--draft-ratio', type=float, default=0.05, help='Fraction of posts left as drafts')
+        parser.add_argument(
+            '--zipf-exponent',
+            type=float,
+            default=1.1,
+            help='Exponent of the rank/frequency distribution used for views and tag popularity',
+        )
+        parser.add_argument('--max-views', type=int, default=2000000, help='Views of the most popular post')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed builds the same data')
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Prefix for generated names and slugs, so several datasets can coexist',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of rows to insert per bulk_create and transaction',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.label = f"{options['prefix']}-{options['seed']}"
+        if Post.objects.filter(slug__startswith=f'{self.label}-').exists():
+            raise CommandError(
+                f"Posts prefixed '{self.label}-' already exist; choose another --seed or --prefix."
+            )
+        for name in ('guides', 'reviews', 'howtos'):
+            if options[name] is None:
+                options[name] = max(1, options['posts'] // 100)
+
+        started = time.monotonic()
+        self.now = timezone.now()
+        self.paragraphs = [self._paragraph() for _ in range(PARAGRAPH_POOL_SIZE)]
+
+        author_ids = self._create_authors(options['authors'])
+        category_ids = self._create_categories(options['categories'])
+        tag_ids = self._create_tags(options['tags'])
+        posts, links = self._create_posts(options, author_ids, category_ids, tag_ids)
+        guides, picks = self._create_guides(options['guides'], category_ids)
+        reviews, scores = self._create_reviews(options['reviews'])
+        howtos, steps = self._create_howtos(options['howtos'])
+
+        refresh_category_counts(category_ids)
+        refresh_tag_counts(tag_ids)
+        cache.bump_version()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(author_ids)} authors, {len(category_ids)} categories, {len(tag_ids)} tags, "
+                f"{posts} posts ({links} tag links), {guides} guides ({picks} picks), "
+                f"{reviews} reviews ({scores} scores) and {howtos} how-tos ({steps} steps) "
+                f"in {elapsed:.1f}s ({posts / elapsed:.0f} posts/s)."
+            )
+        )
+        self.stdout.write(
+            self.style.WARNING(
+                "Bulk inserts skip signal handlers; run rebuild_search_index and rebuild_related_posts "
+                "to index the new posts."
+            )
+        )
+
+    def _bulk_create(self, model, objects):
+        """Insert ``objects`` in chunks; returns the created objects with their ids"""
+        created = []
+        iterator = iter(objects)
+        while chunk := list(itertools.islice(iterator, self.chunk_size)):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(chunk))
+        return created
+
+    def _zipf_cum_weights(self, count, exponent):
+        return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+    def _words(self, count):
+        return ' '.join(self.rng.choices(WORDS, k=count))
+
+    def _sentence(self):
+        return self._words(self.rng.randint(8, 20)).capitalize() + '.'
+
+    def _paragraph(self):
+        return ' '.join(self._sentence() for _ in range(self.rng.randint(3, 6)))
+
+    def _title(self):
+        topic, other = self.rng.sample(TOPICS, 2)
+        return self.rng.choice(TITLE_TEMPLATES).format(
+            topic=topic, other=other, word=self.rng.choice(WORDS).title(), count=self.rng.randint(3, 15)
+        )
+
+    def _past(self, days):
+        return self.now - timedelta(seconds=self.rng.randrange(max(1, days * 86400)))
+
+    def _create_authors(self, count):
+        User = get_user_model()
+        password = make_password(None)
+        users = self._bulk_create(
+            User,
+            (
+                User(
+                    username=f'{self.label}-author-{n}',
+                    first_name=self.rng.choice(TOPICS).split()[0],
+                    last_name=f'Writer {n}',
+                    email=f'{self.label}-author-{n}@example.com',
+                    password=password,
+                )
+                for n in range(count)
+            ),
+        )
+        return self._ids(User, users, 'username')
+
+    def _create_categories(self, count):
+        categories = self._bulk_create(
+            Category,
+            (
+                Category(
+                    name=f'{self.label} Category {n}',
+                    slug=f'{self.label}-category-{n}',
+                    description=self._sentence(),
+                )
+                for n in range(count)
+            ),
+        )
+        return self._ids(Category, categories, 'slug')
+
+    def _create_tags(self, count):
+        tags = self._bulk_create(
+            Tag,
+            (Tag(name=f'{self.label} Tag {n}', slug=f'{self.label}-tag-{n}') for n in range(count)),
+        )
+        return self._ids(Tag, tags, 'slug')
+
+    def _ids(self, model, objects, unique_field):
+        """Primary keys of bulk-created rows, for backends that do not return them"""
+        if all(obj.pk is not None for obj in objects):
+            return [obj.pk for obj in objects]
+        values = [getattr(obj, unique_field) for obj in objects]
+        ids = {}
+        for start in range(0, len(values), self.chunk_size):
+            lookup = {f'{unique_field}__in': values[start:start + self.chunk_size]}
+            ids.update(model.objects.filter(**lookup).values_list(unique_field, 'pk'))
+        return [ids[value] for value in values]
+
+    def _create_posts(self, options, author_ids, category_ids, tag_ids):
+        count = options['posts']
+        exponent = options['zipf_exponent']
+        # Each post gets a distinct popularity rank, so views follow a Zipf curve
+        ranks = list(range(1, count + 1))
+        self.rng.shuffle(ranks)
+        tag_weights = self._zipf_cum_weights(len(tag_ids), exponent) if tag_ids else []
+        Link = Post.tags.through
+
+        created = links = 0
+        for start in range(0, count, self.chunk_size):
+            posts = []
+            post_tags = []
+            for n in range(start, min(count, start + self.chunk_size)):
+                draft = self.rng.random() < options['draft_ratio']
+                paragraphs = self.rng.choices(self.paragraphs, k=self.rng.randint(1, options['paragraphs']))
+                post = Post(
+                    title=self._title(),
+                    slug=f'{self.label}-post-{n}',
+                    author_id=self.rng.choice(author_ids),
+                    category_id=self.rng.choice(category_ids) if category_ids else None,
+                    excerpt=self._sentence()[:300],
+                    content='\n\n'.join(paragraphs),
+                    status='draft' if draft else 'published',
+                    featured=not draft and self.rng.random() < 0.01,
+                    views=0 if draft else int(options['max_views'] / ranks[n] ** exponent),
+                    published_at=None if draft else self._past(options['days']),
+                )
+                post.update_reading_stats()
+                posts.append(post)
+                # Drawn with the post, so the data does not depend on --chunk-size
+                fan_out = self.rng.randint(0, options['tags_per_post']) if tag_ids else 0
+                post_tags.append(set(self.rng.choices(tag_ids, cum_weights=tag_weights, k=fan_out)))
+
+            with transaction.atomic():
+                posts = Post.objects.bulk_create(posts)
+                post_ids = self._ids(Post, posts, 'slug')
+                rows = [
+                    Link(post_id=post_id, tag_id=tag_id)
+                    for post_id, tags in zip(post_ids, post_tags)
+                    for tag_id in tags
+                ]
+                Link.objects.bulk_create(rows)
+            created += len(posts)
+            links += len(rows)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Created {created}/{count} posts")
+        return created, links
+
+    def _create_guides(self, count, category_ids):
+        guides = self._bulk_create(
+            BuyingGuide,
+            (
+                BuyingGuide(
+                    title=f'The Best {self.rng.choice(TOPICS)} Picks',
+                    slug=f'{self.label}-guide-{n}',
+                    summary=self._paragraph(),
+                    category_id=self.rng.choice(category_ids) if category_ids else None,
+                    hero_quote=self._sentence()[:200],
+                    published=True,
+                    featured=self.rng.random() < 0.05,
+                )
+                for n in range(count)
+            ),
+        )
+        picks = self._bulk_create(
+            GuidePick,
+            (
+                GuidePick(
+                    buying_guide_id=guide_id,
+                    title=f'{self.rng.choice(TOPICS)} {self._words(2).title()}',
+                    verdict=verdict,
+                    tagline=self._sentence()[:200],
+                    pros='\n'.join(self._words(4) for _ in range(3)),
+                    cons='\n'.join(self._words(4) for _ in range(2)),
+                    price_range=f'${self.rng.randint(20, 400)}',
+                    rating=self.rng.randint(3, 5),
+                    sort_order=order,
+                )
+                for guide_id in self._ids(BuyingGuide, guides, 'slug')
+                for order, verdict in enumerate(self.rng.sample(VERDICTS, self.rng.randint(3, len(VERDICTS))))
+            ),
+        )
+        return len(guides), len(picks)
+
+    def _create_reviews(self, count):
+        reviews = self._bulk_create(
+            ProductReview,
+            (
+                ProductReview(
+                    product_name=f'{self.rng.choice(TOPICS)} {self._words(2).title()}',
+                    slug=f'{self.label}-review-{n}',
+                    summary=self._paragraph(),
+                    verdict=self._sentence()[:200],
+                    overall_score=self.rng.randint(25, 50) / 10,
+                    pros='\n'.join(self._words(4) for _ in range(3)),
+                    cons='\n'.join(self._words(4) for _ in range(2)),
+                    methodology=self._paragraph(),
+                    published=True,
+                    featured=self.rng.random() < 0.05,
+                    published_at=self._past(365),
+                )
+                for n in range(count)
+            ),
+        )
+        scores = self._bulk_create(
+            ReviewScore,
+            (
+                ReviewScore(review_id=review_id, label=label, score=self.rng.randint(50, 100) / 10)
+                for review_id in self._ids(ProductReview, reviews, 'slug')
+                for label in self.rng.sample(SCORE_LABELS, self.rng.randint(4, len(SCORE_LABELS)))
+            ),
+        )
+        return len(reviews), len(scores)
+
+    def _create_howtos(self, count):
+        series = self._bulk_create(
+            HowToSeries,
+            (
+                HowToSeries(
+                    title=self._title(),
+                    slug=f'{self.label}-howto-{n}',
+                    intro=self._paragraph(),
+                    difficulty=self.rng.choice(HowToSeries.LEVEL_CHOICES)[0],
+                    estimated_time=f'{self.rng.randint(5, 60)} minutes',
+                    prerequisites='\n'.join(self._words(3) for _ in range(2)),
+                    published=True,
+                    featured=self.rng.random() < 0.05,
+                )
+                for n in range(count)
+            ),
+        )
+        steps = self._bulk_create(
+            HowToStep,
+            (
+                HowToStep(
+                    series_id=series_id,
+                    step_number=number,
+                    title=self._words(4).capitalize(),
+                    instructions=self._paragraph(),
+                    tip=self._sentence()[:200] if self.rng.random() < 0.3 else '',
+                )
+                for series_id in self._ids(HowToSeries, series, 'slug')
+                for number in range(1, self.rng.randint(4, 10) + 1)
+            ),
+        )
+        return len(series), len(steps)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog_buster.related import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed related-posts table for every published post."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts to write per transaction',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = rebuild_all(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt related posts for {processed} post(s) in {elapsed:.1f}s.")
+        )
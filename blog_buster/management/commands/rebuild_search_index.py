@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max, Min
+
+from blog_buster.models import Post
+from blog_buster.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the post full-text search index in id-range chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of post ids to reindex per transaction',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias holding the index',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        using = options['database']
+        backend = get_backend(using)
+        backend.setup()
+
+        bounds = Post.objects.using(using).aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write(self.style.WARNING("No posts to index."))
+            return
+
+        started = time.monotonic()
+        chunks = 0
+        for low in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            with transaction.atomic(using=using):
+                backend.reindex_range(low, low + chunk_size)
+            chunks += 1
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reindexed posts {bounds['low']}-{bounds['high']} in {chunks} chunk(s) "
+                f"using {type(backend).__name__} ({elapsed:.1f}s)."
+            )
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blog_buster import cache
+from blog_buster.post_counts import refresh_category_counts, refresh_tag_counts
+
+
+class Command(BaseCommand):
+    help = "Recount published posts per category and tag, fixing any drift."
+
+    def handle(self, *args, **options):
+        categories = refresh_category_counts()
+        tags = refresh_tag_counts()
+        if categories or tags:
+            cache.bump_version()
+            self.stdout.write(self.style.WARNING(
+                f"Corrected counts for {categories} categor{'y' if categories == 1 else 'ies'} and {tags} tag(s)."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Published post counts are up to date."))
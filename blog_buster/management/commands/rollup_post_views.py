@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blog_buster.analytics import compact_buckets, rebuild_leaderboards
+from blog_buster.counters import flush_views
+
+
+class Command(BaseCommand):
+    help = "Compact old view buckets and rebuild the popular-post leaderboards."
+
+    def handle(self, *args, **options):
+        flushed = flush_views()
+        removed = compact_buckets()
+        changed = rebuild_leaderboards()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Flushed {flushed} view(s), compacted {removed} bucket(s), "
+                f"leaderboards {'updated' if changed else 'unchanged'}."
+            )
+        )
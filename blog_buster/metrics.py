@@ -0,0 +1,104 @@
+"""Prometheus metrics for requests, queries, rendering and caches.
+
+``MetricsMiddleware`` (in :mod:`blog_buster.middleware`) observes request
+latency and query counts labelled by URL name, ``DjangoTemplates`` below
+times top-level template renders, and the cache layers count their hits and
+misses. :func:`metrics_view` serves everything in the Prometheus text format.
+
+Under a multi-worker server set ``PROMETHEUS_MULTIPROC_DIR`` to an empty,
+writable directory before the workers start: each process then writes its
+samples to memory-mapped files there and the endpoint sums them, so any
+worker answers for all of them. ``gunicorn.conf.py`` clears the directory
+on startup.
+"""
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template.backends import django as django_backend
+from django.template.exceptions import TemplateDoesNotExist
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 100, 200, 500)
+
+REQUEST_LATENCY = Histogram(
+    'blog_buster_request_duration_seconds',
+    'Time to produce a response, by URL name',
+    ['route', 'method'],
+)
+REQUEST_QUERIES = Histogram(
+    'blog_buster_request_queries',
+    'Database queries per request, by URL name',
+    ['route'],
+    buckets=QUERY_BUCKETS,
+)
+WIDGET_CONTEXT_BUILD = Histogram(
+    'blog_buster_widget_context_build_seconds',
+    'Time to build the shared widget context on a cache miss',
+)
+TEMPLATE_RENDER = Histogram(
+    'blog_buster_template_render_seconds',
+    'Time to render a top-level template, including its includes',
+    ['template'],
+)
+CACHE_REQUESTS = Counter(
+    'blog_buster_cache_requests_total',
+    'Cache lookups by cache layer and result',
+    ['cache', 'result'],
+)
+
+
+def record_cache(name, hit, count=1):
+    """Count ``count`` lookups in the cache layer ``name``"""
+    if count:
+        CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc(count)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with TEMPLATE_RENDER.labels(self.origin.template_name or '<string>').time():
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing each top-level render"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Prometheus exposition, guarded by ``BLOG_BUSTER_METRICS_TOKEN``
+
+    Without a token the endpoint only exists while ``DEBUG`` is on.
+    """
+    token = getattr(settings, 'BLOG_BUSTER_METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,190 @@
+"""Request instrumentation middleware.
+
+``MetricsMiddleware`` feeds the Prometheus request metrics in
+:mod:`blog_buster.metrics` on every request. Both middlewares count queries
+through :mod:`blog_buster.query_observers`, which includes queries that page
+sections run on pool threads.
+
+Add ``blog_buster.middleware.QueryInstrumentationMiddleware`` to
+``MIDDLEWARE`` (near the top, so it sees queries made by later middleware)
+and set ``BLOG_BUSTER_SQL_SAMPLE_RATE`` to the fraction of requests to
+instrument; it defaults to 0, which makes the middleware a no-op. Sampled
+requests get a ``Server-Timing`` header and a JSON log line on the
+``blog_buster.sql`` logger. Queries are grouped by their parameterized SQL;
+a shape executed ``BLOG_BUSTER_SQL_REPEAT_THRESHOLD`` times or more is
+reported as a likely N+1 together with the template line and the first
+project frame that issued it. Stacks are only walked for shapes that reach
+the threshold, so a clean request pays one timer per query.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+
+from django.conf import settings
+
+from . import metrics, query_observers
+from .query_observers import observing
+
+logger = logging.getLogger('blog_buster.sql')
+
+# Frames from these trees are never reported as call sites
+_LIBRARY_PATHS = tuple({
+    os.path.dirname(os.path.dirname(__import__('django').__file__)),
+    *(sysconfig.get_path(name) for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')),
+})
+# Instrumentation frames between the query and the code that issued it
+_OWN_FILES = {__file__, query_observers.__file__}
+_TEMPLATE_RENDER = 'render_annotated'
+
+
+def _sample_rate():
+    return getattr(settings, 'BLOG_BUSTER_SQL_SAMPLE_RATE', 0)
+
+
+def _repeat_threshold():
+    return getattr(settings, 'BLOG_BUSTER_SQL_REPEAT_THRESHOLD', 3)
+
+
+def _skipped(filename):
+    return filename in _OWN_FILES or filename.startswith(_LIBRARY_PATHS)
+
+
+def call_sites(frame):
+    """``(template site, python site)`` for the code that led to ``frame``"""
+    template_site = python_site = None
+    while frame is not None and not (template_site and python_site):
+        code = frame.f_code
+        if template_site is None and code.co_name == _TEMPLATE_RENDER:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template_site = f'{origin.template_name}:{token.lineno}'
+        elif python_site is None and not _skipped(code.co_filename):
+            python_site = f'{os.path.relpath(code.co_filename)}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return template_site, python_site
+
+
+class QueryShape:
+    __slots__ = ('sql', 'count', 'duration', 'template_site', 'python_site')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.duration = 0.0
+        self.template_site = self.python_site = None
+
+
+class QueryRecorder:
+    """Query observer grouping queries by parameterized SQL"""
+
+    def __init__(self, repeat_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.shapes = {}
+        self.queries = 0
+        self.duration = 0.0
+        # Page sections record from several threads at once
+        self._lock = threading.Lock()
+
+    def record(self, sql, elapsed):
+        with self._lock:
+            shape = self.shapes.get(sql)
+            if shape is None:
+                shape = self.shapes[sql] = QueryShape(sql)
+            shape.count += 1
+            shape.duration += elapsed
+            self.queries += 1
+            self.duration += elapsed
+            flagged = shape.count == self.repeat_threshold
+        if flagged:
+            shape.template_site, shape.python_site = call_sites(sys._getframe(1))
+
+    def repeated(self):
+        shapes = [shape for shape in self.shapes.values() if shape.count >= self.repeat_threshold]
+        return sorted(shapes, key=lambda shape: shape.count, reverse=True)
+
+
+class QueryCounter:
+    """Query observer counting queries"""
+
+    def __init__(self):
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def record(self, sql, elapsed):
+        with self._lock:
+            self.queries += 1
+
+
+class ObservingMiddleware:
+    """Run the rest of the stack under a query observer
+
+    Subclasses implement ``observer(request)``, returning an observer or None
+    to skip the request, and ``finish(request, response, observer, elapsed)``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        observer = self.observer(request)
+        if observer is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with observing(observer):
+            response = self.get_response(request)
+        return self.finish(request, response, observer, time.perf_counter() - started)
+
+
+class QueryInstrumentationMiddleware(ObservingMiddleware):
+    def observer(self, request):
+        rate = _sample_rate()
+        if not rate or random.random() >= rate:
+            return None
+        return QueryRecorder(_repeat_threshold())
+
+    def finish(self, request, response, recorder, total):
+        repeated = recorder.repeated()
+        response.headers['Server-Timing'] = ', '.join([
+            f'sql;dur={recorder.duration * 1000:.1f};desc="{recorder.queries} queries"',
+            f'n1;desc="{len(repeated)} repeated shapes"',
+            f'app;dur={(total - recorder.duration) * 1000:.1f}',
+        ])
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.queries,
+            'sql_ms': round(recorder.duration * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'repeated': [
+                {
+                    'sql': shape.sql,
+                    'count': shape.count,
+                    'ms': round(shape.duration * 1000, 2),
+                    'template': shape.template_site,
+                    'python': shape.python_site,
+                }
+                for shape in repeated
+            ],
+        }
+        logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(record))
+        return response
+
+
+class MetricsMiddleware(ObservingMiddleware):
+    def observer(self, request):
+        return QueryCounter()
+
+    def finish(self, request, response, counter, elapsed):
+        match = request.resolver_match
+        route = (match.view_name if match else None) or 'unmatched'
+        metrics.REQUEST_LATENCY.labels(route, request.method).observe(elapsed)
+        metrics.REQUEST_QUERIES.labels(route).observe(counter.queries)
+        return response
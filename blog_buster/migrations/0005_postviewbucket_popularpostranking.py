@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_buster', '0004_sidebarwidget_relatedpostswidget_recentpostswidget_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularPostRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveSmallIntegerField(choices=[(7, 'Last 7 days'), (30, 'Last 30 days'), (90, 'Last 90 days')])),
+                ('rank', models.PositiveIntegerField()),
+                ('views', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popular_rankings', to='blog_buster.post')),
+            ],
+            options={
+                'ordering': ['window_days', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('window_days', 'rank'), name='unique_popular_post_rank')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily'), ('month', 'Monthly')], max_length=5)),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='blog_buster.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='blog_buster_granula_2af391_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'granularity', 'bucket_start'), name='unique_post_view_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from blog_buster.search import get_backend
+
+    backend = get_backend(schema_editor.connection.alias)
+    backend.setup()
+    Post = apps.get_model('blog_buster', 'Post')
+    last = Post.objects.using(schema_editor.connection.alias).order_by('-id').values_list('id', flat=True).first()
+    if last is not None:
+        backend.reindex_range(0, last + 1)
+
+
+def drop_search_index(apps, schema_editor):
+    from blog_buster.search import get_backend
+
+    get_backend(schema_editor.connection.alias).teardown()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_buster', '0005_postviewbucket_popularpostranking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:37
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_published_post_counts(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Category = apps.get_model('blog_buster', 'Category')
+    Tag = apps.get_model('blog_buster', 'Tag')
+    for model in (Category, Tag):
+        counted = (
+            model.objects.using(alias)
+            .filter(posts__status='published')
+            .annotate(total=Count('posts'))
+            .values_list('pk', 'total')
+        )
+        for pk, total in counted:
+            model.objects.using(alias).filter(pk=pk).update(published_post_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_buster', '0009_post_word_count_reading_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-published_post_count', 'name'], name='category_post_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-published_post_count', 'name'], name='tag_post_count_idx'),
+        ),
+        migrations.RunPython(fill_published_post_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_buster', '0011_updated_at_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorbiowidget',
+            name='avatar_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='featured_image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productreview',
+            name='hero_image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,97 @@
+import heapq
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+from django.utils import timezone
+
+# blog_buster.related scoring when this migration was written
+RELATED_POSTS_LIMIT = 20
+CANDIDATE_LIMIT = 500
+RECENT_CANDIDATES = 50
+TAG_WEIGHT = 0.6
+CATEGORY_WEIGHT = 0.3
+RECENCY_WEIGHT = 0.1
+RECENCY_HALF_LIFE_DAYS = 90
+CHUNK_SIZE = 1000
+
+_EPOCH = datetime.min.replace(tzinfo=dt_timezone.utc)
+
+
+def fill_related_posts(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Post = apps.get_model('blog_buster', 'Post')
+    RelatedPost = apps.get_model('blog_buster', 'RelatedPost')
+    now = timezone.now()
+
+    published = Post.objects.using(alias).filter(status='published')
+    posts = {
+        post_id: (category_id, published_at or _EPOCH, set())
+        for post_id, category_id, published_at in (
+            published.values_list('id', 'category_id', 'published_at').iterator(chunk_size=CHUNK_SIZE)
+        )
+    }
+    for post_id, tag_id in (
+        Post.tags.through.objects.using(alias).filter(post__status='published')
+        .values_list('post_id', 'tag_id').iterator(chunk_size=CHUNK_SIZE)
+    ):
+        posts[post_id][2].add(tag_id)
+
+    by_recency = sorted(posts, key=lambda post_id: posts[post_id][1], reverse=True)
+    by_tag = defaultdict(list)
+    by_category = defaultdict(list)
+    for post_id in by_recency:
+        category_id, _, tags = posts[post_id]
+        for tag_id in tags:
+            by_tag[tag_id].append(post_id)
+        by_category[category_id].append(post_id)
+
+    def score(post_id, candidate_id):
+        category_id, _, tags = posts[post_id]
+        candidate_category_id, candidate_published_at, candidate_tags = posts[candidate_id]
+        shared = len(tags & candidate_tags)
+        union = len(tags | candidate_tags)
+        same_category = category_id is not None and category_id == candidate_category_id
+        age_days = max(0.0, (now - candidate_published_at).total_seconds() / 86400)
+        total = (
+            TAG_WEIGHT * (shared / union if union else 0.0)
+            + CATEGORY_WEIGHT * same_category
+            + RECENCY_WEIGHT * math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+        )
+        return total, shared, same_category
+
+    RelatedPost.objects.using(alias).all().delete()
+    rows = []
+    for post_id in by_recency:
+        category_id, _, tags = posts[post_id]
+        candidates = set(by_recency[:RECENT_CANDIDATES])
+        for tag_id in tags:
+            candidates.update(by_tag[tag_id][:CANDIDATE_LIMIT])
+        if category_id:
+            candidates.update(by_category[category_id][:CANDIDATE_LIMIT])
+        candidates.discard(post_id)
+        best = heapq.nlargest(
+            RELATED_POSTS_LIMIT,
+            ((score(post_id, candidate_id), candidate_id) for candidate_id in candidates),
+            key=lambda item: (item[0][0], item[1]),
+        )
+        rows.extend(
+            RelatedPost(post_id=post_id, related_id=related_id, score=total, shared_tags=shared, same_category=same)
+            for (total, shared, same), related_id in best
+        )
+        if len(rows) >= CHUNK_SIZE:
+            RelatedPost.objects.using(alias).bulk_create(rows)
+            rows = []
+    RelatedPost.objects.using(alias).bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_buster', '0012_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_related_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Post.WORDS_PER_MINUTE when this migration was written
+WORDS_PER_MINUTE = 200
+CHUNK_SIZE = 500
+
+
+def fill_reading_stats(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Post = apps.get_model('blog_buster', 'Post')
+    low = 0
+    while True:
+        posts = list(
+            Post.objects.using(alias).filter(id__gt=low)
+            .order_by('id')
+            .only('id', 'content')[:CHUNK_SIZE]
+        )
+        if not posts:
+            break
+        for post in posts:
+            post.word_count = len(post.content.split())
+            post.reading_time = max(1, round(post.word_count / WORDS_PER_MINUTE))
+        Post.objects.using(alias).bulk_update(posts, ['word_count', 'reading_time'])
+        low = posts[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_buster', '0013_backfill_related_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_reading_stats, migrations.RunPython.noop),
+    ]
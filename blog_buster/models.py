@@ -1,19 +1,27 @@
-from django.db import models
+import copy
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.text import slugify
 
+from . import cache
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True)
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-published_post_count', 'name'], name='category_post_count_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -30,10 +38,14 @@ class Category(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=50, unique=True, blank=True)
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-published_post_count', 'name'], name='tag_post_count_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -47,6 +59,68 @@ class Tag(models.Model):
         return reverse('tag_detail', kwargs={'slug': self.slug})
 
 
+class CardImage:
+    """Image reference exposing only ``url`` for card templates"""
+    __slots__ = ('url',)
+
+    def __init__(self, url):
+        self.url = url
+
+
+class PostCard:
+    """Lightweight, picklable stand-in for a Post in listing templates"""
+    __slots__ = (
+        'id', 'title', 'slug', 'excerpt', 'featured_image', 'featured_image_renditions',
+        'published_at', 'reading_time', 'views', 'category', 'author',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_post(cls, post):
+        deferred = post.get_deferred_fields()
+        return cls(
+            id=post.pk,
+            title=post.title,
+            slug=post.slug,
+            excerpt=None if 'excerpt' in deferred else post.excerpt,
+            featured_image=CardImage(post.featured_image.url) if post.featured_image else None,
+            featured_image_renditions=post.featured_image_renditions,
+            published_at=post.published_at,
+            reading_time=post.reading_time,
+            views=post.views,
+            category=post.category,
+            author=post.author,
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_absolute_url(self):
+        return reverse('post_detail', kwargs={'slug': self.slug})
+
+
+class PostQuerySet(models.QuerySet):
+    # Everything card templates render; never the article body
+    CARD_FIELDS = (
+        'title', 'slug', 'featured_image', 'featured_image_renditions', 'published_at', 'reading_time', 'views',
+        'category__name', 'category__slug',
+        'author__username', 'author__first_name', 'author__last_name',
+    )
+
+    def cards(self, excerpt=False):
+        """Project posts onto the fields listing cards need"""
+        fields = self.CARD_FIELDS + (('excerpt',) if excerpt else ())
+        return self.select_related('category', 'author').only(*fields)
+
+    def card_objects(self, excerpt=False):
+        """Evaluate the card projection into cacheable ``PostCard`` objects"""
+        return [PostCard.from_post(post) for post in self.cards(excerpt)]
+
+
 class Post(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -60,6 +134,7 @@ class Post(models.Model):
     tags = models.ManyToManyField(Tag, related_name='posts', blank=True)
     
     featured_image = models.ImageField(upload_to='blog_images/', blank=True, null=True)
+    featured_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     excerpt = models.TextField(max_length=300, help_text="Short description for preview")
     content = models.TextField()
     
@@ -67,15 +142,24 @@ class Post(models.Model):
     featured = models.BooleanField(default=False, help_text="Feature this post on homepage")
     
     views = models.PositiveIntegerField(default=0)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=1, editable=False, help_text="Estimated minutes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
 
+    WORDS_PER_MINUTE = 200
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-published_at', '-created_at']
         indexes = [
             models.Index(fields=['-published_at', 'status']),
             models.Index(fields=['slug']),
+            models.Index(fields=['status', '-published_at', '-id'], name='post_status_keyset_idx'),
+            models.Index(fields=['category', 'status', '-published_at', '-id'], name='post_category_keyset_idx'),
+            models.Index(fields=['status', 'updated_at'], name='post_status_updated_idx'),
         ]
 
     def __str__(self):
@@ -86,21 +170,33 @@ class Post(models.Model):
             self.slug = slugify(self.title)
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        # A full save of a post loaded without its content leaves the stats alone
+        if 'content' in (update_fields or ()) or (
+            update_fields is None and 'content' not in self.get_deferred_fields()
+        ):
+            self.update_reading_stats()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'word_count', 'reading_time'}
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('post_detail', kwargs={'slug': self.slug})
 
-    @property
-    def reading_time(self):
-        """Calculate estimated reading time in minutes"""
-        words_per_minute = 200
-        word_count = len(self.content.split())
-        return max(1, round(word_count / words_per_minute))
+    def update_reading_stats(self):
+        """Calculate word count and estimated reading time in minutes"""
+        self.word_count = len(self.content.split())
+        self.reading_time = max(1, round(self.word_count / self.WORDS_PER_MINUTE))
 
 
 class SingletonModel(models.Model):
-    """Base class to enforce single-row settings models."""
+    """Base class to enforce single-row settings models.
+
+    ``load()`` serves the row from a per-process copy that is reread only
+    after a save or delete, in any worker, bumps the model's cache version.
+    The row itself is created after ``migrate`` (see ``signals.create_singletons``),
+    never by a request.
+    """
 
     class Meta:
         abstract = True
@@ -108,11 +204,33 @@ class SingletonModel(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1
         super().save(*args, **kwargs)
+        transaction.on_commit(type(self).invalidate, using=kwargs.get('using') or self._state.db)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(type(self).invalidate, using=kwargs.get('using') or self._state.db)
+        return result
+
+    @classmethod
+    def cache_namespace(cls):
+        return f'singleton:{cls._meta.label_lower}'
+
+    @classmethod
+    def invalidate(cls):
+        """Make every process reread the row on its next ``load()``"""
+        cache.bump_version(cls.cache_namespace())
 
     @classmethod
     def load(cls):
-        obj, _ = cls.objects.get_or_create(pk=1)
-        return obj
+        """The settings row, or unsaved defaults if it has not been created yet"""
+        version = cache.get_version(cls.cache_namespace())
+        # Looked up on the class itself so subclasses never share an entry
+        loaded_version, obj = cls.__dict__.get('_loaded', (None, None))
+        if obj is None or loaded_version != version:
+            obj = cls.objects.filter(pk=1).first() or cls(pk=1)
+            cls._loaded = (version, obj)
+        # Callers may modify what they get; the process copy stays clean
+        return copy.copy(obj)
 
 
 class HomepageSettings(SingletonModel):
@@ -133,6 +251,7 @@ class HomepageSettings(SingletonModel):
     )
     newsletter_cta_label = models.CharField(max_length=80, default="Subscribe")
     newsletter_disclaimer = models.CharField(max_length=160, default="No spam. Unsubscribe anytime.")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Homepage Settings"
@@ -207,6 +326,7 @@ class ProductReview(models.Model):
     verdict = models.CharField(max_length=200)
     affiliate_url = models.URLField(blank=True)
     hero_image = models.ImageField(upload_to='review_images/', blank=True, null=True)
+    hero_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     overall_score = models.DecimalField(max_digits=3, decimal_places=1, default=4.0)
     pros = models.TextField(help_text="One per line")
     cons = models.TextField(help_text="One per line")
@@ -263,6 +383,7 @@ class HowToSeries(models.Model):
     published = models.BooleanField(default=False)
     featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -345,6 +466,7 @@ class AuthorBioWidget(models.Model):
     bio_text = models.TextField(help_text="Author biography text")
     show_social_links = models.BooleanField(default=True)
     avatar = models.ImageField(upload_to='author_avatars/', blank=True, null=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return "Author bio config"
@@ -403,3 +525,72 @@ class BuyingGuidesWidget(models.Model):
 
     def __str__(self):
         return f"Buying guides config ({self.guide_count} guides)"
+
+
+class PostViewBucket(models.Model):
+    """Per-post view rollup for one hour, day or month"""
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+        ('month', 'Monthly'),
+    ]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='view_buckets')
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'granularity', 'bucket_start'], name='unique_post_view_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} {self.granularity} {self.bucket_start:%Y-%m-%d %H:00}: {self.views}"
+
+
+class PopularPostRanking(models.Model):
+    """Pre-aggregated most-viewed leaderboard for a trailing window"""
+    WINDOW_CHOICES = [
+        (7, 'Last 7 days'),
+        (30, 'Last 30 days'),
+        (90, 'Last 90 days'),
+    ]
+
+    window_days = models.PositiveSmallIntegerField(choices=WINDOW_CHOICES)
+    rank = models.PositiveIntegerField()
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='popular_rankings')
+    views = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['window_days', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['window_days', 'rank'], name='unique_popular_post_rank'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} ({self.window_days}d): {self.post_id}"
+
+
+class RelatedPost(models.Model):
+    """Precomputed neighbour of a post, scored on tags, category and recency"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_from')
+    score = models.FloatField()
+    shared_tags = models.PositiveIntegerField(default=0)
+    same_category = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['post', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='unique_related_post'),
+        ]
+        indexes = [
+            models.Index(fields=['post', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.3f})"
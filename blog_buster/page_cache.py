@@ -0,0 +1,179 @@
+"""Full-page cache for public views with dependency-tagged purging.
+
+Views wrapped in :func:`cache_page` declare the tags their output depends on
+with :func:`depends_on`: ``post:12`` for one object, ``post`` for the set of
+published posts, and so on (see :func:`tag`). A cached page stores the
+version of every tag it declared. Saving an object moves its tags to a new
+version via :func:`purge`, so only the pages that declared them miss on their
+next request. Pages are stored in the two-tier :mod:`blog_buster.cache`,
+while tag versions stay in the shared tier, so a purge reaches every worker
+at once.
+
+Tag versions come from one shared purge sequence. A render notes the
+sequence before the view runs; if one of its tags was purged after that, the
+page may hold data from before the purge and is not stored.
+
+Logged-in users and requests carrying a session or CSRF cookie bypass the
+cache entirely, and responses that set cookies, vary on them or embed a CSRF
+token are never stored.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import has_vary_header
+
+from . import cache as tiered_cache, metrics
+
+PAGE_KEY = 'blog_buster:page:{digest}'
+TAG_KEY = 'blog_buster:page_tag:{tag}'
+SEQUENCE_KEY = 'blog_buster:page_purge_sequence'
+
+# Purged whenever the popular-post leaderboards change
+POPULAR = 'popular'
+
+
+def _timeout():
+    return getattr(settings, 'BLOG_BUSTER_PAGE_CACHE_TIMEOUT', 5 * 60)
+
+
+def tag(model, pk=None):
+    """Dependency tag for one object, or for the whole collection of ``model``"""
+    name = model._meta.model_name
+    return name if pk is None else f'{name}:{pk}'
+
+
+class PageDependencies:
+    """Tags and on-hit state collected while a cacheable page renders"""
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self.tags = set()
+        self.state = {}
+
+
+def depends_on(request, *tags):
+    """Declare tags the page being rendered for ``request`` depends on"""
+    dependencies = getattr(request, 'page_dependencies', None)
+    if dependencies is not None:
+        dependencies.tags.update(tags)
+
+
+def remember(request, **state):
+    """Store keyword arguments for the ``on_hit`` hook of later cache hits"""
+    dependencies = getattr(request, 'page_dependencies', None)
+    if dependencies is not None:
+        dependencies.state.update(state)
+
+
+def _tag_versions(tags):
+    keys = {TAG_KEY.format(tag=name): name for name in tags}
+    return {keys[key]: version for key, version in cache.get_many(keys).items()}
+
+
+def _sequence():
+    """Current purge sequence; every tag version is at most this"""
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        # Seeded from the clock so an evicted sequence never reuses a version
+        cache.add(SEQUENCE_KEY, time.time_ns(), None)
+        sequence = cache.get(SEQUENCE_KEY)
+    return sequence
+
+
+def _current_tag_versions(tags, sequence):
+    versions = _tag_versions(tags)
+    for name in set(tags) - set(versions):
+        # An evicted tag was last purged no later than ``sequence``
+        cache.add(TAG_KEY.format(tag=name), sequence, None)
+    if len(versions) < len(tags):
+        versions = _tag_versions(tags)
+    return versions
+
+
+def purge(*tags):
+    """Invalidate every cached page that depends on any of ``tags``"""
+    if not tags:
+        return
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        sequence = time.time_ns()
+        cache.set(SEQUENCE_KEY, sequence, None)
+    cache.set_many({TAG_KEY.format(tag=name): sequence for name in set(tags)}, None)
+
+
+def _cacheable(request):
+    if request.method not in ('GET', 'HEAD') or not _timeout():
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES or settings.CSRF_COOKIE_NAME in request.COOKIES:
+        return False
+    user = getattr(request, 'user', None)
+    return not (user is not None and user.is_authenticated)
+
+
+def _shareable(request, response):
+    return not (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or has_vary_header(response, 'Cookie')
+        # The view rendered a CSRF token, which is specific to this client
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _page_key(request):
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return PAGE_KEY.format(digest=digest)
+
+
+def _lookup(request, on_hit):
+    """Return ``(cacheable, cached response)``; a cacheable miss prepares ``request`` to render"""
+    if not _cacheable(request):
+        return False, None
+    entry = tiered_cache.get(_page_key(request))
+    hit = entry is not None and _tag_versions(entry['tags']) == entry['tags']
+    metrics.record_cache('page', hit)
+    if hit:
+        if on_hit is not None:
+            on_hit(request, **entry['state'])
+        return True, entry['response']
+    request.page_dependencies = PageDependencies(_sequence())
+    return True, None
+
+
+def _store(request, response):
+    if not _shareable(request, response):
+        return response
+    dependencies = request.page_dependencies
+    versions = _current_tag_versions(dependencies.tags, dependencies.sequence)
+    if any(version > dependencies.sequence for version in versions.values()):
+        # Purged while rendering: the page may predate the change
+        return response
+    tiered_cache.set(
+        _page_key(request),
+        {'response': response, 'tags': versions, 'state': dependencies.state},
+        _timeout(),
+    )
+    return response
+
+
+def cache_page(on_hit=None):
+    """Cache a view's full response for anonymous readers
+
+    ``on_hit(request, **state)`` runs whenever a cached response is served,
+    with the state the view stored through :func:`remember`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cacheable, cached = _lookup(request, on_hit)
+            if cached is not None:
+                return cached
+            response = view(request, *args, **kwargs)
+            return _store(request, response) if cacheable else response
+        return wrapper
+    return decorator
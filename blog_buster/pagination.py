@@ -0,0 +1,180 @@
+"""Keyset pagination for post listings.
+
+Pages are addressed by an opaque ``cursor`` token holding the
+``(published_at, id)`` of the row to continue from, so page 5000 costs the
+same indexed range scan as page 1 and no ``COUNT(*)`` is issued. Plain
+``?page=N`` links keep working through an offset fallback for the first
+``OFFSET_PAGE_LIMIT`` pages; ranked search results (a list) always use
+offsets over the bounded hit list. A page number past either bound is a 404
+rather than some other page.
+"""
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+
+OFFSET_PAGE_LIMIT = 5
+
+
+def encode_cursor(data):
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the cursor payload, or None for a missing or malformed token"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        if data.get('d') == 'last':
+            return data
+        data['at'] = datetime.fromisoformat(data['at'])
+        data['id'] = int(data['id'])
+        data['n'] = int(data['n'])
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return data if data.get('d') in ('next', 'prev') else None
+
+
+def _position(post, direction, number):
+    return {'d': direction, 'at': post.published_at.isoformat(), 'id': post.pk, 'n': number}
+
+
+class PostPage(Sequence):
+    """One page of posts with querystrings for the neighbouring pages"""
+
+    def __init__(self, object_list, number, params, next_params=None, previous_params=None, last_params=None):
+        self.object_list = list(object_list)
+        self.number = number
+        self._params = params
+        self._next = next_params
+        self._previous = previous_params
+        self._last = last_params
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._next is not None
+
+    def has_previous(self):
+        return self._previous is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _querystring(self, extra):
+        params = self._params.copy()
+        for key in ('page', 'cursor'):
+            params.pop(key, None)
+        params.update(extra)
+        return params.urlencode()
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self._next) if self._next else ''
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self._previous) if self._previous else ''
+
+    @property
+    def first_querystring(self):
+        return self._querystring({})
+
+    @property
+    def last_querystring(self):
+        return self._querystring(self._last) if self._last else ''
+
+
+class CursorPaginator:
+    """Paginate a post queryset on ``(published_at, id)`` descending"""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.filter(published_at__isnull=False)
+        self.per_page = per_page
+
+    def _after(self, at, pk):
+        return self.queryset.filter(Q(published_at__lt=at) | Q(published_at=at, id__lt=pk))
+
+    def _before(self, at, pk):
+        return self.queryset.filter(Q(published_at__gt=at) | Q(published_at=at, id__gt=pk))
+
+    def page(self, params):
+        """Return the page addressed by the ``cursor``/``page`` in ``params``"""
+        cursor = decode_cursor(params.get('cursor'))
+        if cursor is None:
+            page_number = _page_number(params.get('page'))
+            if page_number > 1:
+                return self.offset_page(params, page_number)
+            return self._forward(params, self.queryset, 1, has_previous=False)
+        if cursor['d'] == 'last':
+            return self._backward(params, self.queryset, None, has_next=False)
+
+        # Page numbers are informational; 0 means unknown (reached from the end)
+        number = cursor['n'] or None
+        if cursor['d'] == 'next':
+            return self._forward(params, self._after(cursor['at'], cursor['id']), number, has_previous=True)
+        return self._backward(params, self._before(cursor['at'], cursor['id']), number, has_next=True)
+
+    def offset_page(self, params, page_number):
+        """Offset page for legacy ``?page=N`` links within ``OFFSET_PAGE_LIMIT``"""
+        if page_number > OFFSET_PAGE_LIMIT:
+            raise Http404(f'Page numbers stop at {OFFSET_PAGE_LIMIT}; follow the page links instead')
+        start = (page_number - 1) * self.per_page
+        rows = list(self._ordered(self.queryset, '-')[start:start + self.per_page + 1])
+        if not rows:
+            raise Http404('That page contains no results')
+        return self._build(params, rows[:self.per_page], page_number, len(rows) > self.per_page, page_number > 1)
+
+    def _ordered(self, queryset, sign):
+        return queryset.order_by(f'{sign}published_at', f'{sign}id')
+
+    def _forward(self, params, queryset, number, has_previous):
+        rows = list(self._ordered(queryset, '-')[:self.per_page + 1])
+        return self._build(params, rows[:self.per_page], number, len(rows) > self.per_page, has_previous)
+
+    def _backward(self, params, queryset, number, has_next):
+        rows = list(self._ordered(queryset, '')[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        if not has_previous:
+            number = 1
+        return self._build(params, rows[:self.per_page][::-1], number, has_next, has_previous)
+
+    def _build(self, params, posts, number, has_next, has_previous):
+        next_params = previous_params = last_params = None
+        if has_next and posts:
+            next_params = {'cursor': encode_cursor(_position(posts[-1], 'next', number + 1 if number else 0))}
+            last_params = {'cursor': encode_cursor({'d': 'last'})}
+        if has_previous and posts:
+            previous_params = {'cursor': encode_cursor(_position(posts[0], 'prev', number - 1 if number else 0))}
+        return PostPage(posts, number, params, next_params, previous_params, last_params)
+
+
+def _page_number(value):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def paginate_posts(request, posts, per_page=9):
+    """Paginate a post queryset by cursor, or a ranked list of posts by offset"""
+    if isinstance(posts, list):
+        number = _page_number(request.GET.get('page'))
+        start = (number - 1) * per_page
+        if start and start >= len(posts):
+            raise Http404('That page contains no results')
+        next_params = {'page': number + 1} if start + per_page < len(posts) else None
+        previous_params = {'page': number - 1} if number > 1 else None
+        return PostPage(posts[start:start + per_page], number, request.GET, next_params, previous_params)
+    return CursorPaginator(posts, per_page).page(request.GET)
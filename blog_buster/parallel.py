@@ -0,0 +1,31 @@
+"""Process pool helpers for management commands."""
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def init_worker():
+    """Process pool initializer: set Django up and drop inherited state"""
+    import django
+
+    django.setup()
+    connections.close_all()
+    # Forked workers start with the parent's random state and would repeat each other's draws
+    random.seed()
+
+
+def run_parallel(func, tasks, workers):
+    """Yield ``func(task)`` for every task, in order, across ``workers`` processes
+
+    ``func`` must be a module-level function. With one worker the tasks run in
+    this process, which keeps tracebacks readable.
+    """
+    tasks = list(tasks)
+    if workers <= 1:
+        yield from map(func, tasks)
+        return
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        yield from executor.map(func, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
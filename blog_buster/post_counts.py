@@ -0,0 +1,46 @@
+"""Denormalized published-post counts on ``Category`` and ``Tag``.
+
+Signal handlers recount the categories and tags a post write touches, so
+listings can order and filter on ``published_post_count`` without joining
+the post table. Writes that bypass signals (``QuerySet.update``, raw SQL)
+are repaired by the ``reconcile_post_counts`` command.
+"""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Post, Category, Tag
+
+
+def refresh_category_counts(category_ids=None):
+    """Recount published posts per category; returns the number of rows fixed"""
+    published = (
+        Post.objects.filter(status='published', category=OuterRef('pk'))
+        .order_by()
+        .values('category')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return _update_counts(Category.objects.all(), published, category_ids)
+
+
+def refresh_tag_counts(tag_ids=None):
+    """Recount published posts per tag; returns the number of rows fixed"""
+    published = (
+        Post.tags.through.objects.filter(post__status='published', tag=OuterRef('pk'))
+        .order_by()
+        .values('tag')
+        .annotate(total=Count('post'))
+        .values('total')
+    )
+    return _update_counts(Tag.objects.all(), published, tag_ids)
+
+
+def _update_counts(queryset, published, ids):
+    if ids is not None:
+        ids = set(ids) - {None}
+        if not ids:
+            return 0
+        queryset = queryset.filter(pk__in=ids)
+    count = Coalesce(Subquery(published), 0)
+    # Only rows that drifted are written
+    return queryset.exclude(published_post_count=count).update(published_post_count=count)
@@ -0,0 +1,55 @@
+"""Observe every query made on behalf of a request, whichever thread runs it.
+
+``connection.execute_wrapper`` only sees queries on the calling thread's
+connection, but views build page sections on pool threads with their own
+connections (see :mod:`blog_buster.sections`). Instead, one permanent wrapper
+is installed on every connection and reports to the observers in a context
+variable. Section builders run in a copy of the request's context, so an
+observer registered with :func:`observing` sees all of the request's
+queries. An observer is any object with ``record(sql, seconds)``, called
+after each query. When nothing observes, the wrapper only reads the context
+variable.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_observers = ContextVar('blog_buster_query_observers', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    observers = _observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for observer in observers:
+            observer.record(sql, elapsed)
+
+
+def install(connection, **kwargs):
+    # First in the list: execute_wrapper() pops the last entry when it exits
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+connection_created.connect(install)
+
+
+@contextmanager
+def observing(observer):
+    """Report the current request's queries to ``observer`` within the block"""
+    # Connections opened before this module was imported missed the signal
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    token = _observers.set(_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        _observers.reset(token)
@@ -0,0 +1,232 @@
+"""Precomputed related-posts index.
+
+Every published post keeps its ``RELATED_POSTS_LIMIT`` best neighbours in
+``RelatedPost``. A neighbour's score blends the Jaccard similarity of the two
+tag sets, whether they share a category and how recently the neighbour was
+published. :func:`rebuild_all` builds the table in one pass from an in-memory
+tag index. After a post is saved, :func:`refresh_around` refreshes its own
+neighbours and re-ranks it inside the lists of the posts sharing its
+category or tags.
+"""
+import heapq
+import math
+from collections import defaultdict, namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import Post, RelatedPost
+
+RELATED_POSTS_LIMIT = 20
+CANDIDATE_LIMIT = 500
+RECENT_CANDIDATES = 50
+TAG_WEIGHT = 0.6
+CATEGORY_WEIGHT = 0.3
+RECENCY_WEIGHT = 0.1
+RECENCY_HALF_LIFE_DAYS = 90
+
+PostFeatures = namedtuple('PostFeatures', ['id', 'category_id', 'published_at', 'tags'])
+
+_EPOCH = datetime.min.replace(tzinfo=dt_timezone.utc)
+
+
+def score(post, candidate, now):
+    """Return ``(score, shared_tags, same_category)`` for a candidate neighbour"""
+    shared = len(post.tags & candidate.tags)
+    union = len(post.tags | candidate.tags)
+    jaccard = shared / union if union else 0.0
+    same_category = post.category_id is not None and post.category_id == candidate.category_id
+    age_days = max(0.0, (now - (candidate.published_at or _EPOCH)).total_seconds() / 86400)
+    recency = math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+    total = TAG_WEIGHT * jaccard + CATEGORY_WEIGHT * same_category + RECENCY_WEIGHT * recency
+    return total, shared, same_category
+
+
+def top_related(post, candidates, now):
+    """Build the ``RelatedPost`` rows for the best-scoring candidates"""
+    scored = (
+        (score(post, candidate, now), candidate.id)
+        for candidate in candidates
+        if candidate.id != post.id
+    )
+    best = heapq.nlargest(RELATED_POSTS_LIMIT, scored, key=lambda item: (item[0][0], item[1]))
+    return [
+        RelatedPost(post_id=post.id, related_id=related_id, score=total, shared_tags=shared, same_category=same)
+        for (total, shared, same), related_id in best
+    ]
+
+
+def _published(using=DEFAULT_DB_ALIAS):
+    return Post.objects.using(using).filter(status='published')
+
+
+def load_features(post_ids):
+    """Return ``{id: PostFeatures}`` for the published posts in ``post_ids``"""
+    tags = defaultdict(set)
+    for post_id, tag_id in Post.tags.through.objects.filter(post_id__in=post_ids).values_list('post_id', 'tag_id'):
+        tags[post_id].add(tag_id)
+    return {
+        post_id: PostFeatures(post_id, category_id, published_at, frozenset(tags[post_id]))
+        for post_id, category_id, published_at in (
+            _published().filter(id__in=post_ids).values_list('id', 'category_id', 'published_at')
+        )
+    }
+
+
+def _sharing(post):
+    """Ids of the newest published posts sharing a tag or the category with ``post``"""
+    post_ids = set(
+        Post.tags.through.objects.filter(tag_id__in=post.tags, post__status='published')
+        .exclude(post_id=post.id)
+        .order_by('-post__published_at')
+        .values_list('post_id', flat=True)[:CANDIDATE_LIMIT]
+    )
+    if post.category_id:
+        post_ids.update(
+            _published().filter(category_id=post.category_id)
+            .order_by('-published_at')
+            .values_list('id', flat=True)[:CANDIDATE_LIMIT]
+        )
+    post_ids.discard(post.id)
+    return post_ids
+
+
+def recompute_for_post(post_id, now=None):
+    """Refresh the stored neighbours of one post"""
+    now = now or timezone.now()
+    post = load_features([post_id]).get(post_id)
+    if post is None:
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        return []
+
+    candidate_ids = _sharing(post)
+    candidate_ids.update(_published().order_by('-published_at').values_list('id', flat=True)[:RECENT_CANDIDATES])
+    candidate_ids.discard(post_id)
+
+    rows = top_related(post, load_features(candidate_ids).values(), now)
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        RelatedPost.objects.bulk_create(rows)
+    return rows
+
+
+def merge_into_neighbours(post_id, now=None):
+    """Re-rank one post inside the stored lists of the posts it may neighbour
+
+    The lists of posts sharing its category or a tag, and of posts already
+    listing it, are updated in place. A full list the post drops out of is
+    recomputed, since only a full pass knows which candidate ranks next.
+    Returns the number of lists changed.
+    """
+    now = now or timezone.now()
+    post = load_features([post_id]).get(post_id)
+    holder_ids = set(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    neighbour_ids = holder_ids | (_sharing(post) if post else set())
+    neighbour_ids.discard(post_id)
+    neighbours = load_features(neighbour_ids)
+    stored = defaultdict(list)
+    for row in RelatedPost.objects.filter(post_id__in=neighbours):
+        stored[row.post_id].append(row)
+
+    unlisted, added, pushed_out, recompute = [], [], [], []
+    for neighbour in neighbours.values():
+        rows = stored[neighbour.id]
+        others = [row for row in rows if row.related_id != post_id]
+        listed = len(others) < len(rows)
+        new_rows = top_related(neighbour, [post], now) if post else []
+        best = heapq.nlargest(RELATED_POSTS_LIMIT, others + new_rows, key=lambda row: (row.score, row.related_id))
+        ranked = bool(new_rows) and new_rows[0] in best
+        if listed and not ranked and len(rows) >= RELATED_POSTS_LIMIT:
+            recompute.append(neighbour.id)
+            continue
+        if listed:
+            unlisted.append(neighbour.id)
+        if ranked:
+            added.extend(new_rows)
+            pushed_out.extend(row.pk for row in others if row not in best)
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=unlisted, related_id=post_id).delete()
+        RelatedPost.objects.filter(pk__in=pushed_out).delete()
+        RelatedPost.objects.bulk_create(added)
+    for neighbour_id in recompute:
+        recompute_for_post(neighbour_id, now)
+    return len(set(unlisted) | {row.post_id for row in added}) + len(recompute)
+
+
+def refresh_around(post_id, now=None):
+    """Refresh a saved post's neighbours and its place in theirs"""
+    now = now or timezone.now()
+    recompute_for_post(post_id, now)
+    merge_into_neighbours(post_id, now)
+
+
+def rebuild_all(batch_size=1000, now=None, using=DEFAULT_DB_ALIAS):
+    """Rebuild the whole table; returns the number of posts processed"""
+    now = now or timezone.now()
+    posts = {
+        post_id: PostFeatures(post_id, category_id, published_at, set())
+        for post_id, category_id, published_at in (
+            _published(using).values_list('id', 'category_id', 'published_at').iterator(chunk_size=batch_size)
+        )
+    }
+    for post_id, tag_id in (
+        Post.tags.through.objects.using(using).filter(post__status='published')
+        .values_list('post_id', 'tag_id').iterator(chunk_size=batch_size)
+    ):
+        posts[post_id].tags.add(tag_id)
+
+    # Newest first so per-tag and per-category candidate lists can be capped
+    by_recency = sorted(posts.values(), key=lambda post: post.published_at or _EPOCH, reverse=True)
+    by_tag = defaultdict(list)
+    by_category = defaultdict(list)
+    for post in by_recency:
+        for tag_id in post.tags:
+            by_tag[tag_id].append(post)
+        by_category[post.category_id].append(post)
+    recent = by_recency[:RECENT_CANDIDATES]
+
+    pending = []
+    processed = 0
+    for post in by_recency:
+        candidates = {candidate.id: candidate for candidate in recent}
+        for tag_id in post.tags:
+            candidates.update((candidate.id, candidate) for candidate in by_tag[tag_id][:CANDIDATE_LIMIT])
+        if post.category_id:
+            candidates.update(
+                (candidate.id, candidate) for candidate in by_category[post.category_id][:CANDIDATE_LIMIT]
+            )
+        pending.append((post.id, top_related(post, candidates.values(), now)))
+        processed += 1
+        if len(pending) >= batch_size:
+            _write_batch(pending, batch_size, using)
+            pending = []
+    _write_batch(pending, batch_size, using)
+
+    RelatedPost.objects.using(using).exclude(post_id__in=_published(using).values('id')).delete()
+    return processed
+
+
+def _write_batch(pending, batch_size, using):
+    if not pending:
+        return
+    with transaction.atomic(using=using):
+        RelatedPost.objects.using(using).filter(post_id__in=[post_id for post_id, _ in pending]).delete()
+        RelatedPost.objects.using(using).bulk_create(
+            [row for _, rows in pending for row in rows],
+            batch_size=batch_size,
+        )
+
+
+def related_posts_for(post, limit, by_category=False, by_tags=False, excerpt=False):
+    """Stored neighbours of ``post`` as cards in one indexed lookup, best first"""
+    # One filter() call so every condition, and the ordering, use the same
+    # related_from join: the RelatedPost row belonging to ``post``
+    conditions = {'related_from__post': post}
+    if by_category:
+        conditions['related_from__same_category'] = True
+    if by_tags:
+        conditions['related_from__shared_tags__gt'] = 0
+    entries = Post.objects.filter(status='published', **conditions).cards(excerpt)
+    return list(entries.order_by('-related_from__score')[:limit])
@@ -0,0 +1,199 @@
+"""Read-replica routing for public views.
+
+``ReplicaRouter`` sends every write to the primary (``default``). Reads go
+to a replica only inside views decorated with :func:`read_from_replica`,
+and only for safe requests that ``ReplicaMiddleware`` has not pinned to the
+primary. Everything else reads from the primary: the admin, management
+commands, seed and counter-flushing jobs, and code outside a request.
+
+A non-safe request (POST, PUT...) that writes gets a short-lived cookie
+(``BLOG_BUSTER_DB_STICKY_SECONDS``), so the client that wrote reads its own
+writes from the primary until the replicas have caught up. Writes made as a
+side effect of a GET, such as view counting, neither pin the client nor
+move the request's reads; the cookie would also keep the page out of the
+full-page cache. A replica is only
+used while its measured lag is under ``BLOG_BUSTER_DB_MAX_REPLICA_LAG`` and
+it has replayed past the last committed write (see :func:`record_write`).
+This stops a lagging replica from refilling the caches with data that was
+just invalidated. Lag is measured on PostgreSQL and rechecked at most every
+``BLOG_BUSTER_DB_LAG_CHECK_INTERVAL`` seconds per process. Other backends
+count as current while they answer, which lets two SQLite files stand in
+for a primary and a replica locally.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+WRITE_KEY = 'blog_buster:db:last_write'
+SAFE_METHODS = ('GET', 'HEAD')
+# Sessions and users are read right after they are written (login, logout)
+PRIMARY_APPS = {'auth', 'sessions'}
+
+# Seconds since the replica last replayed a transaction, or 0 when it is idle and caught up
+POSTGRES_LAG_SQL = '''
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+'''
+
+_state = ContextVar('blog_buster_db_routing', default=None)
+# alias -> (checked at, monotonic; checked at, wall clock; lag or None when unreachable)
+_lag = {}
+
+
+def replica_aliases():
+    return getattr(settings, 'BLOG_BUSTER_DB_REPLICAS', [])
+
+
+def _sticky_cookie():
+    return getattr(settings, 'BLOG_BUSTER_DB_STICKY_COOKIE', 'blog_buster_primary')
+
+
+def _sticky_seconds():
+    return getattr(settings, 'BLOG_BUSTER_DB_STICKY_SECONDS', 10)
+
+
+def _max_lag():
+    return getattr(settings, 'BLOG_BUSTER_DB_MAX_REPLICA_LAG', 5)
+
+
+def _lag_check_interval():
+    return getattr(settings, 'BLOG_BUSTER_DB_LAG_CHECK_INTERVAL', 2)
+
+
+class RoutingState:
+    """Routing decisions for one request, shared by the threads serving it"""
+
+    def __init__(self, sticky, safe):
+        self.sticky = sticky
+        self.safe = safe
+        self.replica = None
+        self.wrote = False
+
+
+def measure_lag(alias):
+    """Replication lag of ``alias`` in seconds, or None when it does not answer"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(POSTGRES_LAG_SQL)
+                return float(cursor.fetchone()[0])
+            cursor.execute('SELECT 1')
+            return 0.0
+    except DatabaseError:
+        return None
+
+
+def _replayed_until(alias):
+    """Wall-clock time the replica is known to have replayed up to, or None"""
+    checked_at, checked_wall, lag = _lag.get(alias, (None, None, None))
+    if checked_at is None or time.monotonic() - checked_at >= _lag_check_interval():
+        checked_at, checked_wall, lag = time.monotonic(), time.time(), measure_lag(alias)
+        _lag[alias] = (checked_at, checked_wall, lag)
+    if lag is None or lag > _max_lag():
+        return None
+    return checked_wall - lag
+
+
+def choose_replica():
+    """A replica that has caught up with the last write, or None for the primary"""
+    aliases = replica_aliases()
+    if not aliases:
+        return None
+    last_write = cache.get(WRITE_KEY, 0)
+    current = []
+    for alias in aliases:
+        replayed = _replayed_until(alias)
+        # None: lagging too far or not answering, even before any write is recorded
+        if replayed is not None and replayed >= last_write:
+            current.append(alias)
+    return random.choice(current) if current else None
+
+
+def record_write():
+    """Note a committed write so replicas that have not replayed it are skipped"""
+    if replica_aliases():
+        cache.set(WRITE_KEY, time.time(), None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return None
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return state.replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and not state.safe:
+            # Read the rest of this request, and the client's next ones, from the primary
+            state.wrote = True
+            state.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def _use_replica(request):
+    state = _state.get()
+    if state is not None and state.safe and not state.sticky:
+        state.replica = choose_replica()
+
+
+def read_from_replica(view):
+    """Let a view's reads go to a replica (needs ``ReplicaMiddleware``)"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if replica_aliases():
+            _use_replica(request)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaMiddleware:
+    """Track writes per request and keep writing clients on the primary
+
+    Place it above ``SessionMiddleware`` so session saves count as writes.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def routing_state(self, request):
+        return RoutingState(sticky=_sticky_cookie() in request.COOKIES, safe=request.method in SAFE_METHODS)
+
+    def __call__(self, request):
+        state = self.routing_state(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    def finish(self, request, response, state):
+        if state.wrote and replica_aliases():
+            response.set_cookie(
+                _sticky_cookie(),
+                '1',
+                max_age=_sticky_seconds(),
+                secure=request.is_secure(),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,234 @@
+"""Full-text search over published posts.
+
+Backends keep a search index in sync with ``blog_buster_post`` and return
+ranked :class:`SearchHit` rows with highlighted snippets. The backend is
+chosen from ``BLOG_BUSTER_SEARCH_BACKEND`` (a dotted path) or, by default,
+from the database vendor: FTS5 on SQLite, ``tsvector``/GIN on PostgreSQL and
+a plain ``icontains`` scan elsewhere.
+
+Only published posts are indexed, so every hit is publicly visible.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+SEARCH_RESULT_LIMIT = 200
+
+# Private-use characters survive escaping and mark highlight boundaries
+_START_MARK = '\ue000'
+_STOP_MARK = '\ue001'
+
+
+@dataclass
+class SearchHit:
+    post_id: int
+    rank: float
+    snippet: str = ''
+
+
+def highlight(snippet):
+    """Escape a backend snippet and turn its markers into ``<mark>`` tags"""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(_START_MARK, '<mark>').replace(_STOP_MARK, '</mark>')
+    return mark_safe(html)
+
+
+class SearchBackend:
+    """Base interface; the default implementation scans with ``icontains``"""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def setup(self):
+        """Create the index structures"""
+
+    def teardown(self):
+        """Drop the index structures"""
+
+    def reindex(self, post_ids):
+        """Bring the index rows for ``post_ids`` in line with the post table"""
+
+    def reindex_range(self, low_id, high_id):
+        """Reindex every post with ``low_id <= id < high_id``"""
+
+    def _restrict(self, column, candidates):
+        """SQL limiting ``column`` to the ids of the ``candidates`` queryset, and its params"""
+        if candidates is None:
+            return '', []
+        sql, params = candidates.order_by().values('id').query.get_compiler(self.using).as_sql()
+        return f' AND {column} IN ({sql})', list(params)
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT, candidates=None):
+        """Return up to ``limit`` hits, only among ``candidates`` (a post queryset) if given"""
+        posts = (
+            (Post.objects if candidates is None else candidates).using(self.using)
+            .filter(status='published')
+            .filter(Q(title__icontains=query) | Q(content__icontains=query) | Q(excerpt__icontains=query))
+            .values_list('id', flat=True)[:limit]
+        )
+        return [SearchHit(post_id=post_id, rank=0.0) for post_id in posts]
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """SQLite FTS5 index keyed by post id, ranked with bm25"""
+    table = 'blog_buster_post_fts'
+
+    def setup(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                "USING fts5(title, excerpt, content, tokenize='porter unicode61')"
+            )
+
+    def teardown(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def _reindex_where(self, where, params):
+        # ``where`` filters on ``{column}``: the post id in either table
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {where.format(column='rowid')}", params)
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, excerpt, content) "
+                f"SELECT id, title, excerpt, content FROM blog_buster_post "
+                f"WHERE status = 'published' AND {where.format(column='id')}",
+                params,
+            )
+
+    def reindex(self, post_ids):
+        post_ids = list(post_ids)
+        if post_ids:
+            placeholders = ', '.join(['%s'] * len(post_ids))
+            self._reindex_where(f"{{column}} IN ({placeholders})", post_ids)
+
+    def reindex_range(self, low_id, high_id):
+        self._reindex_where("{column} >= %s AND {column} < %s", [low_id, high_id])
+
+    @staticmethod
+    def _match_expression(query):
+        # Quote every term so user input cannot inject FTS5 query syntax
+        return ' '.join('"%s"' % term.replace('"', '""') for term in query.split())
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT, candidates=None):
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        # Unary + keeps SQLite from probing the index once per candidate id; MATCH drives
+        restrict, restrict_params = self._restrict('+rowid', candidates)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({self.table}, 10.0, 4.0, 1.0) AS rank, "
+                f"snippet({self.table}, -1, %s, %s, '…', 24) "
+                f"FROM {self.table} WHERE {self.table} MATCH %s{restrict} ORDER BY rank LIMIT %s",
+                [_START_MARK, _STOP_MARK, expression, *restrict_params, limit],
+            )
+            # bm25 scores are negative with the best match lowest
+            return [SearchHit(post_id=row[0], rank=-row[1], snippet=row[2]) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted ``tsvector`` documents in a GIN-indexed side table"""
+    table = 'blog_buster_post_search'
+    config = 'english'
+
+    def setup(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "post_id bigint PRIMARY KEY REFERENCES blog_buster_post (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_document ON {self.table} USING GIN (document)"
+            )
+
+    def teardown(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def _reindex_where(self, where, params):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {where.format(column='post_id')}", params)
+            cursor.execute(
+                f"INSERT INTO {self.table} (post_id, document) "
+                f"SELECT id, "
+                f"setweight(to_tsvector('{self.config}', title), 'A') || "
+                f"setweight(to_tsvector('{self.config}', excerpt), 'B') || "
+                f"setweight(to_tsvector('{self.config}', content), 'C') "
+                f"FROM blog_buster_post WHERE status = 'published' AND {where.format(column='id')}",
+                params,
+            )
+
+    def reindex(self, post_ids):
+        post_ids = list(post_ids)
+        if post_ids:
+            self._reindex_where("{column} = ANY(%s)", [post_ids])
+
+    def reindex_range(self, low_id, high_id):
+        self._reindex_where("{column} >= %s AND {column} < %s", [low_id, high_id])
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT, candidates=None):
+        if not query.strip():
+            return []
+        restrict, restrict_params = self._restrict('s.post_id', candidates)
+        headline_options = f'StartSel={_START_MARK}, StopSel={_STOP_MARK}, MaxWords=35, MinWords=15'
+        with self.connection.cursor() as cursor:
+            # Rank and limit first so ts_headline only runs on the returned rows
+            cursor.execute(
+                f"SELECT hits.post_id, hits.rank, "
+                f"ts_headline('{self.config}', p.content, hits.query, %s) "
+                f"FROM ("
+                f"  SELECT s.post_id, ts_rank_cd(s.document, q) AS rank, q AS query "
+                f"  FROM {self.table} s, websearch_to_tsquery('{self.config}', %s) q "
+                f"  WHERE s.document @@ q{restrict} ORDER BY rank DESC LIMIT %s"
+                f") hits JOIN blog_buster_post p ON p.id = hits.post_id "
+                f"ORDER BY hits.rank DESC",
+                [headline_options, query, *restrict_params, limit],
+            )
+            return [SearchHit(post_id=row[0], rank=row[1], snippet=row[2]) for row in cursor.fetchall()]
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    """Return the configured search backend bound to a database alias"""
+    backend_path = getattr(settings, 'BLOG_BUSTER_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)(using)
+    return VENDOR_BACKENDS.get(connections[using].vendor, SearchBackend)(using)
+
+
+def search_posts(queryset, query, limit=SEARCH_RESULT_LIMIT):
+    """Return posts from ``queryset`` matching ``query``, best match first
+
+    Each post gets a ``search_snippet`` attribute with highlighted context.
+    The backend ranks only the posts in ``queryset``, so category and tag
+    filters never compete for the ``limit`` with posts they exclude.
+    """
+    hits = get_backend(router.db_for_read(Post)).search(query, limit, candidates=queryset)
+    ranked = {hit.post_id: (position, hit) for position, hit in enumerate(hits)}
+    posts = sorted(queryset.filter(id__in=ranked), key=lambda post: ranked[post.id][0])
+    for post in posts:
+        post.search_snippet = highlight(ranked[post.id][1].snippet)
+    return posts
+
+
+def reindex_posts(post_ids):
+    get_backend(router.db_for_write(Post)).reindex(post_ids)
@@ -0,0 +1,56 @@
+"""Concurrent page sections for views.
+
+:func:`gather` runs a view's independent section builders (featured posts,
+trending, widgets, related posts...) on a bounded, process-wide thread pool,
+so their queries overlap instead of running one after another. The pool has
+``BLOG_BUSTER_SECTION_WORKERS`` threads. Each thread keeps its own database
+connection open across requests for ``CONN_MAX_AGE`` seconds. A process
+therefore holds at most that many extra connections, however many requests
+it serves at once.
+
+Builders run in a copy of the caller's context, so per-request state held in
+context variables (query observers, replica routing) follows them. They must
+return fully evaluated values (lists, not querysets); anything lazy would run
+its queries later, on the rendering thread. Inside a transaction the
+builders run inline, since other connections cannot see its writes.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _workers():
+    return getattr(settings, 'BLOG_BUSTER_SECTION_WORKERS', 4)
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix='blog-buster-section')
+    return _executor
+
+
+def _run(context, builder):
+    try:
+        return context.run(builder)
+    finally:
+        # Pool threads outlive the request: apply CONN_MAX_AGE to their connections
+        close_old_connections()
+
+
+def gather(**builders):
+    """Run ``name=callable`` builders concurrently; returns ``{name: result}``"""
+    if len(builders) < 2 or _workers() < 2 or connection.in_atomic_block:
+        return {name: builder() for name, builder in builders.items()}
+    futures = {
+        name: _pool().submit(_run, contextvars.copy_context(), builder)
+        for name, builder in builders.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
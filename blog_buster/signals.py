@@ -0,0 +1,324 @@
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from . import cache, images, page_cache, post_counts, related, replicas, search
+from .models import (
+    Post,
+    Category,
+    Tag,
+    HomepageSettings,
+    QuickTip,
+    BuyingGuide,
+    GuidePick,
+    ProductReview,
+    ReviewScore,
+    HowToSeries,
+    HowToStep,
+    SidebarWidget,
+    PopularPostsWidget,
+    RelatedPostsWidget,
+    AuthorBioWidget,
+    SocialShareWidget,
+    NewsletterWidget,
+    CategoriesWidget,
+    RecentPostsWidget,
+    QuickTipsWidget,
+    BuyingGuidesWidget,
+    RelatedPost,
+    SingletonModel,
+)
+
+# Models whose rows end up in get_widget_context() payloads
+WIDGET_CONTENT_MODELS = [
+    Post,
+    Category,
+    QuickTip,
+    BuyingGuide,
+    GuidePick,
+    ProductReview,
+    ReviewScore,
+    HowToSeries,
+    HowToStep,
+    SidebarWidget,
+    PopularPostsWidget,
+    RelatedPostsWidget,
+    AuthorBioWidget,
+    SocialShareWidget,
+    NewsletterWidget,
+    CategoriesWidget,
+    RecentPostsWidget,
+    QuickTipsWidget,
+    BuyingGuidesWidget,
+]
+
+
+# Saves touching only these fields do not change what the widgets render
+IGNORED_UPDATE_FIELDS = {'views'}
+
+
+def bump_content_version(sender, update_fields=None, **kwargs):
+    """Invalidate cached widget context once the write is committed"""
+    if update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS:
+        return
+    transaction.on_commit(cache.bump_version)
+
+
+for model in WIDGET_CONTENT_MODELS:
+    post_save.connect(bump_content_version, sender=model, dispatch_uid=f'content_save_{model.__name__}')
+    post_delete.connect(bump_content_version, sender=model, dispatch_uid=f'content_delete_{model.__name__}')
+
+m2m_changed.connect(bump_content_version, sender=Post.tags.through, dispatch_uid='content_m2m_post_tags')
+
+
+def bump_categories_version(sender, **kwargs):
+    """Invalidate every process's navigation categories once the write is committed"""
+    transaction.on_commit(lambda: cache.bump_version(cache.CATEGORIES))
+
+
+post_save.connect(bump_categories_version, sender=Category, dispatch_uid='categories_save')
+post_delete.connect(bump_categories_version, sender=Category, dispatch_uid='categories_delete')
+
+
+# Fields the search index is built from
+SEARCH_FIELDS = {'title', 'excerpt', 'content', 'status'}
+
+
+def reindex_post(sender, instance, update_fields=None, **kwargs):
+    """Keep the search index row for a post in sync once the write commits"""
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    post_id = instance.pk
+    transaction.on_commit(lambda: search.reindex_posts([post_id]))
+
+
+post_save.connect(reindex_post, sender=Post, dispatch_uid='search_reindex_save')
+post_delete.connect(reindex_post, sender=Post, dispatch_uid='search_reindex_delete')
+
+
+# Fields the related-posts scores are built from
+RELATED_FIELDS = {'category', 'status', 'published_at'}
+
+
+def recompute_related_posts(sender, instance, update_fields=None, **kwargs):
+    """Refresh a post's stored neighbours, and its place in theirs, once the write commits"""
+    if update_fields and not RELATED_FIELDS & set(update_fields):
+        return
+    post_id = instance.pk
+    transaction.on_commit(lambda: related.refresh_around(post_id))
+
+
+def recompute_related_posts_for_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh neighbours of the posts whose tags changed"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        post_ids = [instance.pk]
+    elif pk_set:
+        post_ids = list(pk_set)
+    else:
+        return
+    transaction.on_commit(lambda: [related.refresh_around(post_id) for post_id in post_ids])
+
+
+def recompute_related_posts_for_delete(sender, instance, **kwargs):
+    """Refill the lists a deleted post is cascaded out of once the delete commits"""
+    holder_ids = list(RelatedPost.objects.filter(related_id=instance.pk).values_list('post_id', flat=True))
+    if holder_ids:
+        transaction.on_commit(lambda: [related.recompute_for_post(post_id) for post_id in holder_ids])
+
+
+post_save.connect(recompute_related_posts, sender=Post, dispatch_uid='related_posts_save')
+m2m_changed.connect(recompute_related_posts_for_tags, sender=Post.tags.through, dispatch_uid='related_posts_tags')
+pre_delete.connect(recompute_related_posts_for_delete, sender=Post, dispatch_uid='related_posts_delete')
+
+
+# Stored post values compared after a save to see what the save changed
+TRACKED_FIELDS = ('status', 'category_id', 'published_at', 'featured')
+
+# Fields that decide which published-post counts a post contributes to
+COUNTED_FIELDS = {'status', 'category'}
+
+
+def remember_stored_state(sender, instance, update_fields=None, **kwargs):
+    """Stash the stored values of ``TRACKED_FIELDS`` before a post is saved"""
+    instance._stored_state = None
+    if update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS:
+        return
+    if instance.pk:
+        instance._stored_state = Post.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+
+
+def _stored(instance, field):
+    state = getattr(instance, '_stored_state', None)
+    return state[field] if state else None
+
+
+def refresh_counts_for_post(sender, instance, update_fields=None, **kwargs):
+    """Recount the categories and tags a publish, unpublish or move affects"""
+    if update_fields and not COUNTED_FIELDS & set(update_fields):
+        return
+    old_status, old_category_id = _stored(instance, 'status'), _stored(instance, 'category_id')
+    if 'published' not in (old_status, instance.status):
+        return
+    if (old_status, old_category_id) == (instance.status, instance.category_id):
+        return
+    post_counts.refresh_category_counts([old_category_id, instance.category_id])
+    if old_status != instance.status:
+        post_counts.refresh_tag_counts(instance.tags.values_list('id', flat=True))
+
+
+def remember_counted_tags(sender, instance, **kwargs):
+    """Tag rows are cascaded away before post_delete, so note them first"""
+    instance._counted_tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+def refresh_counts_for_deleted_post(sender, instance, **kwargs):
+    if instance.status != 'published':
+        return
+    post_counts.refresh_category_counts([instance.category_id])
+    post_counts.refresh_tag_counts(getattr(instance, '_counted_tag_ids', []))
+
+
+def refresh_counts_for_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount tags added to or removed from posts"""
+    if action == 'pre_clear' and not reverse:
+        instance._counted_tag_ids = list(instance.tags.values_list('id', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        tag_ids = [instance.pk]
+    elif action == 'post_clear':
+        tag_ids = getattr(instance, '_counted_tag_ids', [])
+    else:
+        tag_ids = pk_set or []
+    post_counts.refresh_tag_counts(tag_ids)
+
+
+pre_save.connect(remember_stored_state, sender=Post, dispatch_uid='post_stored_state')
+post_save.connect(refresh_counts_for_post, sender=Post, dispatch_uid='post_counts_save')
+pre_delete.connect(remember_counted_tags, sender=Post, dispatch_uid='post_counts_pre_delete')
+post_delete.connect(refresh_counts_for_deleted_post, sender=Post, dispatch_uid='post_counts_delete')
+m2m_changed.connect(refresh_counts_for_tags, sender=Post.tags.through, dispatch_uid='post_counts_tags')
+
+
+# Child rows render as part of their parent's pages
+PAGE_PARENTS = {
+    GuidePick: ('buying_guide', BuyingGuide),
+    ReviewScore: ('review', ProductReview),
+    HowToStep: ('series', HowToSeries),
+    PopularPostsWidget: ('widget', SidebarWidget),
+    RelatedPostsWidget: ('widget', SidebarWidget),
+    AuthorBioWidget: ('widget', SidebarWidget),
+    SocialShareWidget: ('widget', SidebarWidget),
+    NewsletterWidget: ('widget', SidebarWidget),
+    CategoriesWidget: ('widget', SidebarWidget),
+    RecentPostsWidget: ('widget', SidebarWidget),
+    QuickTipsWidget: ('widget', SidebarWidget),
+    BuyingGuidesWidget: ('widget', SidebarWidget),
+}
+
+
+def touch_parent(sender, instance, **kwargs):
+    """Child edits move the parent's ``updated_at``, which keys its caches"""
+    field, model = PAGE_PARENTS[sender]
+    model.objects.filter(pk=getattr(instance, f'{field}_id')).update(updated_at=timezone.now())
+
+
+for model in PAGE_PARENTS:
+    post_save.connect(touch_parent, sender=model, dispatch_uid=f'touch_parent_save_{model.__name__}')
+    post_delete.connect(touch_parent, sender=model, dispatch_uid=f'touch_parent_delete_{model.__name__}')
+
+
+def _purge_on_commit(tags):
+    transaction.on_commit(lambda: page_cache.purge(*tags))
+
+
+def purge_pages(sender, instance, **kwargs):
+    """Purge cached pages showing a saved or deleted object"""
+    if sender in PAGE_PARENTS:
+        field, model = PAGE_PARENTS[sender]
+        pk = getattr(instance, f'{field}_id')
+    else:
+        model, pk = sender, instance.pk
+    _purge_on_commit([page_cache.tag(model, pk), page_cache.tag(model)])
+
+
+def purge_post_pages(sender, instance, update_fields=None, **kwargs):
+    """Purge a post's pages, and listings when the published set or order moved"""
+    if update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS:
+        return
+    tags = [page_cache.tag(Post, instance.pk)]
+    state = getattr(instance, '_stored_state', None)
+    current = {field: getattr(instance, field) for field in TRACKED_FIELDS}
+    if 'published' in (_stored(instance, 'status'), instance.status) and state != current:
+        tags.append(page_cache.tag(Post))
+    _purge_on_commit(tags)
+
+
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    tags = [page_cache.tag(Post, instance.pk)]
+    if instance.status == 'published':
+        tags.append(page_cache.tag(Post))
+    _purge_on_commit(tags)
+
+
+def purge_tagged_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    """Purge the pages of posts and tags whose tagging changed"""
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        tags = [page_cache.tag(Tag, instance.pk)]
+        tags += [page_cache.tag(Post, pk) for pk in pk_set] if pk_set else [page_cache.tag(Post)]
+    else:
+        tag_ids = getattr(instance, '_counted_tag_ids', []) if action == 'post_clear' else pk_set or []
+        tags = [page_cache.tag(Post, instance.pk)] + [page_cache.tag(Tag, pk) for pk in tag_ids]
+    _purge_on_commit(tags)
+
+
+for model in [Tag, HomepageSettings] + [model for model in WIDGET_CONTENT_MODELS if model is not Post]:
+    post_save.connect(purge_pages, sender=model, dispatch_uid=f'page_cache_save_{model.__name__}')
+    post_delete.connect(purge_pages, sender=model, dispatch_uid=f'page_cache_delete_{model.__name__}')
+
+post_save.connect(purge_post_pages, sender=Post, dispatch_uid='page_cache_save_post')
+post_delete.connect(purge_deleted_post_pages, sender=Post, dispatch_uid='page_cache_delete_post')
+m2m_changed.connect(purge_tagged_pages, sender=Post.tags.through, dispatch_uid='page_cache_post_tags')
+
+
+def refresh_image_renditions(sender, instance, update_fields=None, **kwargs):
+    """Resize a newly uploaded image before the write commits"""
+    for model, field_name in images.IMAGE_FIELDS:
+        if model is sender and (not update_fields or field_name in update_fields):
+            images.refresh_renditions(instance, field_name)
+
+
+for model, _ in images.IMAGE_FIELDS:
+    post_save.connect(refresh_image_renditions, sender=model, dispatch_uid=f'image_renditions_{model.__name__}')
+
+
+def note_write(sender, **kwargs):
+    """Keep reads on the primary until the replicas have replayed this write"""
+    transaction.on_commit(replicas.record_write, using=kwargs.get('using'))
+
+
+pre_save.connect(note_write, dispatch_uid='replicas_save')
+pre_delete.connect(note_write, dispatch_uid='replicas_delete')
+m2m_changed.connect(note_write, dispatch_uid='replicas_m2m')
+
+
+def create_singletons(sender, using=DEFAULT_DB_ALIAS, apps=None, **kwargs):
+    """Create every settings singleton's row after migrate, so requests never write"""
+    for model in sender.get_models():
+        if not issubclass(model, SingletonModel):
+            continue
+        try:
+            # The migrated state, which may predate the current model
+            historical = apps.get_model(model._meta.app_label, model._meta.model_name) if apps else model
+        except LookupError:
+            continue
+        if not router.allow_migrate_model(using, historical):
+            continue
+        if not historical.objects.using(using).filter(pk=1).exists():
+            historical.objects.using(using).create(pk=1)
+            transaction.on_commit(model.invalidate, using=using)
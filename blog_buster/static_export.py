@@ -0,0 +1,104 @@
+"""Pre-render the public site to static HTML.
+
+:func:`public_urls` enumerates every public page, following each listing's
+keyset cursors. :func:`export_page` renders one URL by resolving and calling
+its view with a ``RequestFactory`` request flagged ``prerender``, so exports
+never count as post views. It skips the render when the view's conditional
+GET validators still match the ETag recorded in the previous export's
+manifest. The ETag counts the page's rows, so a deleted or unpublished post
+changes every listing it was on. It also holds the content cache version:
+without a shared cache each export starts a new version and re-renders
+every page, though files whose content is unchanged are not rewritten.
+"""
+import hashlib
+import os
+from urllib.parse import parse_qs, urlsplit
+
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .models import Post, Category, Tag, BuyingGuide, ProductReview, HowToSeries
+from .pagination import CursorPaginator
+
+LIST_PAGE_SIZE = 9
+MANIFEST_NAME = 'manifest.json'
+
+
+def _list_urls(path, queryset):
+    paginator = CursorPaginator(queryset.only('id', 'published_at'), LIST_PAGE_SIZE)
+    page = paginator.page(QueryDict())
+    yield path
+    while page.has_next():
+        query = page.next_querystring
+        yield f'{path}?{query}'
+        page = paginator.page(QueryDict(query))
+
+
+def public_urls():
+    """Yield the URL of every public page, including each listing page"""
+    published = Post.objects.filter(status='published')
+    yield reverse('index')
+    yield from _list_urls(reverse('post_list'), published)
+    for slug in published.values_list('slug', flat=True).iterator():
+        yield reverse('post_detail', kwargs={'slug': slug})
+    for pk, slug in Category.objects.values_list('pk', 'slug'):
+        yield from _list_urls(reverse('category_detail', kwargs={'slug': slug}), published.filter(category_id=pk))
+    for pk, slug in Tag.objects.values_list('pk', 'slug'):
+        yield from _list_urls(reverse('tag_detail', kwargs={'slug': slug}), published.filter(tags=pk))
+    for model, list_name, detail_name in [
+        (BuyingGuide, 'buying_guides_list', 'buying_guide_detail'),
+        (ProductReview, 'product_reviews_list', 'product_review_detail'),
+        (HowToSeries, 'howto_list', 'howto_detail'),
+    ]:
+        yield reverse(list_name)
+        for slug in model.objects.filter(published=True).values_list('slug', flat=True):
+            yield reverse(detail_name, kwargs={'slug': slug})
+
+
+def output_path(url):
+    """File path, relative to the export root, that serves ``url``
+
+    ``/posts/`` maps to ``posts/index.html`` and ``/posts/?cursor=X`` to
+    ``posts/cursor/X.html``, so a proxy can route on ``$arg_cursor``.
+    """
+    parts = urlsplit(url)
+    directory = parts.path.strip('/')
+    cursor = parse_qs(parts.query).get('cursor')
+    name = os.path.join('cursor', f'{cursor[0]}.html') if cursor else 'index.html'
+    return os.path.join(directory, name)
+
+
+def export_page(url, output_dir, previous=None, host='localhost', secure=False):
+    """Render ``url`` into ``output_dir``
+
+    ``previous`` is the URL's manifest entry from the last export. Returns
+    ``(url, outcome, etag, sha256)`` where ``outcome`` is ``'unchanged'``,
+    ``'rendered'`` or a description of why the page could not be exported.
+    Files whose content hash is unchanged are not rewritten.
+    """
+    previous = previous or {}
+    request = RequestFactory(SERVER_NAME=host).get(url, secure=secure)
+    request.prerender = True
+    match = resolve(request.path_info)
+    path = os.path.join(output_dir, output_path(url))
+
+    validators = getattr(match.func, 'validators', None)
+    etag = validators(request, *match.args, **match.kwargs)[0] if validators else None
+    if etag is not None and etag == previous.get('etag') and os.path.exists(path):
+        return url, 'unchanged', etag, previous.get('sha256')
+
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Exception as exc:
+        # Exceptions may not pickle back from a worker process
+        return url, f'{type(exc).__name__}: {exc}', None, None
+    if response.status_code != 200:
+        return url, f'HTTP {response.status_code}', None, None
+    content = response.content
+    digest = hashlib.sha256(content).hexdigest()
+    if digest != previous.get('sha256') or not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+    return url, 'rendered', etag, digest
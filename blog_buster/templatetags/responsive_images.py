@@ -0,0 +1,45 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Widest JPEG rendition used as the plain ``src`` fallback
+FALLBACK_WIDTH = 960
+
+
+def _srcset(renditions):
+    return ', '.join(f"{default_storage.url(r['name'])} {r['width']}w" for r in renditions)
+
+
+@register.simple_tag
+def responsive_image(image, renditions=None, sizes='100vw', loading='lazy', **attrs):
+    """``<picture>`` with WebP and JPEG ``srcset`` for an image and its renditions
+
+    Falls back to a plain ``<img>`` of the original when no renditions exist.
+    Extra keyword arguments (``alt``, ``class``, ...) become ``<img>`` attributes.
+    """
+    if not image:
+        return ''
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    by_format = {}
+    for rendition in (renditions or {}).get('renditions', []):
+        by_format.setdefault(rendition['format'], []).append(rendition)
+    jpegs = sorted(by_format.get('jpeg', []), key=lambda r: r['width'])
+    if not jpegs:
+        return format_html('<img src="{}" loading="{}" decoding="async"{}>', image.url, loading, extra)
+
+    fallback = [r for r in jpegs if r['width'] <= FALLBACK_WIDTH][-1:] or jpegs[:1]
+    webp = sorted(by_format.get('webp', []), key=lambda r: r['width'])
+    source = format_html('<source type="image/webp" srcset="{}" sizes="{}">', _srcset(webp), sizes) if webp else ''
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" loading="{}" decoding="async"{}></picture>',
+        source,
+        default_storage.url(fallback[0]['name']),
+        _srcset(jpegs),
+        sizes,
+        jpegs[-1]['width'],
+        jpegs[-1]['height'],
+        loading,
+        extra,
+    )
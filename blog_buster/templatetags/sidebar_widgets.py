@@ -0,0 +1,46 @@
+import hashlib
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from blog_buster import cache, metrics
+from blog_buster.widgets import get_loader
+
+register = template.Library()
+
+FRAGMENT_KEY = 'blog_buster:widget:{id}:{digest}'
+
+
+def fragment_key(widget, loader, context, content_version):
+    """Cache key for one rendered widget on the page being rendered"""
+    parts = [widget.updated_at.isoformat(), *loader.fragment_key_parts(context)]
+    if loader.uses_content:
+        parts.append(content_version)
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return FRAGMENT_KEY.format(id=widget.pk, digest=digest)
+
+
+@register.simple_tag(takes_context=True)
+def render_sidebar_widgets(context):
+    """Render the sidebar from cached per-widget HTML fragments"""
+    content_version = cache.get_version()
+    pending = {}
+    for widget_data in context.get('sidebar_widgets', ()):
+        widget = widget_data['widget']
+        loader = get_loader(widget.widget_type)
+        if loader.widget_type:
+            pending[fragment_key(widget, loader, context, content_version)] = (loader, widget_data)
+
+    fragments = cache.get_many(list(pending))
+    metrics.record_cache('fragment', True, len(fragments))
+    metrics.record_cache('fragment', False, len(pending) - len(fragments))
+    rendered = {}
+    for key, (loader, widget_data) in pending.items():
+        if key in fragments:
+            continue
+        with context.push(widget=widget_data['widget'], widget_data=widget_data):
+            rendered[key] = context.template.engine.get_template(loader.template_name).render(context)
+    if rendered:
+        cache.set_many(rendered)
+        fragments.update(rendered)
+    return mark_safe(''.join(fragments[key] for key in pending))
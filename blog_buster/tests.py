@@ -1,3 +1,1343 @@
-from django.test import TestCase
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import CommandError, call_command
+from django.core.cache import cache as django_cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, router, transaction
+from django.http import Http404, HttpResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.template import Context, Engine, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from PIL import Image
+
+from . import (
+    analytics, cache, checks, context_processors, counters, images, page_cache, pagination, post_counts,
+    query_observers, related, replicas, search, sections, static_export, views,
+)
+from .models import (
+    BuyingGuide, Category, HomepageSettings, HowToSeries, NewsletterWidget, PopularPostRanking, Post, PostCard,
+    PostViewBucket, ProductReview, QuickTip, RelatedPost, SidebarWidget, Tag,
+)
+from .management.commands import assign_dummy_images
+from .middleware import QueryCounter, QueryInstrumentationMiddleware
+from .widgets import WIDGET_LOADERS, get_loader, load_sidebar_widgets
+
+
+def make_post(author, title, **fields):
+    fields.setdefault('status', 'published')
+    fields.setdefault('excerpt', f'About {title}')
+    fields.setdefault('content', f'{title} body text')
+    return Post.objects.create(author=author, title=title, **fields)
+
+
+class BlogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='unused')
+
+    def setUp(self):
+        cache.clear()
+
+
+@override_settings(BLOG_BUSTER_VIEW_BUFFER_CACHE='default')
+class ViewCounterTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = make_post(self.author, 'Counted')
+
+    def test_views_are_buffered_until_flushed(self):
+        with self.assertNumQueries(0):
+            counters.record_view(self.post.pk)
+            counters.record_view(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        self.assertEqual(counters.live_views(self.post), 2)
+
+        self.assertEqual(counters.flush_views(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+        self.assertEqual(counters.pending_views(self.post.pk), 0)
+        self.assertEqual(counters.flush_views(), 0)
+
+    def test_view_recorded_during_flush_is_kept_for_the_next_one(self):
+        write_views = counters.write_views
+
+        def racing_write(deltas):
+            counters.record_view(self.post.pk)
+            write_views(deltas)
+
+        counters.record_view(self.post.pk)
+        with mock.patch.object(counters, 'write_views', racing_write):
+            self.assertEqual(counters.flush_views(), 1)
+        self.assertEqual(counters.pending_views(self.post.pk), 1)
+        self.assertEqual(counters.flush_views(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+    def test_failed_write_keeps_pending_views(self):
+        counters.record_view(self.post.pk)
+        with mock.patch.object(counters, 'apply_view_deltas', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                counters.flush_views()
+        self.assertEqual(counters.pending_views(self.post.pk), 1)
+        self.assertEqual(counters.flush_views(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+
+    def test_only_one_flush_runs_at_a_time(self):
+        counters.record_view(self.post.pk)
+        django_cache.add(counters._key('flush_lock'), 1)
+        self.assertEqual(counters.flush_views(), 0)
+        self.assertEqual(counters.pending_views(self.post.pk), 1)
+
+    @override_settings(BLOG_BUSTER_VIEW_BUFFER_CACHE=None)
+    def test_views_are_written_through_without_a_buffer(self):
+        counters.record_view(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+        self.assertEqual(counters.flush_views(), 0)
+
+    def test_buffer_cache_must_be_shared(self):
+        errors = checks.check_view_buffer_cache(None)
+        self.assertEqual([error.id for error in errors], ['blog_buster.E002'])
+
+
+class AnalyticsTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = datetime(2026, 6, 15, 12, tzinfo=dt_timezone.utc)
+        self.post = make_post(self.author, 'Viewed')
+
+    def buckets(self, post=None):
+        return list(
+            PostViewBucket.objects.filter(post=post or self.post)
+            .order_by('granularity', 'bucket_start')
+            .values_list('granularity', 'bucket_start', 'views')
+        )
+
+    def record(self, post, views, ago):
+        analytics.record_bucket_views({post.pk: views}, self.now - ago)
+
+    def test_views_accumulate_in_hourly_buckets(self):
+        analytics.record_bucket_views({self.post.pk: 2}, self.now.replace(minute=10))
+        analytics.record_bucket_views({self.post.pk: 3}, self.now.replace(minute=50))
+        self.assertEqual(self.buckets(), [('hour', self.now, 5)])
+
+    def test_compaction_rolls_hours_into_days_and_days_into_months(self):
+        self.record(self.post, 1, timedelta(hours=1))
+        self.record(self.post, 2, timedelta(days=3, hours=1))
+        self.record(self.post, 4, timedelta(days=3, hours=2))
+        PostViewBucket.objects.create(
+            post=self.post, granularity='day', bucket_start=datetime(2026, 6, 12, tzinfo=dt_timezone.utc), views=10,
+        )
+        PostViewBucket.objects.create(
+            post=self.post, granularity='day', bucket_start=datetime(2026, 1, 5, tzinfo=dt_timezone.utc), views=7,
+        )
+        PostViewBucket.objects.create(
+            post=self.post, granularity='day', bucket_start=datetime(2026, 1, 20, tzinfo=dt_timezone.utc), views=8,
+        )
+
+        self.assertEqual(analytics.compact_buckets(self.now), 4)
+        self.assertEqual(self.buckets(), [
+            ('day', datetime(2026, 6, 12, tzinfo=dt_timezone.utc), 16),
+            ('hour', self.now - timedelta(hours=1), 1),
+            ('month', datetime(2026, 1, 1, tzinfo=dt_timezone.utc), 15),
+        ])
+        self.assertEqual(analytics.compact_buckets(self.now), 0)
+
+    def test_leaderboards_rank_each_window(self):
+        recent = self.post
+        month = make_post(self.author, 'Last month')
+        quarter = make_post(self.author, 'Last quarter')
+        draft = make_post(self.author, 'Draft', status='draft')
+        self.record(recent, 5, timedelta(days=2))
+        self.record(month, 9, timedelta(days=20))
+        self.record(quarter, 20, timedelta(days=60))
+        self.record(draft, 100, timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(analytics.rebuild_leaderboards(self.now))
+        rankings = {
+            window: list(
+                PopularPostRanking.objects.filter(window_days=window).values_list('post_id', 'views')
+            )
+            for window in analytics.LEADERBOARD_WINDOWS
+        }
+        self.assertEqual(rankings, {
+            7: [(recent.pk, 5)],
+            30: [(month.pk, 9), (recent.pk, 5)],
+            90: [(quarter.pk, 20), (month.pk, 9), (recent.pk, 5)],
+        })
+        self.assertFalse(analytics.rebuild_leaderboards(self.now))
+
+        self.assertEqual([post.pk for post in analytics.popular_posts(14, 5)], [month.pk, recent.pk])
+        self.assertEqual([post.pk for post in analytics.popular_posts(7, 1)], [recent.pk])
+
+
+class SearchTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.python = Category.objects.create(name='Python', slug='python')
+        cls.tips = Tag.objects.create(name='Tips', slug='tips')
+
+    def publish(self, title, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_post(self.author, title, **fields)
+
+    def test_ranked_hits_with_highlighted_snippets(self):
+        best = self.publish('Caching guide', content='Caching pages and caching fragments')
+        other = self.publish('Deploying', content='Add caching after deploying')
+        self.publish('Unrelated', content='Nothing to see here')
+
+        posts = search.search_posts(Post.objects.all(), 'caching')
+        self.assertEqual(posts, [best, other])
+        self.assertIn('<mark>', posts[0].search_snippet)
+
+    def test_drafts_are_not_indexed(self):
+        self.publish('Secret caching plans', status='draft')
+        self.assertEqual(search.search_posts(Post.objects.all(), 'caching'), [])
+
+    def test_user_input_cannot_inject_query_syntax(self):
+        self.publish('Quotes', content='He said "caching" twice')
+        self.assertEqual(search.search_posts(Post.objects.all(), 'caching" OR "x'), [])
+        self.assertEqual(len(search.search_posts(Post.objects.all(), '"caching')), 1)
+
+    def test_filters_apply_before_the_result_limit(self):
+        for number in range(3):
+            self.publish(f'Caching {number}', content='caching caching caching')
+        in_category = self.publish('Python caching', category=self.python)
+        tagged = self.publish('Tagged caching')
+        tagged.tags.add(self.tips)
+
+        posts = search.search_posts(Post.objects.filter(category=self.python), 'caching', limit=1)
+        self.assertEqual(posts, [in_category])
+        posts = search.search_posts(Post.objects.filter(tags=self.tips), 'caching', limit=1)
+        self.assertEqual(posts, [tagged])
+
+    @override_settings(BLOG_BUSTER_SEARCH_BACKEND='blog_buster.search.SearchBackend')
+    def test_fallback_backend_respects_filters(self):
+        self.publish('Caching elsewhere')
+        in_category = self.publish('Python caching', category=self.python)
+        posts = search.search_posts(Post.objects.filter(category=self.python), 'caching', limit=1)
+        self.assertEqual(posts, [in_category])
+
+
+class RelatedPostTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.python = Category.objects.create(name='Python', slug='python')
+        cls.django = Tag.objects.create(name='Django', slug='django')
+
+    def publish(self, title, tags=(), **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = make_post(self.author, title, **fields)
+            post.tags.add(*tags)
+        return post
+
+    def related_ids(self, post):
+        return list(RelatedPost.objects.filter(post=post).values_list('related_id', flat=True))
+
+    def test_rebuild_all_ranks_shared_tags_and_category_first(self):
+        post = make_post(self.author, 'Post', category=self.python)
+        post.tags.add(self.django)
+        close = make_post(self.author, 'Close', category=self.python)
+        close.tags.add(self.django)
+        same_category = make_post(self.author, 'Same category', category=self.python)
+        make_post(self.author, 'Draft', status='draft', category=self.python)
+
+        self.assertEqual(related.rebuild_all(), 3)
+        self.assertEqual(self.related_ids(post)[:2], [close.pk, same_category.pk])
+        cards = related.related_posts_for(post, 5, by_tags=True)
+        self.assertEqual([card.pk for card in cards], [close.pk])
+
+    def test_saving_a_post_adds_it_to_its_neighbours_lists(self):
+        first = self.publish('First', tags=[self.django], category=self.python)
+        second = self.publish('Second', category=self.python)
+        self.assertEqual(self.related_ids(first), [second.pk])
+
+        third = self.publish('Third', tags=[self.django])
+        self.assertEqual(self.related_ids(first), [third.pk, second.pk])
+        self.assertEqual(self.related_ids(third)[0], first.pk)
+
+    def test_unpublishing_removes_the_post_from_other_lists(self):
+        first = self.publish('First', category=self.python)
+        second = self.publish('Second', category=self.python)
+        self.assertEqual(self.related_ids(first), [second.pk])
+
+        second.status = 'draft'
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertEqual(self.related_ids(first), [])
+        self.assertEqual(self.related_ids(second), [])
+
+    def test_full_list_is_refilled_when_a_post_drops_out(self):
+        post = self.publish('Post', tags=[self.django], category=self.python)
+        neighbours = [
+            self.publish(f'Neighbour {number}', category=self.python)
+            for number in range(related.RELATED_POSTS_LIMIT + 1)
+        ]
+        closest = self.publish('Closest', tags=[self.django], category=self.python)
+        self.assertEqual(len(self.related_ids(post)), related.RELATED_POSTS_LIMIT)
+        self.assertEqual(self.related_ids(post)[0], closest.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            closest.delete()
+        self.assertEqual(len(self.related_ids(post)), related.RELATED_POSTS_LIMIT)
+        self.assertNotIn(closest.pk, self.related_ids(post))
+        self.assertTrue(set(self.related_ids(post)) <= {neighbour.pk for neighbour in neighbours})
+
+    def test_filters_and_ordering_use_the_posts_own_rows(self):
+        other = Category.objects.create(name='Other', slug='other')
+        post = make_post(self.author, 'Post', category=self.python)
+        same = [make_post(self.author, f'Same {number}', category=self.python) for number in range(2)]
+        elsewhere = [make_post(self.author, f'Elsewhere {number}', category=other) for number in range(3)]
+        related.rebuild_all()
+        # Every post also holds rows for the others, with their own flags and scores
+        self.assertGreater(RelatedPost.objects.exclude(post=post).count(), 0)
+
+        cards = related.related_posts_for(post, 5, by_category=True)
+        self.assertEqual(sorted(card.pk for card in cards), sorted(p.pk for p in same))
+        cards = related.related_posts_for(post, 5)
+        self.assertEqual([card.pk for card in cards], self.related_ids(post))
+        self.assertEqual(len(cards), len(same) + len(elsewhere))
+
+
+class PaginationTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        # Two posts share each timestamp so the id tiebreak is exercised
+        cls.posts = [
+            make_post(cls.author, f'Post {number}', published_at=now - timedelta(hours=number // 2))
+            for number in range(25)
+        ]
+        cls.newest_first = sorted(cls.posts, key=lambda post: (post.published_at, post.pk), reverse=True)
+
+    def paginate(self, query=''):
+        request = RequestFactory().get('/posts/?' + query)
+        return pagination.paginate_posts(request, Post.objects.filter(status='published'), 10)
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        first = self.paginate()
+        self.assertEqual(list(first), self.newest_first[:10])
+        self.assertFalse(first.has_previous())
+
+        second = self.paginate(first.next_querystring)
+        self.assertEqual((second.number, list(second)), (2, self.newest_first[10:20]))
+        third = self.paginate(second.next_querystring)
+        self.assertEqual(list(third), self.newest_first[20:])
+        self.assertFalse(third.has_next())
+
+        back = self.paginate(third.previous_querystring)
+        self.assertEqual((back.number, list(back)), (2, self.newest_first[10:20]))
+
+    def test_cursor_pages_issue_no_count(self):
+        first = self.paginate()
+        with self.assertNumQueries(1):
+            self.paginate(first.next_querystring)
+
+    def test_last_page_link(self):
+        last = self.paginate(self.paginate().last_querystring)
+        self.assertEqual(list(last), self.newest_first[15:])
+        self.assertTrue(last.has_previous())
+        self.assertFalse(last.has_next())
+
+    def test_malformed_cursor_starts_over(self):
+        self.assertEqual(list(self.paginate('cursor=not-a-cursor')), self.newest_first[:10])
+
+    def test_offset_pages_within_the_limit(self):
+        page = self.paginate('page=2')
+        self.assertEqual((page.number, list(page)), (2, self.newest_first[10:20]))
+        self.assertEqual(list(self.paginate(page.next_querystring)), self.newest_first[20:])
+
+    def test_offset_pages_past_the_limit_or_the_end_are_not_found(self):
+        with self.assertRaises(Http404):
+            self.paginate(f'page={pagination.OFFSET_PAGE_LIMIT + 1}')
+        with self.assertRaises(Http404):
+            self.paginate('page=4')
+
+    def test_ranked_lists_use_offsets(self):
+        request = RequestFactory().get('/posts/', {'page': 3})
+        page = pagination.paginate_posts(request, self.newest_first, 10)
+        self.assertEqual(list(page), self.newest_first[20:])
+        self.assertEqual(page.previous_querystring, 'page=2')
+        request = RequestFactory().get('/posts/', {'page': 4})
+        with self.assertRaises(Http404):
+            pagination.paginate_posts(request, self.newest_first, 10)
+
+    def test_post_list_returns_404_for_pages_past_the_limit(self):
+        response = self.client.get(reverse('post_list'), {'page': 50})
+        self.assertEqual(response.status_code, 404)
+
+
+class ReadingStatsTests(BlogTestCase):
+    def test_saving_content_updates_reading_stats(self):
+        post = make_post(self.author, 'Long read', content='word ' * 450)
+        self.assertEqual((post.word_count, post.reading_time), (450, 2))
+        post.content = 'word ' * 1000
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual((post.word_count, post.reading_time), (1000, 5))
+
+    def test_saving_a_deferred_post_does_not_load_its_content(self):
+        post = make_post(self.author, 'Long read', content='word ' * 450)
+        deferred = Post.objects.defer('content').get(pk=post.pk)
+        deferred.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            deferred.save()
+        self.assertFalse(any('"content"' in query['sql'] for query in queries))
+        post.refresh_from_db()
+        self.assertEqual((post.title, post.word_count, post.reading_time), ('Renamed', 450, 2))
+
+
+class PostCountTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.python = Category.objects.create(name='Python', slug='python')
+        cls.rust = Category.objects.create(name='Rust', slug='rust')
+        cls.tips = Tag.objects.create(name='Tips', slug='tips')
+
+    def assertCounts(self, python, rust, tips):
+        counts = [
+            type(row).objects.get(pk=row.pk).published_post_count
+            for row in (self.python, self.rust, self.tips)
+        ]
+        self.assertEqual(counts, [python, rust, tips])
+
+    def test_publishing_and_unpublishing(self):
+        post = make_post(self.author, 'Post', category=self.python)
+        post.tags.add(self.tips)
+        make_post(self.author, 'Draft', status='draft', category=self.python).tags.add(self.tips)
+        self.assertCounts(1, 0, 1)
+
+        post.status = 'draft'
+        post.save()
+        self.assertCounts(0, 0, 0)
+        post.status = 'published'
+        post.save(update_fields=['status'])
+        self.assertCounts(1, 0, 1)
+
+    def test_moving_a_post_between_categories(self):
+        post = make_post(self.author, 'Post', category=self.python)
+        post.category = self.rust
+        post.save()
+        self.assertCounts(0, 1, 0)
+
+    def test_tag_changes_from_either_side(self):
+        post = make_post(self.author, 'Post')
+        self.tips.posts.add(post)
+        self.assertCounts(0, 0, 1)
+        post.tags.clear()
+        self.assertCounts(0, 0, 0)
+        post.tags.set([self.tips])
+        self.assertCounts(0, 0, 1)
+        self.tips.posts.remove(post)
+        self.assertCounts(0, 0, 0)
+
+    def test_deleting_a_post(self):
+        post = make_post(self.author, 'Post', category=self.python)
+        post.tags.add(self.tips)
+        post.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_view_count_saves_do_not_recount(self):
+        post = make_post(self.author, 'Post', category=self.python)
+        post.views = 10
+        with self.assertNumQueries(1):
+            post.save(update_fields=['views'])
+
+    def test_reconcile_repairs_drift_from_bulk_updates(self):
+        post = make_post(self.author, 'Post', category=self.python)
+        post.tags.add(self.tips)
+        Post.objects.filter(pk=post.pk).update(status='draft')
+        self.assertCounts(1, 0, 1)
+
+        self.assertEqual(post_counts.refresh_category_counts(), 1)
+        self.assertEqual(post_counts.refresh_tag_counts(), 1)
+        self.assertCounts(0, 0, 0)
+        self.assertEqual(post_counts.refresh_category_counts(), 0)
+
+
+class PageCacheTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = make_post(self.author, 'Cached')
+        self.renders = 0
+
+        @page_cache.cache_page(on_hit=self.on_hit)
+        def view(request):
+            self.renders += 1
+            page_cache.depends_on(request, page_cache.tag(Post, self.post.pk))
+            page_cache.remember(request, post_id=self.post.pk)
+            return HttpResponse(f'render {self.renders}')
+
+        self.view = view
+        self.hits = []
+
+    def on_hit(self, request, post_id):
+        self.hits.append(post_id)
+
+    def get(self, user=None, method='get', cookies=None):
+        request = getattr(RequestFactory(), method)('/cached/')
+        request.COOKIES.update(cookies or {})
+        request.user = user or AnonymousUser()
+        return self.view(request).content
+
+    def test_hits_until_a_declared_tag_is_purged(self):
+        self.assertEqual(self.get(), b'render 1')
+        self.assertEqual(self.get(), b'render 1')
+        self.assertEqual(self.hits, [self.post.pk])
+
+        page_cache.purge(page_cache.tag(Post))
+        self.assertEqual(self.get(), b'render 1')
+        page_cache.purge(page_cache.tag(Post, self.post.pk))
+        self.assertEqual(self.get(), b'render 2')
+
+    def test_purge_during_a_render_is_not_missed(self):
+        @page_cache.cache_page()
+        def racing_view(request):
+            self.renders += 1
+            page_cache.purge(page_cache.tag(Post, self.post.pk))
+            page_cache.depends_on(request, page_cache.tag(Post, self.post.pk))
+            return HttpResponse(f'render {self.renders}')
+
+        self.view = racing_view
+        self.assertEqual(self.get(), b'render 1')
+        self.assertEqual(self.get(), b'render 2')
+
+    def test_saving_the_post_purges_its_pages_on_commit(self):
+        self.get()
+        self.post.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+            self.assertEqual(self.get(), b'render 1')
+        self.assertEqual(self.get(), b'render 2')
+
+    def test_view_count_saves_keep_pages_cached(self):
+        self.get()
+        self.post.views = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save(update_fields=['views'])
+        self.assertEqual(self.get(), b'render 1')
+
+    def test_tagging_a_post_purges_its_pages(self):
+        self.get()
+        tag = Tag.objects.create(name='Tips', slug='tips')
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.posts.add(self.post)
+        self.assertEqual(self.get(), b'render 2')
+
+    def test_logged_in_and_unsafe_requests_bypass_the_cache(self):
+        self.get()
+        self.assertEqual(self.get(user=User(username='reader')), b'render 2')
+        self.assertEqual(self.get(user=User(username='editor', is_staff=True)), b'render 3')
+        self.assertEqual(self.get(method='post'), b'render 4')
+        self.assertEqual(self.get(), b'render 1')
+
+    def test_requests_with_session_or_csrf_cookies_bypass_the_cache(self):
+        self.get()
+        self.assertEqual(self.get(cookies={settings.SESSION_COOKIE_NAME: 'abc'}), b'render 2')
+        self.assertEqual(self.get(cookies={settings.CSRF_COOKIE_NAME: 'abc'}), b'render 3')
+        self.assertEqual(self.get(), b'render 1')
+
+    def test_per_client_responses_are_not_stored(self):
+        @page_cache.cache_page()
+        def view(request):
+            self.renders += 1
+            response = HttpResponse(f'render {self.renders}')
+            if self.renders == 1:
+                patch_vary_headers(response, ['Cookie'])
+            elif self.renders == 2:
+                get_token(request)
+            return response
+
+        self.view = view
+        self.assertEqual(self.get(), b'render 1')
+        self.assertEqual(self.get(), b'render 2')
+        self.assertEqual(self.get(), b'render 3')
+        self.assertEqual(self.get(), b'render 3')
+
+
+@override_settings(BLOG_BUSTER_VIEW_BUFFER_CACHE='default')
+class ConditionalGetTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.older = make_post(self.author, 'Older', published_at=now - timedelta(days=1))
+        self.newer = make_post(self.author, 'Newer', published_at=now)
+
+    def test_matching_etag_is_answered_without_rendering(self):
+        response = self.client.get(reverse('post_list'))
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('post_list'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_is_answered(self):
+        last_modified = self.client.get(reverse('post_list'))['Last-Modified']
+        response = self.client.get(reverse('post_list'), headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_post_still_counts_the_view(self):
+        url = self.older.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(counters.pending_views(self.older.pk), 1)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(counters.pending_views(self.older.pk), 2)
+
+    def test_unpublishing_an_older_post_changes_the_etag(self):
+        etag = self.client.get(reverse('post_list'))['ETag']
+        # Without its commit hooks, as a process that doesn't share the cache version sees it
+        Post.objects.filter(pk=self.older.pk).update(status='draft')
+        response = self.client.get(reverse('post_list'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class StaticExportTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.older = make_post(self.author, 'Older post', published_at=now - timedelta(days=1))
+        self.newer = make_post(self.author, 'Newer post', published_at=now)
+        self.output_dir = self.enterContext(tempfile.TemporaryDirectory())
+
+    def export(self):
+        out = StringIO()
+        call_command('export_static', self.output_dir, workers=1, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def read(self, url):
+        with open(os.path.join(self.output_dir, static_export.output_path(url))) as handle:
+            return handle.read()
+
+    def outcome(self, url):
+        with open(os.path.join(self.output_dir, static_export.MANIFEST_NAME)) as handle:
+            previous = json.load(handle)['pages'][url]
+        return static_export.export_page(url, self.output_dir, previous)[1]
+
+    def test_unchanged_pages_are_skipped(self):
+        self.export()
+        for url in (reverse('index'), reverse('post_list'), self.older.get_absolute_url()):
+            self.assertEqual(self.outcome(url), 'unchanged')
+
+    def test_unpublished_post_is_dropped(self):
+        self.export()
+        detail = self.older.get_absolute_url()
+        self.assertIn('Older post', self.read(reverse('post_list')))
+
+        # Saved elsewhere; each export runs in a fresh process with empty caches
+        self.older.status = 'draft'
+        self.older.save()
+        cache.clear()
+        self.assertIn('1 removed', self.export())
+        self.assertNotIn('Older post', self.read(reverse('post_list')))
+        self.assertNotIn('Older post', self.read(reverse('index')))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, static_export.output_path(detail))))
+
+
+class ImageRenditionTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self, name, size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_uploads_get_every_width_in_each_format(self):
+        post = make_post(self.author, 'Pictured', featured_image=self.upload('wide.jpg', (1000, 500)))
+        data = post.featured_image_renditions
+        self.assertEqual(data['source'], post.featured_image.name)
+        self.assertEqual(
+            sorted({(rendition['width'], rendition['height']) for rendition in data['renditions']}),
+            [(96, 48), (320, 160), (640, 320), (960, 480), (1000, 500)],
+        )
+        self.assertEqual({rendition['format'] for rendition in data['renditions']}, {'webp', 'jpeg'})
+        for rendition in data['renditions']:
+            with default_storage.open(rendition['name']) as handle:
+                self.assertEqual(Image.open(handle).size, (rendition['width'], rendition['height']))
+
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_renditions, data)
+
+    def test_replacing_an_image_replaces_its_renditions(self):
+        post = make_post(self.author, 'Pictured', featured_image=self.upload('first.jpg', (400, 400)))
+        old = [rendition['name'] for rendition in post.featured_image_renditions['renditions']]
+        with mock.patch.object(images, 'generate_renditions', wraps=images.generate_renditions) as generate:
+            post.title = 'Retitled'
+            post.save()
+            generate.assert_not_called()
+            post.featured_image = self.upload('second.jpg', (200, 100))
+            post.save()
+            generate.assert_called_once()
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+        self.assertEqual(
+            sorted({rendition['width'] for rendition in post.featured_image_renditions['renditions']}), [96, 200],
+        )
+
+    def test_template_tag_renders_srcsets(self):
+        post = make_post(self.author, 'Pictured', featured_image=self.upload('wide.jpg', (1000, 500)))
+        template = Template(
+            '{% load responsive_images %}'
+            '{% responsive_image post.featured_image post.featured_image_renditions alt="A" %}'
+        )
+        html = template.render(Context({'post': post}))
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn('src="/media/renditions/blog_images/wide-960w.jpeg"', html)
+        self.assertIn('wide-1000w.jpeg 1000w', html)
+        self.assertIn('width="1000" height="500"', html)
+        self.assertIn('alt="A"', html)
+
+    def test_command_backfills_missing_renditions(self):
+        post = make_post(self.author, 'Pictured', featured_image=self.upload('wide.jpg', (300, 200)))
+        Post.objects.filter(pk=post.pk).update(featured_image_renditions={})
+        out = StringIO()
+        call_command('generate_image_renditions', workers=1, stdout=out)
+        self.assertIn('Refreshed renditions for 1 of 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(len(post.featured_image_renditions['renditions']), 4)
+
+
+class DummyImageTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def assign(self, **options):
+        out = StringIO()
+        command = assign_dummy_images.Command
+        with mock.patch.object(command, '_write', autospec=True, side_effect=command._write) as write:
+            call_command('assign_dummy_images', stdout=out, **options)
+        return out.getvalue(), [len(call.args[1]) for call in write.call_args_list]
+
+    def test_images_are_written_in_batches(self):
+        posts = [make_post(self.author, f'Post {n}') for n in range(5)]
+        version = cache.get_version()
+        out, batches = self.assign(workers=2, batch_size=2)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertIn('Dummy images added to 5 post(s)', out)
+        self.assertGreater(cache.get_version(), version)
+        for n, post in enumerate(posts):
+            post.refresh_from_db()
+            self.assertEqual(post.featured_image.name, f'blog_images/post-{n}.jpg')
+            self.assertEqual(post.featured_image_renditions['source'], post.featured_image.name)
+            with post.featured_image.open() as handle:
+                self.assertEqual(Image.open(handle).size, (1200, 800))
+            for rendition in post.featured_image_renditions['renditions']:
+                self.assertTrue(default_storage.exists(rendition['name']))
+
+    def test_only_posts_without_images_are_updated(self):
+        pictured = make_post(self.author, 'Pictured', featured_image='blog_images/existing.jpg')
+        bare = [make_post(self.author, f'Bare {n}').pk for n in range(3)]
+        out, batches = self.assign(workers=1, limit=2)
+        self.assertEqual(batches, [2])
+        pictured.refresh_from_db()
+        self.assertEqual(pictured.featured_image.name, 'blog_images/existing.jpg')
+        self.assertEqual(
+            [bool(post.featured_image) for post in Post.objects.filter(pk__in=bare).order_by('pk')],
+            [True, True, False],
+        )
+        self.assign(workers=1)
+        out, batches = self.assign(workers=1)
+        self.assertIn('All posts already have featured images', out)
+        self.assertEqual(batches, [])
+
+
+class LoadDataTests(BlogTestCase):
+    options = {'posts': 30, 'tags': 12, 'categories': 4, 'authors': 3, 'guides': 2, 'reviews': 2, 'howtos': 2}
+
+    def generate(self, **options):
+        now = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        with mock.patch.object(timezone, 'now', return_value=now):
+            call_command('generate_load_data', stdout=StringIO(), **self.options, **options)
+        return self.snapshot(f"{options['prefix']}-{options['seed']}")
+
+    def snapshot(self, label):
+        """Generated rows with the dataset label stripped, so two datasets can be compared"""
+        posts = Post.objects.filter(slug__startswith=f'{label}-').order_by('slug')
+        rows = [
+            (
+                post.slug, post.title, post.author.username, post.category.slug, post.status, post.featured,
+                post.views, post.published_at, post.content, sorted(tag.slug for tag in post.tags.all()),
+            )
+            for post in posts.select_related('author', 'category').prefetch_related('tags')
+        ]
+        rows.append(sorted(
+            (guide.slug, guide.title, [(pick.verdict, pick.rating) for pick in guide.picks.order_by('sort_order')])
+            for guide in BuyingGuide.objects.filter(slug__startswith=f'{label}-')
+        ))
+        rows.append(sorted(
+            (review.slug, review.product_name, sorted((score.label, score.score) for score in review.scores.all()))
+            for review in ProductReview.objects.filter(slug__startswith=f'{label}-')
+        ))
+        rows.append(sorted(
+            (series.slug, series.title, series.steps.count())
+            for series in HowToSeries.objects.filter(slug__startswith=f'{label}-')
+        ))
+        return json.loads(json.dumps(rows, default=str).replace(label, 'LABEL'))
+
+    def test_same_seed_builds_the_same_data(self):
+        first = self.generate(prefix='first', seed=7, chunk_size=1000)
+        second = self.generate(prefix='second', seed=7, chunk_size=4)
+        self.assertEqual(len(first), self.options['posts'] + 3)
+        self.assertEqual(first, second)
+        self.assertNotEqual(self.generate(prefix='third', seed=8), first)
+
+    def test_views_follow_a_zipf_curve(self):
+        self.generate(prefix='zipf', seed=1, draft_ratio=0, max_views=1000)
+        views = sorted(Post.objects.filter(slug__startswith='zipf-1-').values_list('views', flat=True), reverse=True)
+        self.assertEqual(views[:4], [1000, int(1000 / 2 ** 1.1), int(1000 / 3 ** 1.1), int(1000 / 4 ** 1.1)])
+
+    def test_existing_dataset_is_not_duplicated(self):
+        self.generate(prefix='once', seed=3)
+        with self.assertRaisesMessage(CommandError, "Posts prefixed 'once-3-' already exist"):
+            self.generate(prefix='once', seed=3)
+
+
+class SidebarFragmentTests(BlogTestCase):
+    template = Template('{% load sidebar_widgets %}{% render_sidebar_widgets %}')
+
+    def setUp(self):
+        super().setUp()
+        widget = SidebarWidget.objects.create(widget_type='newsletter', title='Newsletter')
+        self.config = NewsletterWidget.objects.create(widget=widget, button_text='Join')
+
+    def render(self):
+        return self.template.render(Context({'sidebar_widgets': load_sidebar_widgets()}))
+
+    def test_fragments_are_served_from_the_cache(self):
+        self.assertIn('Join', self.render())
+        with mock.patch.object(Engine, 'get_template', side_effect=AssertionError('rendered')):
+            self.assertIn('Join', self.render())
+
+    def test_saving_a_config_rerenders_its_widget(self):
+        self.render()
+        self.config.button_text = 'Subscribe'
+        self.config.save()
+        self.assertIn('Subscribe', self.render())
+
+    def test_deleting_a_config_rerenders_its_widget(self):
+        self.assertIn('Join', self.render())
+        self.config.delete()
+        self.assertNotIn('Join', self.render())
+
+
+@override_settings(BLOG_BUSTER_SQL_SAMPLE_RATE=1, BLOG_BUSTER_SQL_REPEAT_THRESHOLD=3)
+class QueryInstrumentationTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.posts = [make_post(self.author, f'Post {number}') for number in range(3)]
+
+    def respond(self, view):
+        middleware = QueryInstrumentationMiddleware(view)
+        return middleware(RequestFactory().get('/posts/'))
+
+    def test_repeated_queries_are_flagged_with_their_call_site(self):
+        def view(request):
+            for post in Post.objects.filter(pk__in=[post.pk for post in self.posts]):
+                post.author.username  # one query per post
+            return HttpResponse()
+
+        with self.assertLogs('blog_buster.sql', 'WARNING') as logs:
+            response = self.respond(view)
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        self.assertIn('n1;desc="1 repeated shapes"', response['Server-Timing'])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 4)
+        [repeated] = record['repeated']
+        self.assertEqual(repeated['count'], 3)
+        self.assertIn('auth_user', repeated['sql'])
+        self.assertRegex(repeated['python'], r'blog_buster/tests\.py:\d+ in view')
+
+    def test_clean_requests_log_at_info(self):
+        def view(request):
+            list(Post.objects.select_related('author'))
+            return HttpResponse()
+
+        with self.assertLogs('blog_buster.sql', 'INFO') as logs:
+            response = self.respond(view)
+        self.assertIn('n1;desc="0 repeated shapes"', response['Server-Timing'])
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+
+    @override_settings(BLOG_BUSTER_SQL_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.respond(lambda request: HttpResponse())
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+@override_settings(BLOG_BUSTER_VERSION_CHECK_INTERVAL=0)
+class WidgetContextTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('seed_sidebar_widgets', stdout=StringIO())
+        cls.post = make_post(cls.author, 'Listed')
+
+    def test_warm_context_runs_no_queries(self):
+        views.get_widget_context()
+        with self.assertNumQueries(0):
+            context = views.get_widget_context()
+        self.assertEqual(len(context['sidebar_widgets']), SidebarWidget.objects.filter(is_active=True).count())
+
+    def test_content_changes_rebuild_the_context(self):
+        views.get_widget_context()
+        with self.captureOnCommitCallbacks(execute=True):
+            QuickTip.objects.create(title='Back up first', description='Always', is_active=True)
+        tips = next(
+            widget['tips'] for widget in views.get_widget_context()['sidebar_widgets'] if 'tips' in widget
+        )
+        self.assertEqual([tip.title for tip in tips], ['Back up first'])
+
+    def test_view_count_saves_keep_the_context(self):
+        views.get_widget_context()
+        self.post.views = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save(update_fields=['views'])
+        with self.assertNumQueries(0):
+            views.get_widget_context()
+
+
+class SidebarWidgetLoaderTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('seed_sidebar_widgets', stdout=StringIO())
+        make_post(cls.author, 'Listed')
+
+    def test_widgets_load_in_one_query_per_data_source(self):
+        # Widgets with their configs, then popular (rankings, then the
+        # lifetime fallback), categories, recent posts, tips and guides
+        with self.assertNumQueries(7):
+            widgets = load_sidebar_widgets()
+        self.assertEqual(len(widgets), len(WIDGET_LOADERS))
+        with self.assertNumQueries(0):
+            for widget_data in widgets:
+                get_loader(widget_data['widget'].widget_type).get_config(widget_data['widget'])
+
+    def test_config_only_widgets_add_no_queries(self):
+        SidebarWidget.objects.exclude(widget_type__in=['author_bio', 'social_share', 'newsletter']).delete()
+        with self.assertNumQueries(1):
+            widgets = load_sidebar_widgets()
+        configs = {widget_data['widget'].widget_type: widget_data['config'] for widget_data in widgets}
+        self.assertEqual(configs['newsletter'], NewsletterWidget.objects.get())
+
+    def test_admin_inline_comes_from_the_registry(self):
+        widget = SidebarWidget.objects.get(widget_type='newsletter')
+        model_admin = admin.site._registry[SidebarWidget]
+        [inline] = model_admin.get_inlines(None, widget)
+        self.assertIs(inline.model, NewsletterWidget)
+
+
+class MetricsEndpointTests(BlogTestCase):
+    @override_settings(BLOG_BUSTER_METRICS_TOKEN=None, DEBUG=False)
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+
+    @override_settings(BLOG_BUSTER_METRICS_TOKEN=None, DEBUG=True)
+    def test_open_without_a_token_in_debug(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    @override_settings(BLOG_BUSTER_METRICS_TOKEN='secret')
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        response = self.client.get('/metrics/', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+
+class TieredCacheTests(BlogTestCase):
+    def test_concurrent_misses_build_once(self):
+        builds = []
+        started = threading.Event()
+
+        def builder():
+            builds.append(1)
+            started.wait(1)
+            return ['built']
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_build('flight', builder)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        started.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(builds, [1])
+        self.assertEqual(results, [['built']] * 8)
+
+    def test_waits_for_a_build_running_in_another_worker(self):
+        self.assertTrue(cache._acquire('elsewhere'))
+        threading.Timer(0.1, lambda: django_cache.set('elsewhere', (time.time() + 60, 'theirs'))).start()
+        self.assertEqual(cache.get_or_build('elsewhere', lambda: 'ours'), 'theirs')
+
+    def test_expired_entries_are_served_while_refreshing(self):
+        cache.get_or_build('stale', lambda: 'old', timeout=0, stale=60)
+        refreshed = threading.Event()
+
+        def rebuild():
+            refreshed.set()
+            return 'new'
+
+        self.assertEqual(cache.get_or_build('stale', rebuild, timeout=60), 'old')
+        self.assertTrue(refreshed.wait(1))
+        for _ in range(20):
+            if django_cache.get('stale')[1] == 'new':
+                break
+            time.sleep(0.05)
+        self.assertEqual(cache.get_or_build('stale', rebuild), 'new')
+
+    def test_hits_never_share_objects(self):
+        cache.set('shared', ['a'])
+        cache.get('shared').append('b')
+        self.assertEqual(cache.get('shared'), ['a'])
+
+    @override_settings(BLOG_BUSTER_LOCAL_CACHE_MAX_ENTRIES=2)
+    def test_local_tier_is_bounded(self):
+        for key in ('a', 'b', 'c'):
+            cache.local.set(key, key)
+        self.assertEqual([cache.local.get(key) for key in ('a', 'b', 'c')], [None, 'b', 'c'])
+
+    @override_settings(BLOG_BUSTER_VERSION_CHECK_INTERVAL=0)
+    def test_bumps_switch_keys(self):
+        version = cache.get_version('things')
+        self.assertEqual(cache.get_versioned('list', lambda: 'first', namespace='things'), 'first')
+        self.assertEqual(cache.get_versioned('list', lambda: 'second', namespace='things'), 'first')
+        self.assertEqual(cache.bump_version('things'), version + 1)
+        self.assertEqual(cache.get_versioned('list', lambda: 'second', namespace='things'), 'second')
+
+    @override_settings(BLOG_BUSTER_VERSION_CHECK_INTERVAL=0)
+    def test_lost_versions_are_never_reused(self):
+        cache.get_versioned('list', lambda: 'old', namespace='things')
+        cache.bump_version('things')
+        # The counter is evicted while payloads stored under it survive
+        django_cache.delete(cache.VERSION_KEY.format(namespace='things'))
+        cache.local.clear()
+        self.assertEqual(cache.get_versioned('list', lambda: 'new', namespace='things'), 'new')
+
+    def test_clearing_never_reuses_versions(self):
+        version = cache.bump_version('cleared')
+        cache.clear()
+        self.assertGreater(cache.get_version('cleared'), version)
+
+    def test_bumping_an_unseeded_version(self):
+        version = cache.bump_version('fresh')
+        cache._versions.clear()
+        self.assertEqual(cache.get_version('fresh'), version)
+
+
+@override_settings(BLOG_BUSTER_VERSION_CHECK_INTERVAL=0)
+class NavigationCategoryTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        Category.objects.create(name='Python', slug='python')
+        context_processors._navigation = (None, [])
+
+    def names(self, context):
+        return [category.name for category in context['categories']]
+
+    def test_categories_load_only_when_used(self):
+        with self.assertNumQueries(0):
+            context = context_processors.categories(RequestFactory().get('/'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(context), ['Python'])
+
+    def test_snapshot_is_reused_until_categories_change(self):
+        self.names(context_processors.categories(None))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(context_processors.categories(None)), ['Python'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Django', slug='django')
+        with self.assertNumQueries(1):
+            self.assertEqual(sorted(self.names(context_processors.categories(None))), ['Django', 'Python'])
+
+
+@override_settings(BLOG_BUSTER_VERSION_CHECK_INTERVAL=0)
+class SingletonTests(BlogTestCase):
+    def test_row_is_created_by_migrate(self):
+        self.assertTrue(HomepageSettings.objects.filter(pk=1).exists())
+
+    def test_loads_are_served_from_the_process_copy(self):
+        with self.assertNumQueries(1):
+            HomepageSettings.load()
+        with self.assertNumQueries(0):
+            settings = HomepageSettings.load()
+        settings.hero_heading = 'Changed but not saved'
+        self.assertNotEqual(HomepageSettings.load().hero_heading, 'Changed but not saved')
+
+    def test_saving_invalidates_the_copy_on_commit(self):
+        settings = HomepageSettings.load()
+        settings.hero_heading = 'New heading'
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+            self.assertNotEqual(HomepageSettings.load().hero_heading, 'New heading')
+        self.assertEqual(HomepageSettings.load().hero_heading, 'New heading')
+
+    def test_edits_from_other_processes_arrive_through_the_version(self):
+        HomepageSettings.load()
+        HomepageSettings.objects.filter(pk=1).update(hero_heading='Edited elsewhere')
+        self.assertNotEqual(HomepageSettings.load().hero_heading, 'Edited elsewhere')
+        cache.bump_version(HomepageSettings.cache_namespace())
+        self.assertEqual(HomepageSettings.load().hero_heading, 'Edited elsewhere')
+
+    def test_deleted_row_loads_unsaved_defaults(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            HomepageSettings.load().delete()
+        settings = HomepageSettings.load()
+        self.assertTrue(settings._state.adding)
+        self.assertEqual(settings.hero_heading, HomepageSettings._meta.get_field('hero_heading').default)
+
+
+@override_settings(BLOG_BUSTER_DB_REPLICAS=['replica'])
+class ReplicaRoutingTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        replicas._lag.clear()
+        patcher = mock.patch.object(replicas, 'measure_lag', return_value=0.0)
+        self.measure_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(replicas._lag.clear)
+
+    def serve(self, method='get', cookies=None, write=False):
+        """Route a request through the middleware; returns (reads before, reads after, response)"""
+        reads = []
+
+        @replicas.read_from_replica
+        def view(request):
+            reads.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+            reads.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = replicas.ReplicaMiddleware(view)(request)
+        return reads[0], reads[1], response
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertIsNone(replicas.ReplicaRouter().db_for_read(Post))
+
+    def test_anonymous_reads_go_to_a_replica(self):
+        before, after, response = self.serve()
+        self.assertEqual((before, after), ('replica', 'replica'))
+        self.assertNotIn(replicas._sticky_cookie(), response.cookies)
+
+    def test_writes_during_a_get_do_not_pin_the_client(self):
+        before, after, response = self.serve(write=True)
+        self.assertEqual((before, after), ('replica', 'replica'))
+        self.assertNotIn(replicas._sticky_cookie(), response.cookies)
+
+    def test_writing_post_pins_the_client_to_the_primary(self):
+        before, after, response = self.serve(method='post', write=True)
+        self.assertEqual((before, after), ('default', 'default'))
+        self.assertIn(replicas._sticky_cookie(), response.cookies)
+
+        before, _, response = self.serve(cookies={replicas._sticky_cookie(): '1'})
+        self.assertEqual(before, 'default')
+
+    def test_sessions_and_users_stay_on_the_primary(self):
+        state = replicas.RoutingState(sticky=False, safe=True)
+        state.replica = 'replica'
+        token = replicas._state.set(state)
+        try:
+            self.assertEqual(router.db_for_read(User), 'default')
+        finally:
+            replicas._state.reset(token)
+
+    def test_replicas_behind_the_last_write_are_skipped(self):
+        self.assertEqual(replicas.choose_replica(), 'replica')
+        replicas.record_write()
+        self.assertIsNone(replicas.choose_replica())
+
+    @override_settings(BLOG_BUSTER_DB_LAG_CHECK_INTERVAL=0)
+    def test_lagging_or_unreachable_replicas_are_skipped(self):
+        self.measure_lag.return_value = 60.0
+        self.assertIsNone(replicas.choose_replica())
+        self.measure_lag.return_value = None
+        self.assertIsNone(replicas.choose_replica())
+        self.measure_lag.return_value = 0.0
+        self.assertEqual(replicas.choose_replica(), 'replica')
+
+
+@override_settings(BLOG_BUSTER_DB_REPLICAS=['default'], BLOG_BUSTER_VIEW_BUFFER_CACHE=None)
+class ReplicaStickinessTests(BlogTestCase):
+    """Full requests, with the primary standing in for its own replica"""
+
+    def test_counting_a_view_keeps_the_page_cacheable(self):
+        post = make_post(self.author, 'Counted')
+        response = self.client.get(post.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(replicas._sticky_cookie(), response.cookies)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 1)
+
+    def test_logging_in_pins_the_client(self):
+        User.objects.create_superuser('editor', password='secret')
+        response = self.client.post('/admin/login/', {'username': 'editor', 'password': 'secret'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(replicas._sticky_cookie(), response.cookies)
+
+
+class PostCardTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('seed_sidebar_widgets', stdout=StringIO())
+        cls.category = Category.objects.create(name='Python', slug='python')
+        cls.tag = Tag.objects.create(name='Tips', slug='tips')
+
+    def publish(self, count):
+        for number in range(count):
+            author = User.objects.create(username=f'writer{Post.objects.count()}')
+            post = make_post(author, f'Card {Post.objects.count()}', category=self.category)
+            post.tags.add(self.tag)
+
+    def get(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return queries
+
+    def test_listings_never_load_post_bodies(self):
+        self.publish(3)
+        urls = [reverse('index'), reverse('post_list'), self.category.get_absolute_url(), self.tag.get_absolute_url()]
+        for url in urls:
+            with self.subTest(url=url):
+                sql = [query['sql'] for query in self.get(url)]
+                self.assertFalse([statement for statement in sql if '"blog_buster_post"."content"' in statement])
+
+    def test_card_authors_and_categories_are_joined(self):
+        self.publish(2)
+        counts = {url: len(self.get(url)) for url in (reverse('post_list'), self.category.get_absolute_url())}
+        self.publish(4)
+        self.assertEqual({url: len(self.get(url)) for url in counts}, counts)
+
+    def test_cached_widget_posts_are_cards(self):
+        self.publish(2)
+        widgets = views.get_widget_context()['sidebar_widgets']
+        recent = next(data['posts'] for data in widgets if data['widget'].widget_type == 'recent_posts')
+        self.assertTrue(recent)
+        self.assertTrue(all(isinstance(post, PostCard) for post in recent))
+        self.assertEqual(pickle.loads(pickle.dumps(recent))[0].title, recent[0].title)
+
+
+@override_settings(BLOG_BUSTER_VIEW_BUFFER_CACHE='default')
+class QueryBudgetTests(BlogTestCase):
+    """Query counts of the public routes on a small fixture
+
+    benchmark_views checks the same routes against benchmark_budgets.json on
+    the demo and load-test datasets; these catch regressions in the test run.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('seed_sidebar_widgets', stdout=StringIO())
+        cls.category = Category.objects.create(name='Python', slug='python')
+        cls.tag = Tag.objects.create(name='Tips', slug='tips')
+        cls.posts = []
+        for number in range(12):
+            post = make_post(cls.author, f'Router guide {number}', category=cls.category, featured=number == 0)
+            post.tags.add(cls.tag)
+            cls.posts.append(post)
+        related.rebuild_all()
+
+    def assertQueries(self, url, cold, warm=1):
+        with self.assertNumQueries(cold):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(warm):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_index(self):
+        self.assertQueries(reverse('index'), 24)
+
+    def test_post_list(self):
+        self.assertQueries(reverse('post_list'), 19, warm=3)
+
+    def test_post_list_search(self):
+        self.assertQueries(reverse('post_list') + '?q=router', 19, warm=3)
+
+    def test_post_detail(self):
+        self.assertQueries(self.posts[0].get_absolute_url(), 21)
+
+    def test_category_detail(self):
+        self.assertQueries(reverse('category_detail', args=['python']), 19)
+
+    def test_tag_detail(self):
+        self.assertQueries(reverse('tag_detail', args=['tips']), 19)
+
+
+class SectionTests(TransactionTestCase):
+    """Sections run on the pool only outside transactions, so no TestCase reaches it"""
+
+    def setUp(self):
+        cache.clear()
+        make_post(User.objects.create_user('author', password='unused'), 'Committed')
+
+    def build(self):
+        return threading.current_thread().name, list(Post.objects.values_list('title', flat=True))
+
+    def test_builders_run_on_pool_threads(self):
+        found = sections.gather(first=self.build, second=self.build)
+        for thread_name, titles in found.values():
+            self.assertTrue(thread_name.startswith('blog-buster-section'))
+            self.assertEqual(titles, ['Committed'])
+
+    def test_pool_queries_are_observed(self):
+        with query_observers.observing(QueryCounter()) as counter:
+            sections.gather(first=self.build, second=self.build)
+        self.assertEqual(counter.queries, 2)
+
+    def test_pool_threads_release_their_connections(self):
+        closed = []
+
+        def close_old_connections():
+            closed.append(threading.current_thread().name)
+
+        def failing():
+            raise ValueError('broken section')
+
+        with mock.patch.object(sections, 'close_old_connections', close_old_connections):
+            sections.gather(first=self.build, second=self.build)
+            with self.assertRaises(ValueError):
+                sections.gather(first=self.build, second=failing)
+        self.assertEqual(len(closed), 4)
+        self.assertTrue(all(name.startswith('blog-buster-section') for name in closed))
+
+    def test_builders_run_inline_in_a_transaction(self):
+        with transaction.atomic():
+            make_post(Post.objects.get().author, 'Uncommitted')
+            found = sections.gather(first=self.build, second=self.build)
+        for thread_name, titles in found.values():
+            self.assertEqual(thread_name, threading.current_thread().name)
+            self.assertEqual(sorted(titles), ['Committed', 'Uncommitted'])
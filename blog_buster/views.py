@@ -1,8 +1,12 @@
-from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
-from django.db.models import Q, Prefetch, Count
-from datetime import timedelta
-from django.utils import timezone
+from django.shortcuts import get_object_or_404, render
+from django.db.models import Max, Prefetch
+from . import cache, metrics, page_cache, replicas, sections
+from .analytics import popular_posts
+from .conditional import conditional_page, newest_update
+from .counters import live_views, record_view
+from .pagination import paginate_posts
+from .related import related_posts_for
+from .search import search_posts
 from .models import (
     Post,
     Category,
@@ -16,23 +20,78 @@ from .models import (
     HowToSeries,
     HowToStep,
     SidebarWidget,
-    PopularPostsWidget,
-    RelatedPostsWidget,
-    AuthorBioWidget,
-    SocialShareWidget,
-    NewsletterWidget,
-    CategoriesWidget,
-    RecentPostsWidget,
-    QuickTipsWidget,
-    BuyingGuidesWidget,
 )
+from .widgets import load_sidebar_widgets, contextualize_for_post
+
+
+# Collections every page's widget context is built from
+WIDGET_DEPENDENCIES = [
+    page_cache.tag(SidebarWidget),
+    page_cache.tag(Post),
+    page_cache.tag(Category),
+    page_cache.tag(QuickTip),
+    page_cache.tag(BuyingGuide),
+    page_cache.tag(ProductReview),
+    page_cache.tag(HowToSeries),
+    page_cache.POPULAR,
+]
+
+
+def post_tags(posts):
+    return [page_cache.tag(Post, post.id) for post in posts]
+
+
+def depend_on_widgets(request, context):
+    """Declare the page cache dependencies of the widget context"""
+    page_cache.depends_on(request, *WIDGET_DEPENDENCIES)
+    for widget_data in context['sidebar_widgets']:
+        page_cache.depends_on(request, *post_tags(widget_data.get('posts', ())))
+
+
+def count_view(request, post_id):
+    """Record a post view unless the request is a pre-render, not a reader"""
+    if not getattr(request, 'prerender', False):
+        record_view(post_id)
+
+
+def freshness(primary, *others):
+    """Build a ``conditional_page`` freshness function
+
+    ``primary`` receives the view's URL arguments and returns the queryset of
+    the page's object or list members. Active sidebar widgets are always
+    part of the page.
+    """
+    def compute(request, *args, **kwargs):
+        newest, row = newest_update(
+            primary(*args, **kwargs),
+            SidebarWidget.objects.filter(is_active=True),
+            *others,
+        )
+        return newest, row['members'], {}
+    return compute
+
+
+def post_freshness(request, slug):
+    newest, row = newest_update(
+        Post.objects.filter(slug=slug, status='published'),
+        SidebarWidget.objects.filter(is_active=True),
+        post_id=Max('id'),
+    )
+    return newest, row['members'], {'post_id': row['post_id']}
 
 
 def get_widget_context():
-    """Get context for all widgets (homepage and sidebar)"""
+    """Get context for all widgets (homepage and sidebar), cached per content version"""
+    return cache.get_versioned('widget_context', build_widget_context)
+
+
+@metrics.WIDGET_CONTEXT_BUILD.time()
+def build_widget_context():
+    """Build the widget context with every queryset evaluated so it can be cached"""
     # Homepage widgets
     featured_guides = (
         BuyingGuide.objects.filter(published=True, featured=True)
+        .select_related('category')
         .prefetch_related(Prefetch('picks', queryset=GuidePick.objects.order_by('sort_order')))
         [:3]
     )
@@ -40,6 +99,7 @@ def get_widget_context():
         filler = (
             BuyingGuide.objects.filter(published=True)
             .exclude(id__in=featured_guides.values_list('id', flat=True))
+            .select_related('category')
             .prefetch_related('picks')[:3 - featured_guides.count()]
         )
         featured_guides = list(featured_guides) + list(filler)
@@ -69,112 +129,65 @@ def get_widget_context():
         )
         featured_howtos = list(featured_howtos) + list(filler)
 
-    # Sidebar widgets
-    sidebar_widgets = []
-    active_widgets = SidebarWidget.objects.filter(is_active=True).order_by('sort_order')
-
-    for widget in active_widgets:
-        widget_data = {'widget': widget}
-
-        if widget.widget_type == 'popular_posts':
-            config = getattr(widget, 'popular_posts_config', None)
-            if config:
-                cutoff_date = timezone.now() - timedelta(days=config.time_period_days)
-                widget_data['posts'] = (
-                    Post.objects.filter(status='published', published_at__gte=cutoff_date)
-                    .order_by('-views')[:config.post_count]
-                )
-
-        elif widget.widget_type == 'related_posts':
-            # This will be handled in post_detail view with current post context
-            pass
-
-        elif widget.widget_type == 'author_bio':
-            widget_data['author_bio'] = getattr(widget, 'author_bio_config', None)
-
-        elif widget.widget_type == 'social_share':
-            widget_data['social_config'] = getattr(widget, 'social_share_config', None)
-
-        elif widget.widget_type == 'newsletter':
-            widget_data['newsletter_config'] = getattr(widget, 'newsletter_config', None)
-
-        elif widget.widget_type == 'categories':
-            config = getattr(widget, 'categories_config', None)
-            if config:
-                categories = Category.objects.annotate(post_count=Count('posts')).order_by('-post_count')[:config.max_categories]
-                widget_data['categories'] = categories
-                widget_data['show_post_count'] = config.show_post_count
-
-        elif widget.widget_type == 'recent_posts':
-            config = getattr(widget, 'recent_posts_config', None)
-            if config:
-                widget_data['posts'] = Post.objects.filter(status='published').order_by('-published_at')[:config.post_count]
-
-        elif widget.widget_type == 'quick_tips':
-            config = getattr(widget, 'quick_tips_config', None)
-            if config:
-                widget_data['tips'] = QuickTip.objects.filter(is_active=True).order_by('sort_order')[:config.tip_count]
-
-        elif widget.widget_type == 'buying_guides':
-            config = getattr(widget, 'buying_guides_config', None)
-            if config:
-                widget_data['guides'] = (
-                    BuyingGuide.objects.filter(published=True)
-                    .order_by('-created_at')[:config.guide_count]
-                )
-
-        sidebar_widgets.append(widget_data)
-
     return {
-        'featured_guides': featured_guides,
-        'featured_reviews': featured_reviews,
-        'featured_howtos': featured_howtos,
-        'sidebar_widgets': sidebar_widgets,
+        'featured_guides': list(featured_guides),
+        'featured_reviews': list(featured_reviews),
+        'featured_howtos': list(featured_howtos),
+        'sidebar_widgets': load_sidebar_widgets(),
     }
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(
+    lambda: Post.objects.filter(status='published'),
+    BuyingGuide.objects.filter(published=True),
+    ProductReview.objects.filter(published=True),
+    HowToSeries.objects.filter(published=True),
+    HomepageSettings.objects.all(),
+))
+@page_cache.cache_page()
 def index(request):
     """Homepage with featured, trending, and recent posts"""
-    featured_posts = Post.objects.filter(status='published', featured=True)[:1]
-    recent_posts = (
-        Post.objects.filter(status='published')
-        .exclude(id__in=featured_posts.values_list('id', flat=True))
-        .order_by('-published_at')[:6]
-    )
-    trending_posts = (
-        Post.objects.filter(status='published')
-        .exclude(id__in=featured_posts.values_list('id', flat=True))
-        .order_by('-views')[:4]
+    published = Post.objects.filter(status='published')
+    # Independent sections; each over-fetches by the one featured post it may exclude
+    found = sections.gather(
+        featured=lambda: list(published.filter(featured=True).cards(excerpt=True)[:1]),
+        recent=lambda: list(published.cards(excerpt=True).order_by('-published_at')[:7]),
+        trending=lambda: popular_posts(7, 5, excerpt=True),
+        category_spotlight=lambda: list(Category.objects.filter(published_post_count__gt=0)[:4]),
+        homepage_settings=HomepageSettings.load,
+        quick_tips=lambda: list(QuickTip.objects.filter(is_active=True).order_by('sort_order', '-created_at')[:6]),
+        widgets=get_widget_context,
     )
-    category_spotlight = Category.objects.filter(posts__status='published').distinct()[:4]
-    settings = HomepageSettings.load()
-    quick_tips = QuickTip.objects.filter(is_active=True).order_by('sort_order', '-created_at')[:6]
+    featured_posts = found['featured']
+    featured_ids = [post.id for post in featured_posts]
+    recent_posts = [post for post in found['recent'] if post.id not in featured_ids][:6]
+    trending_posts = [post for post in found['trending'] if post.id not in featured_ids][:4]
 
     context = {
         'featured_posts': featured_posts,
         'recent_posts': recent_posts,
         'trending_posts': trending_posts,
-        'category_spotlight': category_spotlight,
-        'quick_tips': quick_tips,
-        'homepage_settings': settings,
+        'category_spotlight': found['category_spotlight'],
+        'quick_tips': found['quick_tips'],
+        'homepage_settings': found['homepage_settings'],
     }
-    context.update(get_widget_context())
+    context.update(found['widgets'])
+    page_cache.depends_on(request, page_cache.tag(HomepageSettings), *post_tags(featured_posts))
+    page_cache.depends_on(request, *post_tags(recent_posts), *post_tags(trending_posts))
+    depend_on_widgets(request, context)
     return render(request, 'blog_buster/index.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda: Post.objects.filter(status='published')))
 def post_list(request):
     """List all published posts"""
-    posts = Post.objects.filter(status='published')
+    posts = Post.objects.filter(status='published').cards(excerpt=True)
     
     # Search functionality
     search_query = request.GET.get('q')
-    if search_query:
-        posts = posts.filter(
-            Q(title__icontains=search_query) |
-            Q(content__icontains=search_query) |
-            Q(excerpt__icontains=search_query)
-        )
-    
+
     # Category filter
     category_slug = request.GET.get('category')
     if category_slug:
@@ -184,11 +197,19 @@ def post_list(request):
     tag_slug = request.GET.get('tag')
     if tag_slug:
         posts = posts.filter(tags__slug=tag_slug)
-    
+
+    def page():
+        # Ranked full-text matches, limited to the filtered posts
+        matches = search_posts(posts, search_query) if search_query else posts
+        return paginate_posts(request, matches, 9)
+
     # Pagination
-    paginator = Paginator(posts, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    found = sections.gather(
+        page=page,
+        tags=lambda: list(Tag.objects.all()[:12]),
+        widgets=get_widget_context,
+    )
+    page_obj = found['page']
     
     context = {
         'page_obj': page_obj,
@@ -196,132 +217,181 @@ def post_list(request):
         'search_query': search_query,
         'selected_category': category_slug,
         'selected_tag': tag_slug,
-        'tags': Tag.objects.all()[:12],
+        'tags': found['tags'],
     }
-    context.update(get_widget_context())
+    context.update(found['widgets'])
     return render(request, 'blog_buster/post_list.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(post_freshness, on_not_modified=count_view)
+@page_cache.cache_page(on_hit=count_view)
 def post_detail(request, slug):
     """Display a single post"""
-    post = get_object_or_404(Post, slug=slug, status='published')
-
-    # Increment view count
-    post.views += 1
-    post.save(update_fields=['views'])
+    found = sections.gather(
+        post=lambda: get_object_or_404(
+            Post.objects.select_related('category', 'author').prefetch_related('tags'),
+            slug=slug,
+            status='published',
+        ),
+        widgets=get_widget_context,
+    )
+    post = found['post']
 
-    # Get related posts
-    related_posts = Post.objects.filter(
-        status='published',
-        category=post.category
-    ).exclude(id=post.id)[:3]
+    def buffer_view():
+        # Buffer the view; flushed to the database in batches
+        views = live_views(post) + 1
+        count_view(request, post.pk)
+        return views
 
     # Get widget context and customize for this post
-    context = get_widget_context()
-
-    # Update related posts widget with post-specific data
-    for widget_data in context['sidebar_widgets']:
-        if widget_data['widget'].widget_type == 'related_posts':
-            config = getattr(widget_data['widget'], 'related_posts_config', None)
-            if config:
-                related_posts_queryset = Post.objects.filter(status='published').exclude(id=post.id)
-
-                if config.show_by_category and post.category:
-                    related_posts_queryset = related_posts_queryset.filter(category=post.category)
+    context = found['widgets']
 
-                if config.show_by_tags and post.tags.exists():
-                    related_posts_queryset = related_posts_queryset.filter(tags__in=post.tags.all())
-
-                widget_data['posts'] = related_posts_queryset.distinct()[:config.post_count]
+    found.update(sections.gather(
+        views=buffer_view,
+        related_posts=lambda: related_posts_for(post, 3, by_category=post.category_id is not None, excerpt=True),
+        # Update related posts widget with post-specific data
+        sidebar=lambda: contextualize_for_post(context['sidebar_widgets'], post),
+    ))
+    post.views = found['views']
+    related_posts = found['related_posts']
 
     context.update({
         'post': post,
         'related_posts': related_posts,
     })
 
+    page_cache.remember(request, post_id=post.pk)
+    page_cache.depends_on(request, page_cache.tag(Post, post.pk), *post_tags(related_posts))
+    page_cache.depends_on(request, *[page_cache.tag(Tag, tag.pk) for tag in post.tags.all()])
+    if post.category_id:
+        page_cache.depends_on(request, page_cache.tag(Category, post.category_id))
+    depend_on_widgets(request, context)
+
     return render(request, 'blog_buster/post_detail.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda slug: Post.objects.filter(status='published', category__slug=slug)))
+@page_cache.cache_page()
 def category_detail(request, slug):
     """Display posts in a category"""
     category = get_object_or_404(Category, slug=slug)
-    posts = Post.objects.filter(status='published', category=category)
+    posts = Post.objects.filter(status='published', category=category).cards(excerpt=True)
     
-    paginator = Paginator(posts, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    found = sections.gather(page=lambda: paginate_posts(request, posts, 9), widgets=get_widget_context)
+    page_obj = found['page']
     
     context = {
         'category': category,
         'page_obj': page_obj,
         'posts': page_obj,
     }
-    context.update(get_widget_context())
+    context.update(found['widgets'])
+    page_cache.depends_on(request, page_cache.tag(Category, category.pk), *post_tags(page_obj))
+    depend_on_widgets(request, context)
     return render(request, 'blog_buster/category_detail.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda slug: Post.objects.filter(status='published', tags__slug=slug)))
+@page_cache.cache_page()
 def tag_detail(request, slug):
     """Display posts with a specific tag"""
     tag = get_object_or_404(Tag, slug=slug)
-    posts = Post.objects.filter(status='published', tags=tag)
+    posts = Post.objects.filter(status='published', tags=tag).cards(excerpt=True)
     
-    paginator = Paginator(posts, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    found = sections.gather(page=lambda: paginate_posts(request, posts, 9), widgets=get_widget_context)
+    page_obj = found['page']
     
     context = {
         'tag': tag,
         'page_obj': page_obj,
         'posts': page_obj,
     }
-    context.update(get_widget_context())
+    context.update(found['widgets'])
+    page_cache.depends_on(request, page_cache.tag(Tag, tag.pk), *post_tags(page_obj))
+    depend_on_widgets(request, context)
     return render(request, 'blog_buster/tag_detail.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda: BuyingGuide.objects.filter(published=True)))
+@page_cache.cache_page()
 def buying_guides_list(request):
     guides = (
         BuyingGuide.objects.filter(published=True)
+        .select_related('category')
         .prefetch_related(Prefetch('picks', queryset=GuidePick.objects.order_by('sort_order')))
     )
-    context = {'guides': guides}
-    context.update(get_widget_context())
+    found = sections.gather(guides=lambda: list(guides), widgets=get_widget_context)
+    context = {'guides': found['guides']}
+    context.update(found['widgets'])
+    depend_on_widgets(request, context)
     return render(request, 'blog_buster/buying_guides_list.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda slug: BuyingGuide.objects.filter(slug=slug, published=True)))
+@page_cache.cache_page()
 def buying_guide_detail(request, slug):
-    guide = get_object_or_404(
-        BuyingGuide.objects.prefetch_related(Prefetch('picks', queryset=GuidePick.objects.order_by('sort_order'))),
-        slug=slug,
-        published=True,
+    found = sections.gather(
+        guide=lambda: get_object_or_404(
+            BuyingGuide.objects.prefetch_related(Prefetch('picks', queryset=GuidePick.objects.order_by('sort_order'))),
+            slug=slug,
+            published=True,
+        ),
+        widgets=get_widget_context,
     )
+    guide = found['guide']
     context = {'guide': guide}
-    context.update(get_widget_context())
+    context.update(found['widgets'])
+    page_cache.depends_on(request, page_cache.tag(BuyingGuide, guide.pk))
+    if guide.category_id:
+        page_cache.depends_on(request, page_cache.tag(Category, guide.category_id))
+    depend_on_widgets(request, context)
     return render(request, 'blog_buster/buying_guide_detail.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda: ProductReview.objects.filter(published=True)))
 def product_reviews_list(request):
     reviews = ProductReview.objects.filter(published=True).prefetch_related('scores')
-    context = {'reviews': reviews}
-    context.update(get_widget_context())
+    found = sections.gather(reviews=lambda: list(reviews), widgets=get_widget_context)
+    context = {'reviews': found['reviews']}
+    context.update(found['widgets'])
     return render(request, 'blog_buster/product_reviews_list.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda slug: ProductReview.objects.filter(slug=slug, published=True)))
 def product_review_detail(request, slug):
-    review = get_object_or_404(ProductReview.objects.prefetch_related('scores'), slug=slug, published=True)
-    context = {'review': review}
-    context.update(get_widget_context())
+    found = sections.gather(
+        review=lambda: get_object_or_404(ProductReview.objects.prefetch_related('scores'), slug=slug, published=True),
+        widgets=get_widget_context,
+    )
+    context = {'review': found['review']}
+    context.update(found['widgets'])
     return render(request, 'blog_buster/product_review_detail.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda: HowToSeries.objects.filter(published=True)))
 def howto_list(request):
     series = HowToSeries.objects.filter(published=True).prefetch_related('steps')
-    context = {'series_list': series}
-    context.update(get_widget_context())
+    found = sections.gather(series=lambda: list(series), widgets=get_widget_context)
+    context = {'series_list': found['series']}
+    context.update(found['widgets'])
     return render(request, 'blog_buster/howto_list.html', context)
 
 
+@replicas.read_from_replica
+@conditional_page(freshness(lambda slug: HowToSeries.objects.filter(slug=slug, published=True)))
 def howto_detail(request, slug):
-    series = get_object_or_404(HowToSeries.objects.prefetch_related('steps'), slug=slug, published=True)
-    context = {'series': series}
-    context.update(get_widget_context())
+    found = sections.gather(
+        series=lambda: get_object_or_404(HowToSeries.objects.prefetch_related('steps'), slug=slug, published=True),
+        widgets=get_widget_context,
+    )
+    context = {'series': found['series']}
+    context.update(found['widgets'])
     return render(request, 'blog_buster/howto_detail.html', context)
@@ -0,0 +1,300 @@
+"""Sidebar widget registry.
+
+Each ``widget_type`` maps to a loader class that knows its config relation,
+which shared data sources it reads and how to turn them into template
+context. Loading every active widget costs one ``select_related`` query for
+the widgets and their configs plus one query per distinct data source.
+"""
+from .analytics import popular_posts
+from .related import related_posts_for
+from .models import (
+    Post,
+    PostCard,
+    Category,
+    QuickTip,
+    BuyingGuide,
+    SidebarWidget,
+    PopularPostsWidget,
+    RelatedPostsWidget,
+    AuthorBioWidget,
+    SocialShareWidget,
+    NewsletterWidget,
+    CategoriesWidget,
+    RecentPostsWidget,
+    QuickTipsWidget,
+    BuyingGuidesWidget,
+)
+
+WIDGET_LOADERS = {}
+DATA_SOURCES = {}
+
+
+def register(loader_class):
+    """Class decorator adding a loader to the widget registry"""
+    WIDGET_LOADERS[loader_class.widget_type] = loader_class()
+    return loader_class
+
+
+def data_source(name):
+    """Decorator registering a batched data source fetcher"""
+    def decorator(func):
+        DATA_SOURCES[name] = func
+        return func
+    return decorator
+
+
+def get_loader(widget_type):
+    return WIDGET_LOADERS.get(widget_type, NULL_LOADER)
+
+
+def config_relations():
+    """Reverse one-to-one names of every registered widget config"""
+    return [loader.config_attr for loader in WIDGET_LOADERS.values() if loader.config_attr]
+
+
+class WidgetLoader:
+    """Base class for sidebar widget loaders"""
+    widget_type = None
+    config_model = None
+    config_attr = None
+    # Whether the rendered widget changes with editor-managed content
+    uses_content = False
+
+    @property
+    def template_name(self):
+        return f'blog_buster/widgets/{self.widget_type}.html'
+
+    def get_config(self, widget):
+        if not self.config_attr:
+            return None
+        return getattr(widget, self.config_attr, None)
+
+    def requirements(self, config):
+        """Return ``{(source, *params): limit}`` for the data this widget needs"""
+        return {}
+
+    def build(self, widget, config, data):
+        """Return template context for the widget from the fetched ``data``"""
+        return {}
+
+    def for_post(self, widget_data, post):
+        """Adjust the widget context for the post being displayed"""
+
+    def fragment_key_parts(self, context):
+        """Extra fragment cache key parts for widgets that vary per page"""
+        return ()
+
+
+NULL_LOADER = WidgetLoader()
+
+
+@register
+class PopularPostsLoader(WidgetLoader):
+    widget_type = 'popular_posts'
+    config_model = PopularPostsWidget
+    config_attr = 'popular_posts_config'
+    uses_content = True
+
+    def requirements(self, config):
+        if not config:
+            return {}
+        return {('popular_posts', config.time_period_days): config.post_count}
+
+    def build(self, widget, config, data):
+        if not config:
+            return {}
+        posts = data[('popular_posts', config.time_period_days)]
+        return {'posts': posts[:config.post_count]}
+
+
+@register
+class RelatedPostsLoader(WidgetLoader):
+    widget_type = 'related_posts'
+    config_model = RelatedPostsWidget
+    config_attr = 'related_posts_config'
+    uses_content = True
+
+    def for_post(self, widget_data, post):
+        config = widget_data.get('config')
+        if not config:
+            return
+        widget_data['posts'] = related_posts_for(
+            post,
+            config.post_count,
+            by_category=config.show_by_category and post.category_id is not None,
+            by_tags=config.show_by_tags and bool(post.tags.all()),
+        )
+
+    def fragment_key_parts(self, context):
+        post = context.get('post')
+        return (post.pk if post else None,)
+
+
+@register
+class AuthorBioLoader(WidgetLoader):
+    widget_type = 'author_bio'
+    config_model = AuthorBioWidget
+    config_attr = 'author_bio_config'
+
+    def build(self, widget, config, data):
+        return {'author_bio': config}
+
+
+@register
+class SocialShareLoader(WidgetLoader):
+    widget_type = 'social_share'
+    config_model = SocialShareWidget
+    config_attr = 'social_share_config'
+
+    def build(self, widget, config, data):
+        return {'social_config': config}
+
+    def fragment_key_parts(self, context):
+        # Share links embed the page URL and the post title
+        request = context.get('request')
+        post = context.get('post')
+        return (request.build_absolute_uri() if request else None, post.title if post else None)
+
+
+@register
+class NewsletterLoader(WidgetLoader):
+    widget_type = 'newsletter'
+    config_model = NewsletterWidget
+    config_attr = 'newsletter_config'
+
+    def build(self, widget, config, data):
+        return {'newsletter_config': config}
+
+
+@register
+class CategoriesLoader(WidgetLoader):
+    widget_type = 'categories'
+    config_model = CategoriesWidget
+    config_attr = 'categories_config'
+    uses_content = True
+
+    def requirements(self, config):
+        if not config:
+            return {}
+        return {('categories_by_post_count',): config.max_categories}
+
+    def build(self, widget, config, data):
+        if not config:
+            return {}
+        return {
+            'categories': data[('categories_by_post_count',)][:config.max_categories],
+            'show_post_count': config.show_post_count,
+        }
+
+
+@register
+class RecentPostsLoader(WidgetLoader):
+    widget_type = 'recent_posts'
+    config_model = RecentPostsWidget
+    config_attr = 'recent_posts_config'
+    uses_content = True
+
+    def requirements(self, config):
+        if not config:
+            return {}
+        return {('recent_posts',): config.post_count}
+
+    def build(self, widget, config, data):
+        if not config:
+            return {}
+        return {'posts': data[('recent_posts',)][:config.post_count]}
+
+
+@register
+class QuickTipsLoader(WidgetLoader):
+    widget_type = 'quick_tips'
+    config_model = QuickTipsWidget
+    config_attr = 'quick_tips_config'
+    uses_content = True
+
+    def requirements(self, config):
+        if not config:
+            return {}
+        return {('quick_tips',): config.tip_count}
+
+    def build(self, widget, config, data):
+        if not config:
+            return {}
+        return {'tips': data[('quick_tips',)][:config.tip_count]}
+
+
+@register
+class BuyingGuidesLoader(WidgetLoader):
+    widget_type = 'buying_guides'
+    config_model = BuyingGuidesWidget
+    config_attr = 'buying_guides_config'
+    uses_content = True
+
+    def requirements(self, config):
+        if not config:
+            return {}
+        return {('recent_guides',): config.guide_count}
+
+    def build(self, widget, config, data):
+        if not config:
+            return {}
+        return {'guides': data[('recent_guides',)][:config.guide_count]}
+
+
+@data_source('popular_posts')
+def fetch_popular_posts(limit, time_period_days):
+    return [PostCard.from_post(post) for post in popular_posts(time_period_days, limit)]
+
+
+@data_source('categories_by_post_count')
+def fetch_categories_by_post_count(limit):
+    return list(Category.objects.order_by('-published_post_count', 'name')[:limit])
+
+
+@data_source('recent_posts')
+def fetch_recent_posts(limit):
+    return Post.objects.filter(status='published').order_by('-published_at')[:limit].card_objects()
+
+
+@data_source('quick_tips')
+def fetch_quick_tips(limit):
+    return list(QuickTip.objects.filter(is_active=True).order_by('sort_order')[:limit])
+
+
+@data_source('recent_guides')
+def fetch_recent_guides(limit):
+    return list(BuyingGuide.objects.filter(published=True).order_by('-created_at')[:limit])
+
+
+def load_sidebar_widgets():
+    """Load every active sidebar widget with its config and data"""
+    widgets = list(
+        SidebarWidget.objects.filter(is_active=True)
+        .select_related(*config_relations())
+        .order_by('sort_order')
+    )
+
+    # Merge requirements so widgets sharing a source trigger a single query
+    configs = {}
+    needs = {}
+    for widget in widgets:
+        config = get_loader(widget.widget_type).get_config(widget)
+        configs[widget.pk] = config
+        for need, limit in get_loader(widget.widget_type).requirements(config).items():
+            needs[need] = max(limit, needs.get(need, 0))
+
+    data = {need: DATA_SOURCES[need[0]](limit, *need[1:]) for need, limit in needs.items()}
+
+    sidebar_widgets = []
+    for widget in widgets:
+        config = configs[widget.pk]
+        widget_data = {'widget': widget, 'config': config}
+        widget_data.update(get_loader(widget.widget_type).build(widget, config, data))
+        sidebar_widgets.append(widget_data)
+    return sidebar_widgets
+
+
+def contextualize_for_post(sidebar_widgets, post):
+    """Let each widget adjust its context for the post being displayed"""
+    for widget_data in sidebar_widgets:
+        get_loader(widget_data['widget'].widget_type).for_post(widget_data, post)
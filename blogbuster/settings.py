@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog_buster.middleware.MetricsMiddleware',
+    # Above SessionMiddleware, so session saves count as writes
+    'blog_buster.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +59,8 @@ ROOT_URLCONF = 'blogbuster.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend with render-time metrics
+        'BACKEND': 'blog_buster.metrics.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,13 +80,72 @@ WSGI_APPLICATION = 'blogbuster.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections persist so the section pool's threads (blog_buster.sections)
+# reuse theirs instead of reconnecting for every request.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas: public views read from the aliases in BLOG_BUSTER_DB_REPLICAS
+# and everything else uses 'default' (see blog_buster.replicas). To try it
+# locally, point SQLITE_REPLICA at a copy of db.sqlite3.
+
+if os.environ.get('SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['SQLITE_REPLICA'],
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['blog_buster.replicas.ReplicaRouter']
+BLOG_BUSTER_DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+BLOG_BUSTER_DB_MAX_REPLICA_LAG = 5
+BLOG_BUSTER_DB_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The shared tier behind blog_buster.cache's per-process tier. Set REDIS_URL
+# (docker-compose.yml runs Redis) so every worker shares it; without it each
+# process gets its own local-memory cache, which is fine for development.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Buffered post views must survive until flush_view_counts runs, so they
+# need their own Redis cache that never evicts (maxmemory-policy noeviction).
+# Without Redis, views are written straight to the database.
+if REDIS_URL:
+    CACHES['view_counts'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_VIEW_COUNTS_URL', REDIS_URL),
+        'TIMEOUT': None,
+    }
+BLOG_BUSTER_VIEW_BUFFER_CACHE = 'view_counts' if REDIS_URL else None
+
+BLOG_BUSTER_LOCAL_CACHE_MAX_ENTRIES = 500
+BLOG_BUSTER_LOCAL_CACHE_TIMEOUT = 60
+
+# Scrapes of /metrics/ send "Authorization: Bearer <token>"; without a token
+# the endpoint is only served while DEBUG is on.
+BLOG_BUSTER_METRICS_TOKEN = os.environ.get('BLOG_BUSTER_METRICS_TOKEN')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,18 @@
+"""Gunicorn hooks for multiprocess Prometheus metrics (see blog_buster.metrics)."""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Samples left by a previous run would be summed into the new one
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)